@@ -10,6 +10,7 @@ from alembic import context
 from app.database import Base
 from app.config import settings
 from app.users.models import *
+from app.currency_converter.models import *
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,36 @@
+"""historical quotes
+
+Revision ID: 0469d9d37da6
+Revises: 7a82afbe3a08
+Create Date: 2026-10-18 10:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0469d9d37da6'
+down_revision: Union[str, None] = '7a82afbe3a08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Partitioned by month of quoted_at, monthly partitions are created by writers on demand.
+    op.create_table('historical_quote',
+    sa.Column('source', sa.String(length=3), nullable=False),
+    sa.Column('target', sa.String(length=3), nullable=False),
+    sa.Column('quoted_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('rate', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('source', 'target', 'quoted_at'),
+    postgresql_partition_by='RANGE (quoted_at)'
+    )
+    op.create_index('ix_historical_quote_quoted_at', 'historical_quote', ['quoted_at'], unique=False, postgresql_using='brin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_historical_quote_quoted_at', table_name='historical_quote', postgresql_using='brin')
+    op.drop_table('historical_quote')
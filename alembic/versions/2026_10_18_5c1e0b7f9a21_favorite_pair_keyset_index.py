@@ -0,0 +1,29 @@
+"""favorite pair keyset index
+
+Revision ID: 5c1e0b7f9a21
+Revises: 0469d9d37da6
+Create Date: 2026-10-18 16:40:07.532914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e0b7f9a21'
+down_revision: Union[str, None] = '0469d9d37da6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Pages of favorite pairs are read by user and id, the index serves lookups by user too.
+    op.create_index('ix_favorite_pair_user_id_id', 'favorite_pair', ['user_id', 'id'], unique=False)
+    op.drop_index('ix_favorite_pair_user_id', table_name='favorite_pair')
+
+
+def downgrade() -> None:
+    op.create_index('ix_favorite_pair_user_id', 'favorite_pair', ['user_id'], unique=False)
+    op.drop_index('ix_favorite_pair_user_id_id', table_name='favorite_pair')
@@ -17,6 +17,74 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_LIFETIME_DAYS: int
     REFRESH_TOKEN_LIFETIME_DAYS: int
 
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_TIMEOUT: float = 10.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP2: bool = False
+
+    EXCHANGERATE_DEADLINE: float = 15.0
+    EXCHANGERATE_RETRY_ATTEMPTS: int = 3
+    EXCHANGERATE_RETRY_BASE_DELAY: float = 0.2
+    EXCHANGERATE_RETRY_MAX_DELAY: float = 2.0
+    EXCHANGERATE_BREAKER_FAILURE_THRESHOLD: int = 5
+    EXCHANGERATE_BREAKER_RECOVERY_TIMEOUT: float = 30.0
+    EXCHANGERATE_FALLBACK_TO_LAST_SNAPSHOT: bool = True
+    EXCHANGERATE_MONTHLY_QUOTA: int = 0
+    EXCHANGERATE_QUOTA_BURST: int = 10
+    EXCHANGERATE_QUOTA_WAIT_TIMEOUT: float = 1.0
+
+    RATE_PROVIDER: str = 'exchangerate'
+    RATE_PROVIDER_FILE: str = ''
+    HEDGE_PROVIDER: str = ''
+    HEDGE_PERCENTILE: float = 95.0
+    HEDGE_INITIAL_DELAY: float = 1.0
+    HEDGE_WINDOW: int = 100
+
+    CONVERT_BATCH_MAX_ITEMS: int = 5000
+    CONVERSION_ROUNDING: str = 'ROUND_HALF_EVEN'
+    CURRENCY_MINOR_UNITS: dict[str, int] = {}
+
+    RATE_SOURCE_CURRENCY: str = 'USD'
+    DIRECT_QUOTE_CURRENCIES: list[str] = []
+    RATE_CACHE_TTL: int = 60
+    RATE_CACHE_GRACE: int = 300
+    CACHE_FILL_LOCK_TIMEOUT: float = 10.0
+    CACHE_FILL_WAIT_TIMEOUT: float = 2.0
+    CACHE_FILL_POLL_INTERVAL: float = 0.05
+    LOCAL_CACHE_MAXSIZE: int = 1024
+    RATES_LOCAL_CACHE_TTL: float = 5.0
+    CURRENCIES_LOCAL_CACHE_TTL: float = 300.0
+
+    INVALIDATION_BUS_ENABLED: bool = True
+    INVALIDATION_CHANNEL: str = 'cache:invalidation'
+    INVALIDATION_RECONNECT_MIN_DELAY: float = 0.5
+    INVALIDATION_RECONNECT_MAX_DELAY: float = 10.0
+
+    STREAM_POLL_INTERVAL: float = 30.0
+    STREAM_HEARTBEAT_INTERVAL: float = 15.0
+    STREAM_SEND_TIMEOUT: float = 10.0
+
+    HISTORY_RECORD_SNAPSHOTS: bool = False
+    BACKFILL_CHUNK_SIZE: int = 10000
+    SERIES_CACHE_TTL: int = 300
+    SERIES_LOCAL_CACHE_MAXSIZE: int = 128
+    SERIES_MAX_WINDOW: int = 365
+    FAVORITE_RATES_PAGE_SIZE: int = 100
+    FAVORITE_RATES_MAX_PAGE_SIZE: int = 500
+
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_BODY_SIZE: int = 1048576
+    RESPONSE_CACHE_CURRENCIES_TTL: int = 300
+    RESPONSE_CACHE_RATE_TTL: int = 30
+    RESPONSE_CACHE_FAVORITES_TTL: int = 30
+    COMPRESSION_MIN_SIZE: int = 1024
+
+    QUOTES_REFRESHER_ENABLED: bool = True
+    QUOTES_REFRESH_INTERVAL: float = 30.0
+    CURRENCIES_REFRESH_INTERVAL: float = 3600.0
+
     class Config:
         env_file = '.env'
         case_sensitive = True
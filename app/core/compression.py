@@ -0,0 +1,157 @@
+import gzip
+from typing import Iterable
+
+from starlette.datastructures import Headers
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from app.config import settings
+from app.core.utils import parse_accept
+from app.core.utils import parse_rejected
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 6
+
+UNCOMPRESSED_MEDIA_TYPES = ('text/event-stream',)
+
+
+def available_encodings() -> list[str]:
+    """Get content codings responses may be compressed with, preferred ones first."""
+    encodings = []
+    if brotli is not None:
+        encodings.append('br')
+    if zstandard is not None:
+        encodings.append('zstd')
+    encodings.append('gzip')
+
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str | None, offered: Iterable[str]) -> str | None:
+    """Choose the offered content coding accepted by Accept-Encoding header, None for identity."""
+    if not accept_encoding:
+        return None
+
+    accepted = parse_accept(accept_encoding)
+    for encoding in offered:
+        if encoding in accepted:
+            return encoding
+    if '*' in accepted:
+        rejected = parse_rejected(accept_encoding)
+        return next((encoding for encoding in offered if encoding not in rejected), None)
+
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress body with the content coding."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def is_compressible(headers: Headers, body: bytes) -> bool:
+    """Check whether response is large enough and is not compressed or streamed already."""
+    media_type = headers.get('content-type', '').partition(';')[0].strip()
+
+    return (
+        len(body) >= settings.COMPRESSION_MIN_SIZE
+        and 'content-encoding' not in headers
+        and media_type not in UNCOMPRESSED_MEDIA_TYPES
+    )
+
+
+def compress_variants(headers: Headers, body: bytes) -> dict[str, bytes]:
+    """Compress body with every available content coding which makes it smaller."""
+    if not is_compressible(headers, body):
+        return {}
+
+    variants = {encoding: compress(body, encoding) for encoding in available_encodings()}
+
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+
+def encoded_headers(
+    raw_headers: list[tuple[bytes, bytes]],
+    encoding: str,
+    length: int,
+) -> list[tuple[bytes, bytes]]:
+    """
+    Get headers of response compressed with the content coding.
+
+    Entity tag becomes weak, since compressed representation differs from the identity one
+    byte by byte.
+    """
+    headers = MutableHeaders(raw=list(raw_headers))
+    headers['content-encoding'] = encoding
+    headers['content-length'] = str(length)
+    headers.add_vary_header('Accept-Encoding')
+    etag = headers.get('etag')
+    if etag is not None and not etag.startswith('W/'):
+        headers['etag'] = f'W/{etag}'
+
+    return headers.raw
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with content coding negotiated by Accept-Encoding.
+
+    Only complete responses of at least the minimum size are compressed, streamed ones are
+    sent as is.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = None
+        if scope['type'] == 'http':
+            encoding = negotiate_encoding(
+                Headers(scope=scope).get('accept-encoding'),
+                available_encodings(),
+            )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message = {}
+
+        async def send_compressed(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                start.update(message)
+                return
+            if not start:
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            headers = Headers(raw=start.get('headers', []))
+            if not message.get('more_body', False) and is_compressible(headers, body):
+                body = compress(body, encoding)
+                start['headers'] = encoded_headers(start['headers'], encoding, len(body))
+                message = {**message, 'body': body}
+
+            await send(dict(start))
+            start.clear()
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,35 @@
+import json
+from types import ModuleType
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+orjson: ModuleType | None
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode JSON with orjson when it is installed, otherwise with the standard library."""
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """Encode value into compact UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(value)
+
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by the fast encoder."""
+
+    def render(self, content: Any) -> bytes:
+        """Encode content into JSON."""
+        return dumps(content)
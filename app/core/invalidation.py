@@ -0,0 +1,123 @@
+import asyncio
+import logging
+from typing import Protocol
+
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import RedisError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from app.config import settings
+from app.core import fastjson
+from app.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidatedCache(Protocol):
+    """Worker-level cache which may be invalidated by other workers."""
+
+    def invalidate(self, key: str, version: int) -> None:
+        """Drop the value of the key older than the version."""
+
+    def invalidate_all(self) -> None:
+        """Drop all values."""
+
+
+class InvalidationBus:
+    """
+    Bus notifying all workers of the cluster that cached values were changed.
+
+    Message carries the key and the version of its new value, every worker drops its own copy
+    older than that version. Messages published while the subscriber was disconnected are
+    lost, so all copies are dropped after reconnect.
+    """
+
+    def __init__(
+        self,
+        *,
+        channel: str | None = None,
+        redis: Redis = redis_client,
+        reconnect_min_delay: float | None = None,
+        reconnect_max_delay: float | None = None,
+    ) -> None:
+        self.channel = channel or settings.INVALIDATION_CHANNEL
+        self.reconnect_min_delay = reconnect_min_delay or settings.INVALIDATION_RECONNECT_MIN_DELAY
+        self.reconnect_max_delay = reconnect_max_delay or settings.INVALIDATION_RECONNECT_MAX_DELAY
+        self._redis = redis
+        self._caches: list[InvalidatedCache] = []
+        self._task: asyncio.Task[None] | None = None
+        self.subscribed = asyncio.Event()
+
+    def register(self, cache: InvalidatedCache) -> None:
+        """Invalidate the cache on messages from other workers."""
+        self._caches.append(cache)
+
+    async def publish(self, key: str, version: int) -> None:
+        """Notify workers about new version of the key, errors are logged and ignored."""
+        message = fastjson.dumps({'key': key, 'version': version})
+        try:
+            await self._redis.publish(self.channel, message)
+        except RedisError:
+            logger.exception('Failed to publish invalidation of key %s', key)
+
+    def _dispatch(self, data: str | bytes) -> None:
+        """Invalidate registered caches by the message."""
+        try:
+            message = fastjson.loads(data)
+            key, version = message['key'], int(message['version'])
+        except (ValueError, KeyError, TypeError):
+            logger.warning('Invalid invalidation message %r', data)
+            return
+
+        for cache in self._caches:
+            cache.invalidate(key, version)
+
+    async def _listen(self) -> None:
+        """Subscribe to the channel and dispatch messages until disconnected."""
+        async with self._redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+            await pubsub.subscribe(self.channel)
+            self.subscribed.set()
+            async for message in pubsub.listen():
+                self._dispatch(message['data'])
+
+    async def run(self) -> None:
+        """Listen to the channel until cancelled, reconnecting with backoff."""
+        delay = self.reconnect_min_delay
+        while True:
+            try:
+                await self._listen()
+            except (RedisConnectionError, RedisTimeoutError, OSError):
+                pass
+
+            if self.subscribed.is_set():
+                self.subscribed.clear()
+                delay = self.reconnect_min_delay
+            logger.warning('Invalidation bus is disconnected, reconnecting in %s s', delay)
+
+            for cache in self._caches:
+                cache.invalidate_all()
+
+            await asyncio.sleep(delay)
+            delay = min(self.reconnect_max_delay, delay * 2)
+
+    def start(self) -> None:
+        """Start listening in background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop listening."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.subscribed.clear()
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,93 @@
+import asyncio
+import datetime as dt
+import time
+
+from redis.asyncio import Redis
+
+from app.redis import redis_client
+
+TAKE_TOKENS_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local requested = tonumber(ARGV[4])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1])
+local updated_at = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+    updated_at = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+
+local allowed = 0
+if requested > 0 and tokens >= requested then
+    tokens = tokens - requested
+    allowed = 1
+    redis.call('INCRBY', KEYS[2], requested)
+    redis.call('EXPIRE', KEYS[2], 40 * 24 * 3600)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket shared by all workers of the cluster with monthly usage counter."""
+
+    def __init__(
+        self,
+        *,
+        key: str,
+        capacity: int,
+        refill_rate: float,
+        redis: Redis = redis_client,
+    ) -> None:
+        self.key = key
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self._redis = redis
+        self._script = redis.register_script(TAKE_TOKENS_SCRIPT)
+
+    def _usage_key(self) -> str:
+        """Get key of the usage counter of the current month."""
+        return f'{self.key}:usage:{dt.datetime.now(tz=dt.timezone.utc):%Y-%m}'
+
+    async def _take(self, tokens: int) -> tuple[bool, float]:
+        """Try to take tokens and get the number of tokens left."""
+        allowed, left = await self._script(
+            keys=[self.key, self._usage_key()],
+            args=[self.capacity, self.refill_rate, time.time(), tokens],
+        )
+
+        return bool(allowed), float(left)
+
+    async def acquire(self, *, timeout: float = 0) -> bool:
+        """
+        Take one token, waiting for it no longer than timeout.
+
+        Waiting is skipped when the token cannot be refilled before the timeout.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            allowed, left = await self._take(1)
+            if allowed:
+                return True
+
+            delay = (1 - left) / self.refill_rate
+            if loop.time() + delay > deadline:
+                return False
+
+            await asyncio.sleep(delay)
+
+    async def get_budget(self) -> dict[str, float]:
+        """Get tokens left in the bucket and the number of tokens used this month."""
+        _, left = await self._take(0)
+        used = await self._redis.get(self._usage_key())
+
+        return {'tokens': left, 'used_this_month': int(used or 0)}
@@ -0,0 +1,83 @@
+import asyncio
+import random
+import time
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of calls to a third party service.
+
+    After the number of consecutive failures the circuit opens and calls fail fast. When the
+    recovery timeout passes one trial call is let through, its result closes or opens the
+    circuit again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, *, failure_threshold: int, recovery_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.reset()
+
+    def reset(self) -> None:
+        """Close the circuit and forget failures."""
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_started_at: float | None = None
+
+    def allow(self) -> bool:
+        """Check whether a call may be made now."""
+        if self.state == self.CLOSED:
+            return True
+
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self._opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+
+        if self.state != self.HALF_OPEN:
+            return False
+
+        # Trial call which never reported its result does not block the circuit forever.
+        if self._trial_started_at is None or now - self._trial_started_at >= self.recovery_timeout:
+            self._trial_started_at = now
+            return True
+
+        return False
+
+    def record_success(self) -> None:
+        """Close the circuit after successful call."""
+        self.reset()
+
+    def record_failure(self) -> None:
+        """Count failed call and open the circuit when the threshold is reached."""
+        self.failures += 1
+        self._trial_started_at = None
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+async def retry(
+    func: Callable[[], Awaitable[Any]],
+    *,
+    attempts: int,
+    base_delay: float,
+    max_delay: float,
+    retry_on: tuple[type[Exception], ...],
+) -> Any:
+    """Call func until success with exponential backoff and full jitter between attempts."""
+    for attempt in range(attempts):
+        try:
+            return await func()
+        except retry_on:
+            if attempt == attempts - 1:
+                raise
+
+        delay = min(max_delay, base_delay * 2 ** attempt)
+        await asyncio.sleep(random.uniform(0, delay))  # noqa: S311
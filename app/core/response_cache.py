@@ -0,0 +1,310 @@
+import logging
+import time
+from typing import Any
+from typing import Iterable
+from urllib.parse import parse_qsl
+from urllib.parse import urlencode
+
+import jwt
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from app.config import settings
+from app.core import fastjson
+from app.core.compression import available_encodings
+from app.core.compression import compress_variants
+from app.core.compression import encoded_headers
+from app.core.compression import negotiate_encoding
+from app.core.utils import etag_matches
+from app.redis import binary_redis_client
+
+logger = logging.getLogger(__name__)
+
+IDENTITY = 'identity'
+
+NOT_MODIFIED_HEADERS = (b'etag', b'last-modified', b'cache-control', b'vary', b'age')
+
+
+class CachedRoute:
+    """
+    GET route whose responses are cached.
+
+    Tags may refer to the user of a private route by {user}. Responses of a private route are
+    cached per user of the access token and are not cached for requests without valid one.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        ttl: int,
+        tags: Iterable[str] = (),
+        private: bool = False,
+    ) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.tags = tuple(tags)
+        self.private = private
+
+    def get_tags(self, user: str | None) -> list[str]:
+        """Get tags of the route for the user."""
+        return [tag.format(user=user) for tag in self.tags]
+
+
+class ResponseCache:
+    """
+    Cache of serialized responses in Redis invalidated by tags.
+
+    Every tag has a version incremented on invalidation. Entry remembers versions of its tags
+    read before the response was built, so the entry is valid only while none of them is
+    incremented. Entry is a hash with metadata and a body for every content coding, the body
+    is stored uncompressed for codings which do not make it smaller.
+    """
+
+    def __init__(self, *, prefix: str = 'response', redis: Redis = binary_redis_client) -> None:
+        self.prefix = prefix
+        self._redis = redis
+
+    def _tag_key(self, tag: str) -> str:
+        """Get Redis key of the tag version."""
+        return f'{self.prefix}:tag:{tag}'
+
+    async def get(
+        self,
+        key: str,
+        tags: list[str],
+        *,
+        encoding: str | None = None,
+    ) -> tuple[dict[str, Any] | None, list[int]]:
+        """
+        Get valid entry with the body for the content coding and current versions of the tags.
+
+        Everything is read by a single round trip.
+        """
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.hmget(f'{self.prefix}:{key}', ['meta', encoding or IDENTITY])
+            if tags:
+                pipe.mget([self._tag_key(tag) for tag in tags])
+            (meta, body), *tag_versions = await pipe.execute()
+
+        versions = [int(version or 0) for version in (tag_versions[0] if tags else [])]
+        if meta is None or body is None:
+            return None, versions
+
+        entry = fastjson.loads(meta)
+        if entry['tags'] != versions:
+            return None, versions
+
+        entry['body'] = body
+        entry['encoding'] = encoding if encoding in entry['encodings'] else None
+
+        return entry, versions
+
+    async def set(
+        self,
+        key: str,
+        *,
+        headers: list[tuple[str, str]],
+        variants: dict[str, bytes],
+        tag_versions: list[int],
+        ttl: int,
+    ) -> None:
+        """Save response given by bodies for content codings with versions of its tags."""
+        identity = variants[IDENTITY]
+        meta = fastjson.dumps({
+            'headers': headers,
+            'tags': tag_versions,
+            'encodings': [encoding for encoding in variants if encoding != IDENTITY],
+            'stored_at': time.time(),
+        })
+        fields = {encoding: identity for encoding in available_encodings()}
+        fields.update(variants)
+
+        full_key = f'{self.prefix}:{key}'
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(full_key)
+            pipe.hset(full_key, mapping={'meta': meta, **fields})
+            pipe.expire(full_key, ttl)
+            await pipe.execute()
+
+    async def invalidate(self, *tags: str) -> None:
+        """Invalidate responses with the tags, errors are logged and ignored."""
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.incr(self._tag_key(tag))
+                await pipe.execute()
+        except RedisError:
+            logger.exception('Failed to invalidate responses with tags %s', tags)
+
+
+response_cache = ResponseCache()
+
+
+def normalize_query(query_string: bytes) -> str:
+    """Sort query parameters, so their order does not split cache entries."""
+    return urlencode(sorted(parse_qsl(query_string.decode('latin-1'), keep_blank_values=True)))
+
+
+def get_token_user(headers: Headers) -> str | None:
+    """Get username of valid access token of Authorization header."""
+    scheme, _, token = headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+
+    try:
+        decoded = jwt.decode(token, settings.JWT_TOKEN_SECRET, algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+    if decoded.get('type') != 'access':
+        return None
+
+    return decoded.get('username')
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware serving responses of selected GET routes from the response cache.
+
+    Cache key is the path, sorted query and the user of private routes. Cached response is
+    sent as is, without running the application, compressed with content coding negotiated by
+    Accept-Encoding, with Age header and with 304 status when If-None-Match matches its ETag.
+    Only 200 responses are saved, compressed variants are saved with them, so a response is
+    compressed once per entry. Redis errors are logged and the request is passed to the
+    application.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        routes: Iterable[CachedRoute],
+        cache: ResponseCache = response_cache,
+    ) -> None:
+        self.app = app
+        self.routes = {route.path: route for route in routes}
+        self.cache = cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route = self.routes.get(scope['path']) if scope['type'] == 'http' else None
+        if route is None or scope['method'] != 'GET' or not settings.RESPONSE_CACHE_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        user = get_token_user(headers) if route.private else None
+        if route.private and user is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f'{route.path}?{normalize_query(scope["query_string"])}:{user or "public"}'
+        encoding = negotiate_encoding(headers.get('accept-encoding'), available_encodings())
+        try:
+            entry, tag_versions = await self.cache.get(
+                key,
+                route.get_tags(user),
+                encoding=encoding,
+            )
+        except RedisError:
+            logger.exception('Failed to get cached response %s', key)
+            await self.app(scope, receive, send)
+            return
+
+        if entry is None:
+            entry = await self._call_and_save(
+                scope,
+                receive,
+                send,
+                key=key,
+                route=route,
+                tag_versions=tag_versions,
+                encoding=encoding,
+            )
+            if entry is None:
+                return
+
+        await self._send_cached(entry, headers.get('if-none-match'), send)
+
+    @staticmethod
+    async def _send_cached(entry: dict[str, Any], if_none_match: str | None, send: Send) -> None:
+        """Send cached response, or 304 response when it is not modified."""
+        headers = [(name.encode('latin-1'), value.encode('latin-1'))
+                   for name, value in entry['headers']]
+        if entry['encoding'] is not None:
+            headers = encoded_headers(headers, entry['encoding'], len(entry['body']))
+        headers.append((b'age', str(int(time.time() - entry['stored_at'])).encode()))
+        etag = next((value for name, value in headers if name == b'etag'), None)
+
+        if etag is not None and etag_matches(if_none_match, etag.decode('latin-1')):
+            await send({
+                'type': 'http.response.start',
+                'status': 304,
+                'headers': [(name, value) for name, value in headers
+                            if name in NOT_MODIFIED_HEADERS],
+            })
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': entry['body']})
+
+    async def _call_and_save(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        *,
+        key: str,
+        route: CachedRoute,
+        tag_versions: list[int],
+        encoding: str | None,
+    ) -> dict[str, Any] | None:
+        """
+        Run the application and save its response with compressed variants.
+
+        Saved response is returned with the body for the content coding to be sent like a
+        cached one, a response which can not be saved is sent as is.
+        """
+        messages: list[Message] = []
+
+        async def capture(message: Message) -> None:
+            messages.append(message)
+
+        await self.app(scope, receive, capture)
+
+        start = messages[0]
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        response_headers = Headers(raw=start.get('headers', []))
+        if (start['status'] != 200 or len(body) > settings.RESPONSE_CACHE_MAX_BODY_SIZE
+                or 'set-cookie' in response_headers
+                or 'no-store' in response_headers.get('cache-control', '')):
+            for message in messages:
+                await send(message)
+            return None
+
+        headers = [(name.decode('latin-1'), value.decode('latin-1'))
+                   for name, value in start.get('headers', [])]
+        variants = compress_variants(response_headers, body)
+        try:
+            await self.cache.set(
+                key,
+                headers=headers,
+                variants={IDENTITY: body, **variants},
+                tag_versions=tag_versions,
+                ttl=route.ttl,
+            )
+        except RedisError:
+            logger.exception('Failed to save cached response %s', key)
+
+        return {
+            'headers': headers,
+            'body': variants.get(encoding or IDENTITY, body),
+            'encoding': encoding if encoding in variants else None,
+            'stored_at': time.time(),
+        }
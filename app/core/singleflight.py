@@ -0,0 +1,181 @@
+import asyncio
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Hashable
+
+from redis.asyncio import Redis
+from redis.asyncio.lock import Lock
+from redis.exceptions import LockError
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.redis import redis_client
+
+
+class _Call:
+    """In-flight call shared by its waiters."""
+
+    def __init__(self, task: asyncio.Future[Any]) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight call."""
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, _Call] = {}
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        """Remove finished call, so the next caller starts a new one."""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await result of the in-flight call with the same key or start a new one.
+
+        Result or exception of the call is delivered to every waiter. Cancelled waiter does not
+        affect the others, the call itself is cancelled only when no waiters are left.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+
+    def __len__(self) -> int:
+        """Get number of in-flight calls."""
+        return len(self._calls)
+
+
+class RedisSingleFlight:
+    """Single-flight of a key across all workers of the cluster based on Redis lock."""
+
+    def __init__(
+        self,
+        redis: Redis = redis_client,
+        *,
+        lock_timeout: float | None = None,
+        wait_timeout: float | None = None,
+        poll_interval: float | None = None,
+    ) -> None:
+        self._redis = redis
+        self.lock_timeout = lock_timeout or settings.CACHE_FILL_LOCK_TIMEOUT
+        self.wait_timeout = wait_timeout or settings.CACHE_FILL_WAIT_TIMEOUT
+        self.poll_interval = poll_interval or settings.CACHE_FILL_POLL_INTERVAL
+        self._local = SingleFlight()
+
+    def _lock_key(self, key: str) -> str:
+        """Get Redis key of the lock of the key."""
+        return f'{key}:lock'
+
+    async def do(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        *,
+        check: Callable[[], Awaitable[Any]],
+        fallback: Callable[[], Awaitable[Any]] | None = None,
+    ) -> Any:
+        """
+        Fill the key by the only worker while the others wait for the result.
+
+        Waiting workers poll the result by the check callable while the lock is held and take
+        the lock themselves only when it is released without the result, so the key is filled
+        by one worker at a time. A worker waiting longer than the wait timeout gets the value
+        of the fallback callable if there is one.
+        """
+        return await self._local.do(key, lambda: self._do(key, func, check, fallback))
+
+    async def _do(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        check: Callable[[], Awaitable[Any]],
+        fallback: Callable[[], Awaitable[Any]] | None,
+    ) -> Any:
+        """Call func under the lock or wait until another worker fills the key."""
+        deadline = asyncio.get_running_loop().time() + self.wait_timeout
+        while True:
+            ran, result = await self._call_under_lock(key, func)
+            if ran:
+                return result
+
+            result = await self._wait(key, check, fallback, deadline)
+            if result:
+                return result
+
+    async def _wait(
+        self,
+        key: str,
+        check: Callable[[], Awaitable[Any]],
+        fallback: Callable[[], Awaitable[Any]] | None,
+        deadline: float,
+    ) -> Any:
+        """Poll the result while the lock is held, None means the lock is released without it."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            result = await check()
+            if result:
+                return result
+            if fallback is not None and loop.time() >= deadline:
+                result = await fallback()
+                if result is not None:
+                    return result
+                fallback = None
+            if not await self._redis.exists(self._lock_key(key)):
+                return None
+
+    async def do_if_free(self, key: str, func: Callable[[], Awaitable[Any]]) -> bool:
+        """Call func unless another worker already holds the lock of the key."""
+        ran, _ = await self._call_under_lock(key, func)
+
+        return ran
+
+    async def _call_under_lock(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+    ) -> tuple[bool, Any]:
+        """
+        Call func if the lock is acquired and report whether it was called.
+
+        The lock is extended while func runs, so it does not expire before a slow fill ends
+        and only expires when its holder dies.
+        """
+        lock = self._redis.lock(self._lock_key(key), timeout=self.lock_timeout, blocking=False)
+        if not await lock.acquire():
+            return False, None
+
+        keeper = asyncio.create_task(self._keep_lock(lock))
+        try:
+            return True, await func()
+        finally:
+            keeper.cancel()
+            try:
+                await lock.release()
+            except LockError:
+                pass
+
+    async def _keep_lock(self, lock: Lock) -> None:
+        """Reset expiry of the held lock every third of its timeout."""
+        while True:
+            await asyncio.sleep(self.lock_timeout / 3)
+            try:
+                await lock.reacquire()
+            except RedisError:
+                return
+
+
+cache_fills = RedisSingleFlight()
@@ -0,0 +1,105 @@
+import gzip
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from starlette.datastructures import Headers
+
+from app.core.compression import CompressionMiddleware
+from app.core.compression import compress_variants
+from app.core.compression import negotiate_encoding
+
+BODY = b'{"rates": [' + b'0.5,' * 1000 + b'0.5]}'
+
+
+@pytest.mark.parametrize(('accept_encoding', 'encoding'), [
+    (None, None),
+    ('gzip', 'gzip'),
+    ('deflate, gzip;q=0.5', 'gzip'),
+    ('br, zstd, gzip', 'br'),
+    ('zstd;q=1, gzip;q=0.1', 'zstd'),
+    ('*', 'br'),
+    ('gzip;q=0', None),
+    ('gzip;q=0, *', 'br'),
+    ('br;q=0, *', 'zstd'),
+    ('gzip;q=0, br;q=0, zstd;q=0, *', None),
+    ('identity', None),
+])
+def test_negotiate_encoding(accept_encoding, encoding):
+    """Offered content coding is chosen in the order of server preference."""
+    assert negotiate_encoding(accept_encoding, ['br', 'zstd', 'gzip']) == encoding
+
+
+def test_compress_variants():
+    """Only large uncompressed responses get compressed variants."""
+    json_headers = Headers({'content-type': 'application/json'})
+
+    assert gzip.decompress(compress_variants(json_headers, BODY)['gzip']) == BODY
+    assert compress_variants(json_headers, b'{}') == {}
+    assert compress_variants(Headers({'content-encoding': 'gzip'}), BODY) == {}
+    assert compress_variants(Headers({'content-type': 'text/event-stream'}), BODY) == {}
+
+
+@pytest.mark.asyncio
+class TestCompressionMiddleware:
+    """Testing CompressionMiddleware."""
+
+    @pytest.fixture
+    def app(self):
+        """Application with large, small and streamed responses."""
+        app = FastAPI()
+        app.add_middleware(CompressionMiddleware)
+
+        @app.get('/large')
+        async def get_large():
+            return Response(BODY, media_type='application/json', headers={'ETag': '"3"'})
+
+        @app.get('/small')
+        async def get_small():
+            return Response(b'{}', media_type='application/json')
+
+        @app.get('/stream')
+        async def get_stream():
+            return StreamingResponse(iter([BODY, BODY]), media_type='application/json')
+
+        return app
+
+    async def request(self, app, path: str, accept_encoding: str) -> tuple[httpx.Response, bytes]:
+        """Request the application, get the response and its raw body."""
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url='http://test',
+        ) as client:
+            async with client.stream(
+                'GET',
+                path,
+                headers={'Accept-Encoding': accept_encoding},
+            ) as response:
+                content = b''.join([chunk async for chunk in response.aiter_raw()])
+
+        return response, content
+
+    async def test_compressed(self, app):
+        """Large response is compressed with the accepted coding."""
+        response, content = await self.request(app, '/large', 'gzip')
+
+        assert response.headers['content-encoding'] == 'gzip'
+        assert response.headers['vary'] == 'Accept-Encoding'
+        assert response.headers['etag'] == 'W/"3"'
+        assert int(response.headers['content-length']) == len(content)
+        assert gzip.decompress(content) == BODY
+
+    @pytest.mark.parametrize(('path', 'accept_encoding'), [
+        ('/large', ''),
+        ('/large', 'deflate'),
+        ('/small', 'gzip'),
+        ('/stream', 'gzip'),
+    ])
+    async def test_not_compressed(self, app, path, accept_encoding):
+        """Small and streamed responses and responses to clients without gzip are sent as is."""
+        response, content = await self.request(app, path, accept_encoding)
+
+        assert 'content-encoding' not in response.headers
+        assert content.startswith(b'{')
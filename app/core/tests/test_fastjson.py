@@ -0,0 +1,38 @@
+from unittest import mock
+
+import pytest
+
+from app.core import fastjson
+from app.core.fastjson import FastJSONResponse
+
+
+@pytest.mark.parametrize('orjson', [fastjson.orjson, None])
+class TestFastJSON:
+    """Testing fast JSON encoding with and without orjson."""
+
+    value = {'pair': 'USDAMD', 'rate': 400.5, 'description': '1 USD = 400.5 AMD', 'id': 1}
+
+    def test_roundtrip(self, orjson):
+        """Encoded value is decoded back."""
+        with mock.patch.object(fastjson, 'orjson', orjson):
+            assert fastjson.loads(fastjson.dumps(self.value)) == self.value
+
+    def test_compact_utf8(self, orjson):
+        """Value is encoded into compact UTF-8 JSON."""
+        with mock.patch.object(fastjson, 'orjson', orjson):
+            encoded = fastjson.dumps({'name': 'Դրամ', 'rate': 1})
+
+        assert encoded == '{"name":"Դրամ","rate":1}'.encode()
+
+    def test_invalid(self, orjson):
+        """Invalid JSON raises ValueError."""
+        with mock.patch.object(fastjson, 'orjson', orjson), pytest.raises(ValueError):
+            fastjson.loads(b'not json')
+
+    def test_response(self, orjson):
+        """Response body is rendered by the fast encoder."""
+        with mock.patch.object(fastjson, 'orjson', orjson):
+            response = FastJSONResponse([self.value])
+
+        assert response.media_type == 'application/json'
+        assert fastjson.loads(bytes(response.body)) == [self.value]
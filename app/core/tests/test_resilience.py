@@ -0,0 +1,93 @@
+from unittest import mock
+
+import pytest
+
+from app.core.resilience import CircuitBreaker
+from app.core.resilience import retry
+
+
+class TestCircuitBreaker:
+    """Testing CircuitBreaker."""
+
+    def test_opens_after_threshold(self):
+        """Circuit opens after consecutive failures and rejects calls."""
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=30)
+        breaker.record_failure()
+        assert breaker.allow() is True
+
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow() is False
+
+    def test_success_resets_failures(self):
+        """Successful call resets the failure counter."""
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=30)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_single_trial_after_recovery_timeout(self):
+        """Only one trial call is let through after recovery timeout."""
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=30)
+        with mock.patch('app.core.resilience.time.monotonic', return_value=100):
+            breaker.record_failure()
+
+        with mock.patch('app.core.resilience.time.monotonic', return_value=131):
+            assert breaker.allow() is True
+            assert breaker.allow() is False
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+
+            breaker.record_success()
+            assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_trial_opens_circuit(self):
+        """Failed trial call opens the circuit again."""
+        breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=30)
+        breaker.state = CircuitBreaker.HALF_OPEN
+
+        assert breaker.allow() is True
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow() is False
+
+
+@pytest.mark.asyncio
+class TestRetry:
+    """Testing function retry."""
+
+    async def test_retried_until_success(self):
+        """Retryable errors are retried with growing delays up to the maximum."""
+        func = mock.AsyncMock(side_effect=[ValueError, ValueError, 'result'])
+        with (
+            mock.patch('app.core.resilience.asyncio.sleep') as sleep,
+            mock.patch('app.core.resilience.random.uniform', side_effect=lambda _, b: b),
+        ):
+            result = await retry(
+                func,
+                attempts=3,
+                base_delay=0.5,
+                max_delay=0.8,
+                retry_on=(ValueError,),
+            )
+
+        assert result == 'result'
+        assert [call.args[0] for call in sleep.await_args_list] == [0.5, 0.8]
+
+    async def test_attempts_exhausted(self):
+        """The last error is raised when attempts are exhausted."""
+        func = mock.AsyncMock(side_effect=ValueError)
+        with mock.patch('app.core.resilience.asyncio.sleep'), pytest.raises(ValueError):
+            await retry(func, attempts=3, base_delay=0.1, max_delay=1, retry_on=(ValueError,))
+
+        assert func.await_count == 3
+
+    async def test_not_retryable_error(self):
+        """Errors which are not retryable are raised immediately."""
+        func = mock.AsyncMock(side_effect=KeyError)
+        with pytest.raises(KeyError):
+            await retry(func, attempts=3, base_delay=0.1, max_delay=1, retry_on=(ValueError,))
+
+        func.assert_awaited_once()
@@ -0,0 +1,95 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+class TestSingleFlightDo:
+    """Testing method do of SingleFlight."""
+
+    async def test_concurrent_calls_coalesced(self):
+        """Concurrent calls with the same key share one call."""
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return 'result'
+
+        func = mock.Mock(side_effect=call)
+        waiters = [asyncio.create_task(flight.do('key', func)) for _ in range(10)]
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await asyncio.gather(*waiters) == ['result'] * 10
+        func.assert_called_once()
+        assert not len(flight)
+
+    async def test_different_keys_not_coalesced(self):
+        """Calls with different keys are independent."""
+        flight = SingleFlight()
+        func = mock.AsyncMock(return_value='result')
+
+        await asyncio.gather(flight.do('first', func), flight.do('second', func))
+
+        assert func.await_count == 2
+
+    async def test_exception_propagated_to_every_waiter(self):
+        """Every waiter receives exception of the shared call."""
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            raise ValueError('upstream failed')
+
+        waiters = [asyncio.create_task(flight.do('key', call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    async def test_cancelled_waiter_does_not_affect_others(self):
+        """Cancellation of one waiter keeps the call running for the others."""
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return 'result'
+
+        first = asyncio.create_task(flight.do('key', call))
+        second = asyncio.create_task(flight.do('key', call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await second == 'result'
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    async def test_call_cancelled_without_waiters(self):
+        """Call is cancelled when all its waiters are cancelled."""
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def call():
+            started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.create_task(flight.do('key', call))
+        await started.wait()
+        waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+        assert not len(flight)
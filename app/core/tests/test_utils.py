@@ -0,0 +1,52 @@
+import pytest
+
+from app.core.utils import cache_headers
+from app.core.utils import etag_matches
+from app.core.utils import negotiate_media_type
+from app.core.utils import parse_rejected
+
+OFFERED = ['application/json', 'application/msgpack', 'application/octet-stream']
+
+
+@pytest.mark.parametrize(('accept', 'media_type'), [
+    (None, 'application/json'),
+    ('*/*', 'application/json'),
+    ('application/msgpack', 'application/msgpack'),
+    ('application/octet-stream;q=0.5, application/msgpack;q=0.9', 'application/msgpack'),
+    ('text/html, application/*;q=0.1', 'application/json'),
+    ('application/json;q=0, application/octet-stream', 'application/octet-stream'),
+    ('text/html', None),
+])
+def test_negotiate_media_type(accept, media_type):
+    """Preferred offered media type is chosen."""
+    assert negotiate_media_type(accept, OFFERED) == media_type
+
+
+def test_parse_rejected():
+    """Ranges with zero quality are rejected."""
+    assert parse_rejected('gzip;q=0, br;q=0.0, *;q=0.5, zstd') == {'gzip', 'br'}
+
+
+@pytest.mark.parametrize(('if_none_match', 'matches'), [
+    (None, False),
+    ('"2"', False),
+    ('"2", "3"', True),
+    ('W/"3"', True),
+    ('*', True),
+])
+def test_etag_matches(if_none_match, matches):
+    """Entity tag is matched against If-None-Match header."""
+    assert etag_matches(if_none_match, '"3"') is matches
+    assert etag_matches(if_none_match, 'W/"3"') is matches
+
+
+def test_cache_headers():
+    """Private responses vary by Authorization header."""
+    assert cache_headers(etag='"3"', last_modified=1700000000, max_age=10) == {
+        'ETag': '"3"',
+        'Last-Modified': 'Tue, 14 Nov 2023 22:13:20 GMT',
+        'Cache-Control': 'public, max-age=10',
+    }
+    assert cache_headers(etag='"3"', last_modified=0, max_age=0, private=True)['Vary'] == (
+        'Authorization'
+    )
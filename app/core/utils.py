@@ -1,6 +1,87 @@
+from email.utils import formatdate
+
 from fastapi import Query
 
 
 def parse_query_parameters_as_list_int(favorite_list: str = Query(example='1,2,3')):
     """Parse comma-separated query parameters."""
     return [int(pair_id) for pair_id in favorite_list.split(',')]
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check whether If-None-Match header matches the entity tag by weak comparison."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+
+    opaque_tag = etag.removeprefix('W/')
+    return opaque_tag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+
+
+def cache_headers(
+    *,
+    etag: str,
+    last_modified: float,
+    max_age: int,
+    private: bool = False,
+) -> dict[str, str]:
+    """Build validators and Cache-Control headers, private responses vary by Authorization."""
+    headers = {
+        'ETag': etag,
+        'Last-Modified': formatdate(last_modified, usegmt=True),
+        'Cache-Control': f'{"private" if private else "public"}, max-age={max_age}',
+    }
+    if private:
+        headers['Vary'] = 'Authorization'
+
+    return headers
+
+
+def _accept_qualities(accept: str) -> list[tuple[str, float]]:
+    """Get media ranges of Accept header with their qualities in the header order."""
+    qualities = []
+    for item in accept.split(','):
+        media_range, *params = (part.strip() for part in item.split(';'))
+        quality = 1.0
+        for name, _, value in (param.partition('=') for param in params):
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities.append((media_range.lower(), quality))
+
+    return qualities
+
+
+def parse_accept(accept: str) -> list[str]:
+    """Get media ranges of Accept header ordered by preference, rejected ones are skipped."""
+    ranges = sorted(
+        (-quality, position, media_range)
+        for position, (media_range, quality) in enumerate(_accept_qualities(accept))
+        if quality > 0
+    )
+
+    return [media_range for _, _, media_range in ranges]
+
+
+def parse_rejected(accept: str) -> set[str]:
+    """Get media ranges rejected by Accept header with zero quality."""
+    return {media_range for media_range, quality in _accept_qualities(accept) if quality <= 0}
+
+
+def negotiate_media_type(accept: str | None, offered: list[str]) -> str | None:
+    """Choose the offered media type preferred by Accept header, the first one by default."""
+    if not accept:
+        return offered[0]
+
+    for media_range in parse_accept(accept):
+        for media_type in offered:
+            if media_range in ('*/*', '*', media_type) or (
+                media_range.endswith('/*')
+                and media_type.startswith(media_range.removesuffix('*'))
+            ):
+                return media_type
+
+    return None
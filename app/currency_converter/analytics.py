@@ -0,0 +1,123 @@
+import math
+from typing import Any
+from typing import Literal
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+Resolution = Literal['daily', 'weekly', 'monthly']
+
+
+def bucket_starts(times: np.ndarray, resolution: Resolution) -> np.ndarray:
+    """Get start dates of buckets of the times, weeks start on Monday."""
+    days = times.astype('datetime64[D]')
+    if resolution == 'weekly':
+        # 1970-01-01 is Thursday, so Monday is 3 days after the start of an epoch week.
+        return days - (days.astype(np.int64) + 3) % 7
+    if resolution == 'monthly':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+
+    return days
+
+
+def cross_series(
+    base_times: np.ndarray,
+    base_quotes: np.ndarray,
+    target_times: np.ndarray,
+    target_quotes: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Derive series of rates from quotes of both currencies at the same times."""
+    times, base_index, target_index = np.intersect1d(
+        base_times,
+        target_times,
+        assume_unique=True,
+        return_indices=True,
+    )
+
+    return times, target_quotes[target_index] / base_quotes[base_index]
+
+
+def pair_series(
+    base: tuple[np.ndarray, np.ndarray] | None,
+    target: tuple[np.ndarray, np.ndarray] | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Derive series of pair rates from quote series, None is the source currency."""
+    if base is None:
+        if target is None:
+            return np.array([], dtype='datetime64[s]'), np.array([], dtype=np.float64)
+        return target
+    if target is None:
+        return base[0], 1 / base[1]
+
+    return cross_series(*base, *target)
+
+
+def ohlc(times: np.ndarray, rates: np.ndarray, resolution: Resolution) -> dict[str, np.ndarray]:
+    """
+    Downsample sorted series into buckets with open, high, low, close and mean rates.
+
+    Buckets are found by a single comparison of neighbour keys and aggregated by reduceat,
+    so the series is never iterated in Python.
+    """
+    if not len(times):
+        empty = np.array([], dtype=np.float64)
+        return {
+            'time': np.array([], dtype='datetime64[D]'),
+            'open': empty,
+            'high': empty,
+            'low': empty,
+            'close': empty,
+            'mean': empty,
+        }
+
+    keys = bucket_starts(times, resolution)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(rates)]
+
+    return {
+        'time': keys[starts],
+        'open': rates[starts],
+        'high': np.maximum.reduceat(rates, starts),
+        'low': np.minimum.reduceat(rates, starts),
+        'close': rates[ends - 1],
+        'mean': np.add.reduceat(rates, starts) / (ends - starts),
+    }
+
+
+def rolling(values: np.ndarray, window: int) -> dict[str, np.ndarray]:
+    """Get moving average and standard deviation, NaN until the window is full."""
+    sma = np.full(len(values), np.nan)
+    std = np.full(len(values), np.nan)
+    if len(values) >= window:
+        windows = sliding_window_view(values, window)
+        sma[window - 1:] = windows.mean(axis=1)
+        std[window - 1:] = windows.std(axis=1)
+
+    return {'sma': sma, 'std': std}
+
+
+def to_json_list(values: np.ndarray) -> list[Any]:
+    """Convert array to list with NaN replaced by None and dates by ISO strings."""
+    if values.dtype.kind == 'M':
+        return np.datetime_as_string(values, unit='D').tolist()
+
+    result = values.tolist()
+    if np.isnan(values).any():
+        return [None if math.isnan(value) else value for value in result]
+
+    return result
+
+
+def rate_series(
+    times: np.ndarray,
+    rates: np.ndarray,
+    *,
+    resolution: Resolution,
+    window: int | None = None,
+) -> dict[str, list[Any]]:
+    """Downsample series into OHLC buckets with rolling statistics of close rates."""
+    columns = ohlc(times, rates, resolution)
+    if window is not None:
+        columns.update(rolling(columns['close'], window))
+
+    return {name: to_json_list(values) for name, values in columns.items()}
@@ -0,0 +1,296 @@
+"""
+Bulk import of historical quotes from dumps or Exchangerate API.
+
+Dumps are CSV files with date (or ISO time), currency and quote columns, JSON Lines files with
+a date and quotes in every line, or JSON files in the format of timeframe responses. Quotes are
+streamed, loaded by COPY in chunks and merged into the store, so the import may be stopped
+and resumed from its checkpoint any time.
+
+Run from the repository root: python -m app.currency_converter.backfill --help
+"""
+import argparse
+import asyncio
+import csv
+import datetime as dt
+import itertools
+import json
+import logging
+import time
+from pathlib import Path
+from typing import AsyncIterable
+from typing import AsyncIterator
+from typing import Iterable
+from typing import Iterator
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core import fastjson
+from app.core.response_cache import response_cache
+from app.database import async_session
+
+from .history import HistoricalRateStore
+from .history import QuoteRow
+from .history import day_start
+from .models import HistoricalQuote
+from .providers import RateProvider
+from .providers import get_rate_provider
+
+logger = logging.getLogger(__name__)
+
+STAGING_TABLE = 'historical_quote_staging'
+
+
+class Checkpoint:
+    """Position of an import saved into a file after every loaded chunk."""
+
+    def __init__(self, path: Path | None, *, key: str) -> None:
+        self.path = path
+        self.key = key
+        self.rows = 0
+        self.last_date: dt.date | None = None
+        if path is not None and path.exists():
+            data = json.loads(path.read_text())
+            if data['key'] != key:
+                raise ValueError(f'Checkpoint {path} belongs to another import {data["key"]}.')
+            self.rows = data['rows']
+            self.last_date = data['last_date'] and dt.date.fromisoformat(data['last_date'])
+
+    def advance(self, rows: list[QuoteRow]) -> None:
+        """Move the position past the loaded rows and save it."""
+        self.rows += len(rows)
+        self.last_date = max(quoted_at for quoted_at, _, _ in rows).date()
+        if self.path is None:
+            return
+
+        temporary_path = self.path.with_suffix('.tmp')
+        temporary_path.write_text(json.dumps({
+            'key': self.key,
+            'rows': self.rows,
+            'last_date': self.last_date.isoformat(),
+        }))
+        temporary_path.replace(self.path)
+
+
+def parse_time(value: str) -> dt.datetime:
+    """Parse date as its midnight UTC or ISO time, naive time is UTC."""
+    if len(value) == 10:
+        return day_start(dt.date.fromisoformat(value))
+
+    quoted_at = dt.datetime.fromisoformat(value)
+    if quoted_at.tzinfo is None:
+        quoted_at = quoted_at.replace(tzinfo=dt.timezone.utc)
+
+    return quoted_at
+
+
+def parse_quotes(
+    when: str,
+    quotes: dict[str, float | str],
+    *,
+    source: str,
+) -> Iterator[QuoteRow]:
+    """Get rows of quotes keyed by currency or by pair with the source currency."""
+    quoted_at = parse_time(when)
+    for code, rate in quotes.items():
+        target = code
+        if len(code) == 6:
+            if not code.startswith(source):
+                raise ValueError(f'Quote {code} at {when} is not against currency {source}.')
+            target = code.removeprefix(source)
+        if target != source:
+            yield quoted_at, target, float(rate)
+
+
+def read_csv(path: Path, *, source: str) -> Iterator[QuoteRow]:
+    """Stream rows of CSV dump with date, currency and quote columns."""
+    with path.open(newline='') as file:
+        for row in csv.DictReader(file):
+            yield from parse_quotes(row['date'], {row['currency']: row['quote']}, source=source)
+
+
+def read_json(path: Path, *, source: str) -> Iterator[QuoteRow]:
+    """
+    Stream rows of JSON dump.
+
+    JSON Lines are parsed line by line, a JSON document in the format of timeframe response
+    is parsed at once.
+    """
+    with path.open('rb') as file:
+        if path.suffix == '.jsonl':
+            for line in file:
+                if line.strip():
+                    data = fastjson.loads(line)
+                    yield from parse_quotes(data['date'], data['quotes'], source=source)
+            return
+
+        data = fastjson.loads(file.read())
+
+    for day, quotes in data['quotes'].items():
+        yield from parse_quotes(day, quotes, source=source)
+
+
+async def fetch_timeframe(
+    provider: RateProvider,
+    *,
+    source: str,
+    start: dt.date,
+    end: dt.date,
+) -> AsyncIterator[QuoteRow]:
+    """Stream rows of daily quotes by chunks of dates the provider requests them by."""
+    async for quotes_by_date in provider.iter_historical_quotes(
+        source=source,
+        start_date=start,
+        end_date=end,
+    ):
+        for day in sorted(quotes_by_date):
+            for target, rate in quotes_by_date[day].items():
+                yield day_start(day), target, rate
+
+
+async def chunked(
+    rows: Iterable[QuoteRow] | AsyncIterable[QuoteRow],
+    size: int,
+) -> AsyncIterator[list[QuoteRow]]:
+    """Group rows into chunks of the size."""
+    if isinstance(rows, AsyncIterable):
+        chunk = []
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+        return
+
+    iterator = iter(rows)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class QuoteCopyLoader:
+    """
+    Bulk loader of quotes by COPY.
+
+    Rows are copied into a temporary staging table and merged into the partitioned store, so
+    loading the same rows again replaces them. Every chunk is committed by its own
+    transaction.
+    """
+
+    def __init__(self, db_session: AsyncSession, *, source: str) -> None:
+        self._session = db_session
+        self.source = source
+        self._store = HistoricalRateStore(db_session, source=source)
+
+    async def load(self, rows: list[QuoteRow]) -> int:
+        """Load the chunk of rows."""
+        times = [quoted_at for quoted_at, _, _ in rows]
+        await self._store.ensure_partitions(
+            min(times).astimezone(dt.timezone.utc).date(),
+            max(times).astimezone(dt.timezone.utc).date(),
+        )
+
+        table = HistoricalQuote.__tablename__
+        await self._session.execute(text(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (LIKE {table})',
+        ))
+        await self._session.execute(text(f'TRUNCATE {STAGING_TABLE}'))
+        connection = await self._session.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        await driver_connection.copy_records_to_table(  # type: ignore[union-attr]
+            STAGING_TABLE,
+            records=[(self.source, target, quoted_at, rate) for quoted_at, target, rate in rows],
+            columns=['source', 'target', 'quoted_at', 'rate'],
+        )
+        await self._session.execute(text(
+            f'INSERT INTO {table} (source, target, quoted_at, rate) '
+            f'SELECT DISTINCT ON (source, target, quoted_at) source, target, quoted_at, rate '
+            f'FROM {STAGING_TABLE} '
+            f'ON CONFLICT (source, target, quoted_at) DO UPDATE SET rate = EXCLUDED.rate',
+        ))
+        await self._session.commit()
+        await response_cache.invalidate('history')
+
+        return len(rows)
+
+
+async def backfill(
+    rows: Iterable[QuoteRow] | AsyncIterable[QuoteRow],
+    loader: QuoteCopyLoader,
+    checkpoint: Checkpoint,
+    *,
+    chunk_size: int | None = None,
+) -> tuple[int, float]:
+    """Load rows by chunks advancing the checkpoint, get the number of rows and rows/sec."""
+    chunk_size = chunk_size or settings.BACKFILL_CHUNK_SIZE
+    loaded = 0
+    started_at = time.perf_counter()
+    async for chunk in chunked(rows, chunk_size):
+        loaded += await loader.load(chunk)
+        checkpoint.advance(chunk)
+        elapsed = time.perf_counter() - started_at
+        logger.info(
+            'Loaded %s rows up to %s, %.0f rows/sec',
+            loaded,
+            checkpoint.last_date,
+            loaded / elapsed,
+        )
+
+    elapsed = time.perf_counter() - started_at
+
+    return loaded, loaded / elapsed if elapsed else 0.0
+
+
+def resume_rows(args: argparse.Namespace, checkpoint: Checkpoint):
+    """Get rows of the import starting from the checkpoint."""
+    if args.command == 'upstream':
+        start = max(args.start, checkpoint.last_date or args.start)
+        return fetch_timeframe(get_rate_provider(), source=args.source, start=start, end=args.end)
+
+    reader = read_csv if args.path.suffix == '.csv' else read_json
+
+    return itertools.islice(reader(args.path, source=args.source), checkpoint.rows, None)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--source', default=settings.RATE_SOURCE_CURRENCY)
+    parser.add_argument('--chunk-size', type=int, default=settings.BACKFILL_CHUNK_SIZE)
+    parser.add_argument('--checkpoint', type=Path, help='file to save and resume position')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    file_command = commands.add_parser('file', help='import CSV, JSON or JSON Lines dump')
+    file_command.add_argument('path', type=Path)
+
+    upstream_command = commands.add_parser('upstream', help='import from timeframe endpoint')
+    upstream_command.add_argument('--start', type=dt.date.fromisoformat, required=True)
+    upstream_command.add_argument('--end', type=dt.date.fromisoformat, required=True)
+
+    return parser.parse_args(argv)
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run the import and print its throughput."""
+    if args.command == 'upstream':
+        key = f'upstream:{args.source}:{args.start}:{args.end}'
+    else:
+        key = f'file:{args.source}:{args.path.resolve()}'
+    checkpoint = Checkpoint(args.checkpoint, key=key)
+
+    async with async_session() as db_session:
+        loaded, throughput = await backfill(
+            resume_rows(args, checkpoint),
+            QuoteCopyLoader(db_session, source=args.source),
+            checkpoint,
+            chunk_size=args.chunk_size,
+        )
+
+    print(f'Loaded {loaded} rows, {throughput:.0f} rows/sec, {checkpoint.rows} rows in total')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    asyncio.run(main(parse_args()))
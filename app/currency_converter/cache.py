@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+
+from redis.asyncio import Redis
+
+from app.config import settings
+from app.core import fastjson
+from app.core.invalidation import invalidation_bus
+from app.core.response_cache import response_cache
+from app.core.singleflight import cache_fills
+from app.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[Any]]
+
+MISSING = object()
+
+
+class LocalCache:
+    """
+    Worker-level size-bounded cache with TTL and LRU eviction.
+
+    Versions of values are remembered, so a value older than the known one is not saved and
+    the value is invalidated only by a newer version published by another worker.
+    """
+
+    def __init__(self, *, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get value if it is not expired and mark it as recently used."""
+        item = self._data.get(key)
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                self._evict(key)
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+
+        return item[1]
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: float | None = None,
+        *,
+        version: int | None = None,
+    ) -> None:
+        """Save value and evict least recently used ones above the size limit."""
+        if version is not None:
+            if version < self._versions.get(key, 0):
+                return
+            self._versions[key] = version
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._evict(next(iter(self._data)))
+
+    def _evict(self, key: str) -> None:
+        """Remove value with its known version, so versions are bounded by the size limit."""
+        del self._data[key]
+        self._versions.pop(key, None)
+
+    def delete(self, key: str) -> None:
+        """Remove value from cache."""
+        self._data.pop(key, None)
+
+    def invalidate(self, key: str, version: int) -> None:
+        """Remove value older than the version."""
+        if version <= self._versions.get(key, 0):
+            return
+
+        self._versions[key] = version
+        self.delete(key)
+
+    def invalidate_all(self) -> None:
+        """Remove all values keeping known versions."""
+        self._data.clear()
+
+    def clear(self) -> None:
+        """Remove all values and reset counters."""
+        self._data.clear()
+        self._versions.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """Get hit and miss counters."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data)}
+
+
+currencies_local_cache = LocalCache(
+    maxsize=settings.LOCAL_CACHE_MAXSIZE,
+    ttl=settings.CURRENCIES_LOCAL_CACHE_TTL,
+)
+rates_local_cache = LocalCache(
+    maxsize=settings.LOCAL_CACHE_MAXSIZE,
+    ttl=settings.RATES_LOCAL_CACHE_TTL,
+)
+series_local_cache = LocalCache(
+    maxsize=settings.SERIES_LOCAL_CACHE_MAXSIZE,
+    ttl=settings.SERIES_CACHE_TTL,
+)
+invalidation_bus.register(currencies_local_cache)
+invalidation_bus.register(rates_local_cache)
+invalidation_bus.register(series_local_cache)
+
+
+class RedisCache:
+    """
+    Cache of versioned JSON values in Redis with stale-while-revalidate.
+
+    Version of the value is taken by version_of or generated by the cache. New versions are
+    published to the invalidation bus, so other workers drop their local copies, and cached
+    responses with the tags are invalidated. Ephemeral values, such as ones keyed by user
+    input, are only kept for TTL plus grace period, without the last copy, version or
+    invalidation, so they leave nothing behind.
+    """
+
+    _refresh_tasks: dict[str, asyncio.Task[None]] = {}
+
+    def __init__(
+        self,
+        *,
+        prefix: str,
+        ttl: int,
+        grace: int,
+        redis: Redis = redis_client,
+        local: LocalCache | None = None,
+        version_of: Callable[[Any], int] | None = None,
+        tags: tuple[str, ...] = (),
+        ephemeral: bool = False,
+    ) -> None:
+        self.prefix = prefix
+        self.ttl = ttl
+        self.grace = grace
+        self._redis = redis
+        self._local = local
+        self._version_of = version_of
+        self.tags = tags
+        self.ephemeral = ephemeral
+
+    def _key(self, key: str) -> str:
+        """Get full Redis key."""
+        return f'{self.prefix}:{key}'
+
+    async def _get_entry(self, key: str) -> dict[str, Any] | None:
+        """Get cached entry with the value, its version and saving time."""
+        raw = await self._redis.get(self._key(key))
+
+        return None if raw is None else fastjson.loads(raw)
+
+    def _is_fresh(self, entry: dict[str, Any]) -> bool:
+        """Check whether the entry is saved less than TTL ago."""
+        return time.time() - entry['stored_at'] < self.ttl
+
+    async def get(self, key: str) -> tuple[Any, bool] | None:
+        """Get cached value and whether it is still fresh."""
+        entry = await self._get_entry(key)
+        if entry is None:
+            return None
+
+        return entry['value'], self._is_fresh(entry)
+
+    async def set(self, key: str, value: Any) -> None:
+        """
+        Save value, it is kept in Redis for TTL plus grace period.
+
+        The copy of the last non-ephemeral value is kept without expiry to fall back to it on
+        errors.
+        """
+        if self.ephemeral:
+            version = None
+        elif self._version_of is not None:
+            version = self._version_of(value)
+        else:
+            version = await self.next_version(key)
+
+        entry = fastjson.dumps({'stored_at': time.time(), 'version': version, 'value': value})
+        if self.ephemeral:
+            await self._redis.set(self._key(key), entry, ex=self.ttl + self.grace)
+        else:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.set(self._key(key), entry, ex=self.ttl + self.grace)
+                pipe.set(f'{self._key(key)}:last', entry)
+                await pipe.execute()
+
+        self._save_local(self._key(key), value, version)
+        if version is not None:
+            await invalidation_bus.publish(self._key(key), version)
+        if self.tags:
+            await response_cache.invalidate(*self.tags)
+
+    async def get_last(self, key: str) -> Any:
+        """Get the last saved value regardless of its expiry."""
+        raw = await self._redis.get(f'{self._key(key)}:last')
+
+        return None if raw is None else fastjson.loads(raw)['value']
+
+    async def next_version(self, key: str) -> int:
+        """Get next version number of the value."""
+        return await self._redis.incr(f'{self._key(key)}:version')
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Loader,
+        *,
+        revalidate: bool = True,
+        fallback_on: tuple[type[Exception], ...] = (),
+    ) -> Any:
+        """
+        Get value from cache or load and save it.
+
+        Fresh values are kept in the local cache in front of Redis. Stale value is returned
+        as is while the single background task refreshes it, unless revalidation is disabled
+        because the value is refreshed by somebody else. Missing value is loaded by the only
+        worker of the cluster, the others wait for it. If loading fails with one of fallback_on
+        errors, or takes longer than the others may wait, the last saved value is returned.
+        """
+        full_key = self._key(key)
+        if self._local is not None:
+            value = self._local.get(full_key, MISSING)
+            if value is not MISSING:
+                return value
+
+        entry = await self._get_entry(key)
+        if entry is not None:
+            if self._is_fresh(entry):
+                self._save_local(full_key, entry['value'], entry.get('version'))
+            elif revalidate:
+                self._schedule_refresh(key, loader)
+
+            return entry['value']
+
+        try:
+            return await cache_fills.do(
+                full_key,
+                lambda: self._load(key, loader),
+                check=lambda: self._get_value(key),
+                fallback=(lambda: self.get_last(key)) if fallback_on else None,
+            )
+        except fallback_on:
+            value = await self.get_last(key)
+            if value is None:
+                raise
+
+            logger.warning('Failed to load cache key %s, the last value is used', full_key)
+
+            return value
+
+    async def _get_value(self, key: str) -> Any:
+        """Get cached value regardless of its freshness."""
+        cached = await self.get(key)
+
+        return None if cached is None else cached[0]
+
+    async def _load(self, key: str, loader: Loader) -> Any:
+        """Load and save value."""
+        value = await loader()
+        await self.set(key, value)
+
+        return value
+
+    async def _revalidate(self, key: str, loader: Loader) -> None:
+        """Load and save value unless another worker has just refreshed it."""
+        cached = await self.get(key)
+        if cached is None or not cached[1]:
+            await self._load(key, loader)
+
+    def _save_local(self, full_key: str, value: Any, version: int | None) -> None:
+        """Save fresh value into the local cache unless a newer version is known."""
+        if self._local is not None:
+            self._local.set(full_key, value, version=version)
+
+    def _schedule_refresh(self, key: str, loader: Loader) -> None:
+        """Start refreshing of the key unless it is already being refreshed by this worker."""
+        full_key = self._key(key)
+        if full_key in self._refresh_tasks:
+            return
+
+        task = asyncio.create_task(self._refresh(key, loader))
+        self._refresh_tasks[full_key] = task
+        task.add_done_callback(lambda _: self._refresh_tasks.pop(full_key, None))
+
+    async def _refresh(self, key: str, loader: Loader) -> None:
+        """
+        Refresh stale value, errors are logged to keep serving stale one.
+
+        Refresh is skipped when another worker is already refreshing the value.
+        """
+        try:
+            await cache_fills.do_if_free(self._key(key), lambda: self._revalidate(key, loader))
+        except Exception:
+            logger.exception('Failed to refresh cache key %s', self._key(key))
@@ -1,17 +1,40 @@
+import asyncio
+import datetime as dt
 from typing import TypedDict
+from typing import cast
 from urllib.parse import urljoin
 
 import httpx
 
 from app.config import settings
+from app.core import fastjson
 from app.core.exceptions import BaseClientError
+from app.core.ratelimit import RedisTokenBucket
+from app.core.resilience import CircuitBreaker
+from app.core.resilience import retry
+from app.core.singleflight import SingleFlight
+from app.http_client import create_http_client
+from app.http_client import http_pool
 
 ResponseDict = TypedDict('ResponseDict', {
     'success': str,
+    'timestamp': int,
+    'source': str,
     'quotes': dict[str, float],
     'currencies': dict[str, str],
 })
 
+upstream_requests = SingleFlight()
+exchangerate_breaker = CircuitBreaker(
+    failure_threshold=settings.EXCHANGERATE_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.EXCHANGERATE_BREAKER_RECOVERY_TIMEOUT,
+)
+exchangerate_quota = RedisTokenBucket(
+    key='exchangerate:quota',
+    capacity=settings.EXCHANGERATE_QUOTA_BURST,
+    refill_rate=settings.EXCHANGERATE_MONTHLY_QUOTA / (30 * 24 * 3600),
+) if settings.EXCHANGERATE_MONTHLY_QUOTA else None
+
 
 class ExchangerateClient:
     """The client for interaction with Exchangerate API."""
@@ -25,27 +48,96 @@ class ExchangerateClient:
 
         message = 'Unknown error from third party service.'
 
-    def __init__(self) -> None:
+    class UnavailableError(UnknownClientError):
+
+        message = 'Third party service is temporarily unavailable.'
+
+    class QuotaExceededError(UnavailableError):
+
+        message = 'Request quota of third party service is exhausted.'
+
+    class ServerError(BaseClientError):
+        """Third party service failed to process request, it may be retried."""
+
+    def __init__(
+        self,
+        httpx_client: httpx.AsyncClient | None = None,
+        *,
+        coalesce: bool = True,
+    ) -> None:
         self.url = settings.EXCHANGERATE_URL.unicode_string()
         self.access_key = settings.EXCHANGERATE_ACCESS_KEY
-        self._httpx_client = httpx.AsyncClient()
+        self.coalesce = coalesce
+
+        shared_client = httpx_client or http_pool.client
+        self._owns_httpx_client = shared_client is None
+        self._httpx_client = shared_client or create_http_client()
 
     async def __aenter__(self):
         """Return client instance."""
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """Close _httpx_client."""
-        await self._httpx_client.aclose()
+        """Close _httpx_client unless it is shared between clients."""
+        if self._owns_httpx_client:
+            await self._httpx_client.aclose()
 
     async def _get(self, url: str, *, params=None) -> ResponseDict:
-        """Send GET request."""
+        """
+        Send GET request, concurrent identical requests share one in-flight request.
+
+        Client without coalescing always sends its own request, e.g. the hedged one.
+        """
         if not params:
             params = {}
         params.update({'access_key': self.access_key})
+        if not self.coalesce:
+            return await self._request(url, params)
+
+        key = (url, tuple(sorted(params.items())))
+
+        return await upstream_requests.do(key, lambda: self._request(url, params))
+
+    async def _send(self, url: str, params: dict[str, str]) -> ResponseDict:
+        """Send single GET request within the request quota and decode response."""
+        if exchangerate_quota is not None and not await exchangerate_quota.acquire(
+            timeout=settings.EXCHANGERATE_QUOTA_WAIT_TIMEOUT,
+        ):
+            raise self.QuotaExceededError()
 
         response = await self._httpx_client.get(url, params=params)
-        response_data = response.json()
+        if response.status_code >= 500:
+            raise self.ServerError()
+
+        try:
+            return fastjson.loads(response.content)
+        except ValueError as exc:
+            raise self.ServerError() from exc
+
+    async def _request(self, url: str, params: dict[str, str]) -> ResponseDict:
+        """
+        Send GET request to Exchangerate API and check response.
+
+        Transport and server errors are retried with backoff within the deadline. Failures
+        are counted by the circuit breaker, while it is open requests fail fast.
+        """
+        if not exchangerate_breaker.allow():
+            raise self.UnavailableError()
+
+        try:
+            async with asyncio.timeout(settings.EXCHANGERATE_DEADLINE):
+                response_data = await retry(
+                    lambda: self._send(url, params),
+                    attempts=settings.EXCHANGERATE_RETRY_ATTEMPTS,
+                    base_delay=settings.EXCHANGERATE_RETRY_BASE_DELAY,
+                    max_delay=settings.EXCHANGERATE_RETRY_MAX_DELAY,
+                    retry_on=(httpx.TransportError, self.ServerError),
+                )
+        except (httpx.HTTPError, TimeoutError, self.ServerError) as exc:
+            exchangerate_breaker.record_failure()
+            raise self.UnknownClientError() from exc
+
+        exchangerate_breaker.record_success()
 
         try:
             if not response_data['success']:
@@ -69,17 +161,89 @@ class ExchangerateClient:
 
     async def get_rate(self, *, base: str, target: str) -> dict[str, str | float]:
         """Get currency rate."""
+        rates = await self.get_rates(base=base, targets=[target])
+
+        return rates[0]
+
+    async def get_rates(self, *, base: str, targets: list[str]) -> list[dict[str, str | float]]:
+        """Get rates of several target currencies against one base by single request."""
         params = {
             'source': base,
-            'currencies': target,
+            'currencies': ','.join(targets),
         }
         url = urljoin(self.url, 'live')
         response_data = await self._get(url, params=params)
 
-        pair = base + target
+        rates: list[dict[str, str | float]] = []
+        for target in targets:
+            pair = base + target
+            try:
+                rate = response_data['quotes'][pair]
+            except KeyError:
+                raise self.UnknownClientError()
+
+            rates.append({'base': base, 'target': target, 'pair': pair, 'rate': rate})
+
+        return rates
+
+    async def get_quotes(self, *, source: str) -> dict[str, str | int | dict[str, float]]:
+        """Get quotes of all available currencies against the source currency."""
+        url = urljoin(self.url, 'live')
+        response_data = await self._get(url, params={'source': source})
+
         try:
-            rate = response_data['quotes'][pair]
-        except KeyError:
+            quotes = {
+                pair.removeprefix(source): rate
+                for pair, rate in response_data['quotes'].items()
+                if pair != source + source
+            }
+        except (KeyError, AttributeError):
             raise self.UnknownClientError()
 
-        return {'base': base, 'target': target, 'pair': pair, 'rate': rate}
+        return {
+            'source': source,
+            'timestamp': response_data.get('timestamp', 0),
+            'quotes': quotes,
+        }
+
+    async def get_historical_quotes(
+        self,
+        *,
+        source: str,
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> dict[dt.date, dict[str, float]]:
+        """
+        Get daily quotes of all available currencies against the source currency.
+
+        A single day is requested from historical endpoint, a range from timeframe one. The
+        range must not be longer than the limit of Exchangerate API, a year.
+        """
+        if start_date == end_date:
+            url = urljoin(self.url, 'historical')
+            params = {'source': source, 'date': start_date.isoformat()}
+        else:
+            url = urljoin(self.url, 'timeframe')
+            params = {
+                'source': source,
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+            }
+        response_data = await self._get(url, params=params)
+
+        try:
+            if start_date == end_date:
+                quotes_by_date = {start_date.isoformat(): response_data['quotes']}
+            else:
+                quotes_by_date = cast(dict[str, dict[str, float]], response_data['quotes'])
+
+            return {
+                dt.date.fromisoformat(day): {
+                    pair.removeprefix(source): rate
+                    for pair, rate in quotes.items()
+                    if pair != source + source
+                }
+                for day, quotes in quotes_by_date.items()
+            }
+        except (KeyError, AttributeError, TypeError, ValueError):
+            raise self.UnknownClientError()
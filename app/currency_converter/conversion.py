@@ -0,0 +1,173 @@
+from decimal import Decimal
+from decimal import InvalidOperation
+from decimal import localcontext
+from typing import Iterable
+from typing import Sequence
+
+import numpy as np
+
+from app.config import settings
+
+from .rates import QuoteSnapshot
+
+# ISO 4217 minor units differing from 2 decimal places, crypto and metals by convention.
+MINOR_UNITS = {
+    'BHD': 3, 'BIF': 0, 'BTC': 8, 'CLF': 4, 'CLP': 0, 'DJF': 0, 'GNF': 0, 'IQD': 3,
+    'ISK': 0, 'JOD': 3, 'JPY': 0, 'KMF': 0, 'KRW': 0, 'KWD': 3, 'LYD': 3, 'OMR': 3,
+    'PYG': 0, 'RWF': 0, 'TND': 3, 'UGX': 0, 'UYI': 0, 'VND': 0, 'VUV': 0, 'XAF': 0,
+    'XAG': 4, 'XAU': 4, 'XOF': 0, 'XPF': 0,
+}
+
+Amounts = Sequence[float] | np.ndarray
+Codes = str | Sequence[str]
+
+
+def minor_unit(code: str) -> int:
+    """Get the number of decimal places of the currency."""
+    return settings.CURRENCY_MINOR_UNITS.get(code, MINOR_UNITS.get(code, 2))
+
+
+def to_decimal(value: float | str | Decimal) -> Decimal:
+    """Convert value to Decimal, floats by their shortest representation."""
+    if isinstance(value, Decimal):
+        return value
+
+    return Decimal(repr(value) if isinstance(value, float) else value)
+
+
+def multiply(amounts: Amounts, rates: Amounts) -> np.ndarray:
+    """Multiply amounts by rates in one vectorized pass, missing rates and overflows give NaN."""
+    with np.errstate(over='ignore'):
+        products = np.asarray(amounts, dtype=np.float64) * np.asarray(rates, dtype=np.float64)
+    products[~np.isfinite(products)] = np.nan
+
+    return products
+
+
+def multiply_exact(
+    amounts: Iterable[float | str | Decimal],
+    rates: Iterable[float | str | Decimal],
+    targets: Iterable[str],
+    *,
+    rounding: str | None = None,
+) -> list[Decimal | None]:
+    """
+    Multiply amounts by rates in Decimal and round to minor units of target currencies.
+
+    Result which does not fit 34 significant digits with the minor units is None.
+    """
+    rounding = rounding or settings.CONVERSION_ROUNDING
+    quanta: dict[str, Decimal] = {}
+    results: list[Decimal | None] = []
+    with localcontext() as context:
+        context.prec = 34
+        for amount, rate, target in zip(amounts, rates, targets):
+            quantum = quanta.get(target)
+            if quantum is None:
+                quantum = quanta[target] = Decimal(1).scaleb(-minor_unit(target))
+            result = to_decimal(amount) * to_decimal(rate)
+            try:
+                results.append(result.quantize(quantum, rounding=rounding))
+            except InvalidOperation:
+                results.append(None)
+
+    return results
+
+
+class AmountConverter:
+    """
+    Converter of arrays of amounts by cross rates of a quotes snapshot.
+
+    Float mode converts whole arrays by NumPy. Exact mode derives rates and results in Decimal
+    and rounds them to minor units of target currencies, it is slower and meant for
+    reconciliation.
+    """
+
+    def __init__(self, snapshot: QuoteSnapshot, *, rounding: str | None = None) -> None:
+        self.snapshot = snapshot
+        self.rounding = rounding or settings.CONVERSION_ROUNDING
+        self.codes = [snapshot.source, *snapshot.quotes]
+        self._positions = {code: position for position, code in enumerate(self.codes)}
+        self._quotes = np.array([1.0, *snapshot.quotes.values()], dtype=np.float64)
+        order = np.argsort(self.codes)
+        self._sorted_codes = np.array(self.codes)[order]
+        self._sorted_positions = order
+
+    def _quotes_of(self, codes: Codes, size: int) -> float | np.ndarray:
+        """
+        Get quotes of currencies, single code gives a scalar broadcast by NumPy.
+
+        Arrays of codes are looked up by binary search over the sorted codes.
+        """
+        if isinstance(codes, str):
+            if codes not in self._positions:
+                raise ValueError(f'No quote for currency {codes}.')
+            return self._quotes[self._positions[codes]]
+
+        code_array = np.asarray(codes)
+        if len(code_array) != size:
+            raise ValueError('Currencies and amounts have different lengths.')
+
+        found = np.minimum(np.searchsorted(self._sorted_codes, code_array), len(self.codes) - 1)
+        missing = self._sorted_codes[found] != code_array
+        if missing.any():
+            raise ValueError(f'No quote for currency {code_array[missing.argmax()]}.')
+
+        return self._quotes[self._sorted_positions[found]]
+
+    def rates(self, *, base: Codes, target: Codes, size: int = 1) -> float | np.ndarray:
+        """Get cross rates of base and target currencies."""
+        return self._quotes_of(target, size) / self._quotes_of(base, size)
+
+    def convert(self, amounts: Amounts, *, base: Codes, target: Codes) -> np.ndarray:
+        """Convert amounts from base to target currencies as floats."""
+        amounts = np.asarray(amounts, dtype=np.float64)
+
+        return amounts * self.rates(base=base, target=target, size=len(amounts))
+
+    def exact_rate(self, *, base: str, target: str) -> Decimal:
+        """Get cross rate of the pair in Decimal."""
+        if base == target:
+            return Decimal(1)
+
+        with localcontext() as context:
+            context.prec = 34
+            base_quote = Decimal(1) if base == self.snapshot.source else to_decimal(
+                self.snapshot.quotes[base],
+            )
+            target_quote = Decimal(1) if target == self.snapshot.source else to_decimal(
+                self.snapshot.quotes[target],
+            )
+
+            return target_quote / base_quote
+
+    def convert_exact(
+        self,
+        amounts: Iterable[float | str | Decimal],
+        *,
+        base: Codes,
+        target: Codes,
+    ) -> list[Decimal | None]:
+        """
+        Convert amounts from base to target currencies in Decimal rounded to minor units.
+
+        Result which does not fit Decimal precision is None.
+        """
+        amounts = list(amounts)
+        bases = [base] * len(amounts) if isinstance(base, str) else base
+        targets = [target] * len(amounts) if isinstance(target, str) else target
+        if not len(bases) == len(targets) == len(amounts):
+            raise ValueError('Currencies and amounts have different lengths.')
+
+        exact_rates: dict[tuple[str, str], Decimal] = {}
+        rates = []
+        try:
+            for pair in zip(bases, targets):
+                rate = exact_rates.get(pair)
+                if rate is None:
+                    rate = exact_rates[pair] = self.exact_rate(base=pair[0], target=pair[1])
+                rates.append(rate)
+        except KeyError as exc:
+            raise ValueError(f'No quote for currency {exc.args[0]}.') from exc
+
+        return multiply_exact(amounts, rates, targets, rounding=self.rounding)
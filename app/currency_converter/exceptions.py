@@ -18,6 +18,20 @@ class CurrencyNotAvailableError(CustomApiError):
     status_code = status.HTTP_400_BAD_REQUEST
 
 
+class HistoricalRateNotFoundError(CustomApiError):
+    """No historical rate for the date."""
+
+    detail = 'No historical rate for the date.'
+    status_code = status.HTTP_404_NOT_FOUND
+
+
+class NotAcceptableError(CustomApiError):
+    """None of acceptable media types is supported."""
+
+    detail = 'None of acceptable media types is supported.'
+    status_code = status.HTTP_406_NOT_ACCEPTABLE
+
+
 class CustomValidationError(CustomApiError):
     """Validation error instead of unhandled Pydantic ValidationError."""
 
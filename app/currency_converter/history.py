@@ -0,0 +1,180 @@
+import datetime as dt
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import Sequence
+
+import numpy as np
+from sqlalchemy import BigInteger
+from sqlalchemy import Row
+from sqlalchemy import cast
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.response_cache import response_cache
+
+from .models import HistoricalQuote
+from .rates import QuoteSnapshot
+
+QuoteRow = tuple[dt.datetime, str, float]
+
+
+def month_ranges(start: dt.date, end: dt.date) -> Iterator[tuple[dt.date, dt.date]]:
+    """Get bounds of months covering the dates, the upper bound is exclusive."""
+    month = start.replace(day=1)
+    while month <= end:
+        next_month = (month + dt.timedelta(days=32)).replace(day=1)
+        yield month, next_month
+        month = next_month
+
+
+def day_start(day: dt.date) -> dt.datetime:
+    """Get midnight UTC of the date."""
+    return dt.datetime.combine(day, dt.time(), tzinfo=dt.timezone.utc)
+
+
+class HistoricalRateStore:
+    """
+    Store of historical quotes against the source currency in Postgres.
+
+    Rates of pairs are derived from stored quotes the same way as from the live snapshot. Rate
+    of a date is the last quote within that day, so intraday quotes win over daily ones.
+    """
+
+    def __init__(self, db_session: AsyncSession, *, source: str | None = None) -> None:
+        self._session = db_session
+        self.source = source or settings.RATE_SOURCE_CURRENCY
+
+    async def ensure_partitions(self, start: dt.date, end: dt.date) -> None:
+        """Create monthly partitions covering the dates unless they exist."""
+        table = HistoricalQuote.__tablename__
+        for lower, upper in month_ranges(start, end):
+            await self._session.execute(text(
+                f'CREATE TABLE IF NOT EXISTS {table}_y{lower.year}m{lower.month:02d} '
+                f'PARTITION OF {table} '
+                f"FOR VALUES FROM ('{lower.isoformat()} 00:00:00+00') "
+                f"TO ('{upper.isoformat()} 00:00:00+00')",
+            ))
+
+    async def save(self, rows: Iterable[QuoteRow]) -> int:
+        """Save quotes given as (time, currency, quote), existing ones are replaced."""
+        values: list[dict[str, Any]] = [
+            {'source': self.source, 'target': target, 'quoted_at': quoted_at, 'rate': rate}
+            for quoted_at, target, rate in rows
+        ]
+        if not values:
+            return 0
+
+        times = [value['quoted_at'] for value in values]
+        await self.ensure_partitions(
+            min(times).astimezone(dt.timezone.utc).date(),
+            max(times).astimezone(dt.timezone.utc).date(),
+        )
+        statement = insert(HistoricalQuote)
+        await self._session.execute(
+            statement.on_conflict_do_update(
+                index_elements=['source', 'target', 'quoted_at'],
+                set_={'rate': statement.excluded.rate},
+            ),
+            values,
+        )
+        await self._session.commit()
+        await response_cache.invalidate('history')
+
+        return len(values)
+
+    async def save_snapshot(self, snapshot: QuoteSnapshot) -> int:
+        """Save quotes of the live snapshot as intraday ones."""
+        quoted_at = dt.datetime.fromtimestamp(snapshot.timestamp, tz=dt.timezone.utc)
+
+        return await self.save(
+            (quoted_at, target, rate)
+            for target, rate in snapshot.quotes.items()
+        )
+
+    async def save_daily(self, quotes_by_date: dict[dt.date, dict[str, float]]) -> int:
+        """Save daily quotes by date."""
+        return await self.save(
+            (day_start(day), target, rate)
+            for day, quotes in quotes_by_date.items()
+            for target, rate in quotes.items()
+        )
+
+    async def get_snapshot(self, day: dt.date, codes: Iterable[str]) -> QuoteSnapshot:
+        """
+        Get the last quotes of the currencies within the day.
+
+        The query is bounded by the day, so only one partition is scanned. Currencies without
+        quotes are missing in the snapshot.
+        """
+        targets = {code for code in codes if code != self.source}
+        rows: Sequence[Row[Any]] = ()
+        if targets:
+            result = await self._session.execute(
+                select(HistoricalQuote.target, HistoricalQuote.rate, HistoricalQuote.quoted_at)
+                .distinct(HistoricalQuote.target)
+                .where(
+                    HistoricalQuote.source == self.source,
+                    HistoricalQuote.target.in_(targets),
+                    HistoricalQuote.quoted_at >= day_start(day),
+                    HistoricalQuote.quoted_at < day_start(day + dt.timedelta(days=1)),
+                )
+                .order_by(HistoricalQuote.target, HistoricalQuote.quoted_at.desc()),
+            )
+            rows = result.all()
+
+        timestamps = [quoted_at.timestamp() for _, _, quoted_at in rows]
+
+        return QuoteSnapshot(
+            source=self.source,
+            timestamp=int(max(timestamps, default=day_start(day).timestamp())),
+            quotes={target: rate for target, rate, _ in rows},
+        )
+
+    async def get_series(
+        self,
+        codes: Iterable[str],
+        *,
+        start: dt.date,
+        end: dt.date,
+    ) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        Get quotes of the currencies over the dates by a single range query.
+
+        Quotes of every currency are arrays of times and quotes sorted by time, the source
+        currency has no quotes. Currencies without quotes get empty arrays.
+        """
+        targets = sorted({code for code in codes if code != self.source})
+        rows: Sequence[Row[Any]] = ()
+        if targets:
+            result = await self._session.execute(
+                select(
+                    HistoricalQuote.target,
+                    cast(func.extract('epoch', HistoricalQuote.quoted_at), BigInteger),
+                    HistoricalQuote.rate,
+                )
+                .where(
+                    HistoricalQuote.source == self.source,
+                    HistoricalQuote.target.in_(targets),
+                    HistoricalQuote.quoted_at >= day_start(start),
+                    HistoricalQuote.quoted_at < day_start(end + dt.timedelta(days=1)),
+                )
+                .order_by(HistoricalQuote.target, HistoricalQuote.quoted_at),
+            )
+            rows = result.all()
+
+        columns = list(zip(*rows)) or [(), (), ()]
+        codes_column = np.array(columns[0], dtype='U3')
+        times_column = np.array(columns[1], dtype=np.int64).astype('datetime64[s]')
+        quotes_column = np.array(columns[2], dtype=np.float64)
+
+        series = {}
+        for target in targets:
+            mask = codes_column == target
+            series[target] = times_column[mask], quotes_column[mask]
+
+        return series
@@ -0,0 +1,111 @@
+from typing import Any
+
+import numpy as np
+
+from app.config import settings
+from app.core import fastjson
+from app.core.compression import compress
+
+from .cache import LocalCache
+from .rates import QuoteSnapshot
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+BUFFER = 'application/octet-stream'
+
+DTYPES: dict[str, np.dtype[Any]] = {'float64': np.dtype('<f8'), 'float32': np.dtype('<f4')}
+
+
+def media_types() -> list[str]:
+    """Get media types the matrix may be encoded into."""
+    if msgpack is None:
+        return [JSON, BUFFER]
+
+    return [JSON, MSGPACK, BUFFER]
+
+
+class RateMatrix:
+    """
+    Matrix of cross rates of all currencies of a quotes snapshot.
+
+    Rate of base currency i in target currency j is in row i and column j. The matrix is built
+    by a single outer division and every encoding of it, compressed ones too, is built once.
+    """
+
+    def __init__(self, snapshot: QuoteSnapshot, *, exclude: frozenset[str] = frozenset()) -> None:
+        self.source = snapshot.source
+        self.timestamp = snapshot.timestamp
+        self.version = snapshot.version
+        self.codes = [
+            code
+            for code in [snapshot.source, *snapshot.quotes]
+            if code not in exclude
+        ]
+        quotes = np.array(
+            [1.0 if code == snapshot.source else snapshot.quotes[code] for code in self.codes],
+            dtype=np.float64,
+        )
+        self.rates = np.divide.outer(quotes, quotes).T
+        self._payloads: dict[tuple[str, str, str | None], bytes] = {}
+
+    def _header(self) -> dict[str, str | int | list[str]]:
+        """Get snapshot description and code index of the matrix."""
+        return {
+            'source': self.source,
+            'timestamp': self.timestamp,
+            'version': self.version,
+            'codes': self.codes,
+        }
+
+    def encode(
+        self,
+        media_type: str,
+        dtype: str = 'float64',
+        encoding: str | None = None,
+    ) -> bytes:
+        """Encode the matrix into the media type and content coding once per dtype."""
+        key = (media_type, dtype, encoding)
+        payload = self._payloads.get(key)
+        if payload is None:
+            if encoding is None:
+                payload = self._encode(media_type, DTYPES[dtype])
+            else:
+                payload = compress(self.encode(media_type, dtype), encoding)
+            self._payloads[key] = payload
+
+        return payload
+
+    def _encode(self, media_type: str, dtype: np.dtype) -> bytes:
+        """Encode the matrix with values of the dtype."""
+        rates = self.rates.astype(dtype)
+        if media_type == BUFFER:
+            return rates.tobytes(order='C')
+        if media_type == MSGPACK:
+            return msgpack.packb(
+                {**self._header(), 'rates': rates.tolist()},
+                use_single_float=dtype == DTYPES['float32'],
+            )
+
+        return fastjson.dumps({**self._header(), 'rates': rates.tolist()})
+
+
+rate_matrices = LocalCache(
+    maxsize=4,
+    ttl=settings.RATE_CACHE_TTL + settings.RATE_CACHE_GRACE,
+)
+
+
+def get_rate_matrix(snapshot: QuoteSnapshot, *, exclude: frozenset[str]) -> RateMatrix:
+    """Get matrix of the snapshot, it is built once per snapshot version."""
+    key = f'{snapshot.source}:{snapshot.version}'
+    matrix = rate_matrices.get(key)
+    if matrix is None:
+        matrix = RateMatrix(snapshot, exclude=exclude)
+        rate_matrices.set(key, matrix)
+
+    return matrix
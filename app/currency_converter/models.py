@@ -0,0 +1,32 @@
+from sqlalchemy import Column
+from sqlalchemy import DateTime
+from sqlalchemy import Float
+from sqlalchemy import Index
+from sqlalchemy import PrimaryKeyConstraint
+from sqlalchemy import String
+
+from app.database import Base
+
+
+class HistoricalQuote(Base):
+    """
+    Model class for storing historical quotes of currencies against the source currency.
+
+    Daily quotes are stored at midnight UTC of their date, intraday ones at the time of the
+    snapshot. The table is partitioned by month of quote time, partitions are created by
+    writers on demand. Primary key serves lookups of currencies at a time, BRIN index serves
+    range scans of all currencies over a period.
+    """
+
+    __tablename__ = 'historical_quote'
+
+    source = Column(String(3), nullable=False)
+    target = Column(String(3), nullable=False)
+    quoted_at = Column(DateTime(timezone=True), nullable=False)
+    rate = Column(Float, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('source', 'target', 'quoted_at'),
+        Index('ix_historical_quote_quoted_at', 'quoted_at', postgresql_using='brin'),
+        {'postgresql_partition_by': 'RANGE (quoted_at)'},
+    )
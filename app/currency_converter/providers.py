@@ -0,0 +1,334 @@
+import asyncio
+import datetime as dt
+import json
+import time
+from abc import ABC
+from abc import abstractmethod
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+
+from app.config import settings
+from app.core.exceptions import BaseClientError
+
+from .clients import ExchangerateClient
+
+DEFAULT_QUOTES_FILE = Path(__file__).parent / 'fixtures' / 'quotes.json'
+
+QuotesDict = dict[str, str | int | dict[str, float]]
+RatesList = list[dict[str, str | float]]
+HistoricalQuotesDict = dict[dt.date, dict[str, float]]
+
+
+class RateProvider(ABC):
+    """
+    Interface of currency rates providers.
+
+    Providers which are not live serve fixed quotes, they may replace live ones offline but
+    must not hedge them.
+    """
+
+    live = True
+
+    class ProviderError(BaseClientError):
+        """Provider failed to get requested data."""
+
+        def __init__(self, message) -> None:
+            self.message = message
+
+    @abstractmethod
+    async def get_available_currencies(self) -> dict[str, str]:
+        """Get available currencies with their names."""
+
+    @abstractmethod
+    async def get_quotes(self, *, source: str) -> QuotesDict:
+        """Get quotes of all available currencies against the source currency."""
+
+    @abstractmethod
+    async def get_rates(self, *, base: str, targets: list[str]) -> RatesList:
+        """Get rates of target currencies against the base currency."""
+
+    @abstractmethod
+    async def get_historical_quotes(
+        self,
+        *,
+        source: str,
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> HistoricalQuotesDict:
+        """Get daily quotes of all available currencies against the source currency by date."""
+
+    async def iter_historical_quotes(
+        self,
+        *,
+        source: str,
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> AsyncIterator[HistoricalQuotesDict]:
+        """Stream daily quotes of the range by chunks of dates, the whole range by default."""
+        yield await self.get_historical_quotes(
+            source=source,
+            start_date=start_date,
+            end_date=end_date,
+        )
+
+
+PROVIDER_ERRORS = (
+    ExchangerateClient.ClientError,
+    ExchangerateClient.UnknownClientError,
+    RateProvider.ProviderError,
+)
+
+
+class ExchangerateProvider(RateProvider):
+    """
+    Rates provider backed by Exchangerate API.
+
+    Provider hedging another one must not coalesce its requests, otherwise the hedged request
+    would join the in-flight primary one instead of being sent.
+    """
+
+    def __init__(self, *, coalesce: bool = True) -> None:
+        self.coalesce = coalesce
+
+    async def get_available_currencies(self) -> dict[str, str]:
+        """Get available currencies from Exchangerate API."""
+        async with ExchangerateClient(coalesce=self.coalesce) as client:
+            return await client.get_available_currencies()
+
+    async def get_quotes(self, *, source: str) -> QuotesDict:
+        """Get quotes from Exchangerate API."""
+        async with ExchangerateClient(coalesce=self.coalesce) as client:
+            return await client.get_quotes(source=source)
+
+    async def get_rates(self, *, base: str, targets: list[str]) -> RatesList:
+        """Get rates from Exchangerate API."""
+        async with ExchangerateClient(coalesce=self.coalesce) as client:
+            return await client.get_rates(base=base, targets=targets)
+
+    async def get_historical_quotes(
+        self,
+        *,
+        source: str,
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> HistoricalQuotesDict:
+        """Get daily quotes of the range from Exchangerate API."""
+        quotes: HistoricalQuotesDict = {}
+        async for chunk in self.iter_historical_quotes(
+            source=source,
+            start_date=start_date,
+            end_date=end_date,
+        ):
+            quotes.update(chunk)
+
+        return quotes
+
+    async def iter_historical_quotes(
+        self,
+        *,
+        source: str,
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> AsyncIterator[HistoricalQuotesDict]:
+        """Stream daily quotes from Exchangerate API by one request per year of the range."""
+        async with ExchangerateClient(coalesce=self.coalesce) as client:
+            while start_date <= end_date:
+                chunk_end = min(end_date, start_date + dt.timedelta(days=364))
+                yield await client.get_historical_quotes(
+                    source=source,
+                    start_date=start_date,
+                    end_date=chunk_end,
+                )
+                start_date = chunk_end + dt.timedelta(days=1)
+
+
+class FileRateProvider(RateProvider):
+    """Rates provider reading quotes from local JSON file, used offline and in benchmarks."""
+
+    live = False
+
+    def __init__(self, path: str | Path = DEFAULT_QUOTES_FILE) -> None:
+        data = json.loads(Path(path).read_text())
+        self.source: str = data['source']
+        self.timestamp: int = data['timestamp']
+        self.quotes: dict[str, float] = {self.source: 1.0, **data['quotes']}
+        self.currencies: dict[str, str] = data['currencies']
+
+    def _quote(self, code: str) -> float:
+        """Get amount of currency for one unit of the file source currency."""
+        try:
+            return self.quotes[code]
+        except KeyError:
+            raise self.ProviderError(message=f'No quote for currency {code}.')
+
+    async def get_available_currencies(self) -> dict[str, str]:
+        """Get currencies listed in the file."""
+        return dict(self.currencies)
+
+    async def get_quotes(self, *, source: str) -> QuotesDict:
+        """Get quotes from the file rebased to the source currency."""
+        source_quote = self._quote(source)
+
+        return {
+            'source': source,
+            'timestamp': self.timestamp,
+            'quotes': {
+                code: quote / source_quote
+                for code, quote in self.quotes.items()
+                if code != source
+            },
+        }
+
+    async def get_rates(self, *, base: str, targets: list[str]) -> RatesList:
+        """Get cross rates from the file quotes."""
+        base_quote = self._quote(base)
+
+        return [
+            {
+                'base': base,
+                'target': target,
+                'pair': base + target,
+                'rate': self._quote(target) / base_quote,
+            }
+            for target in targets
+        ]
+
+    async def get_historical_quotes(
+        self,
+        *,
+        source: str,
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> HistoricalQuotesDict:
+        """Historical quotes are not kept in the file."""
+        raise self.ProviderError(message='Historical quotes are not available.')
+
+
+class HedgedRateProvider(RateProvider):
+    """
+    Provider sending hedged request to the secondary provider when the primary one is slow.
+
+    The hedged request is sent when the primary request takes longer than the configured
+    percentile of recent primary latencies. The first successful response wins.
+    """
+
+    def __init__(
+        self,
+        primary: RateProvider,
+        secondary: RateProvider,
+        *,
+        percentile: float,
+        initial_delay: float,
+        window: int,
+    ) -> None:
+        self.primary = primary
+        self.secondary = secondary
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    def hedge_delay(self) -> float:
+        """Get primary latency percentile after which the hedged request is sent."""
+        if len(self._latencies) < 10:
+            return self.initial_delay
+
+        latencies = sorted(self._latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * self.percentile / 100))
+
+        return latencies[index]
+
+    async def _call(self, call: Callable[[RateProvider], Awaitable[Any]]) -> Any:
+        """Call primary provider and hedge it by the secondary one when it is slow."""
+        started_at = time.monotonic()
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(call(self.primary))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            self._latencies.append(time.monotonic() - started_at)
+            return primary.result()
+
+        secondary = asyncio.ensure_future(call(self.secondary))
+        pending = {primary, secondary}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+            if primary.done() and not primary.cancelled() and primary.exception() is None:
+                self._latencies.append(time.monotonic() - started_at)
+            else:
+                self._latencies.append(max(delay, time.monotonic() - started_at))
+
+        raise error  # type: ignore[misc]
+
+    async def get_available_currencies(self) -> dict[str, str]:
+        """Get available currencies from the fastest provider."""
+        return await self._call(lambda provider: provider.get_available_currencies())
+
+    async def get_quotes(self, *, source: str) -> QuotesDict:
+        """Get quotes from the fastest provider."""
+        return await self._call(lambda provider: provider.get_quotes(source=source))
+
+    async def get_rates(self, *, base: str, targets: list[str]) -> RatesList:
+        """Get rates from the fastest provider."""
+        return await self._call(lambda provider: provider.get_rates(base=base, targets=targets))
+
+    async def get_historical_quotes(
+        self,
+        *,
+        source: str,
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> HistoricalQuotesDict:
+        """Get historical quotes from the fastest provider."""
+        return await self._call(lambda provider: provider.get_historical_quotes(
+            source=source,
+            start_date=start_date,
+            end_date=end_date,
+        ))
+
+
+def create_rate_provider(name: str, *, hedge: bool = False) -> RateProvider:
+    """Create rates provider by its name, hedge provider sends every request on its own."""
+    if name == 'exchangerate':
+        return ExchangerateProvider(coalesce=not hedge)
+    if name == 'file':
+        return FileRateProvider(settings.RATE_PROVIDER_FILE or DEFAULT_QUOTES_FILE)
+
+    raise ValueError(f'Unknown rate provider {name}.')
+
+
+@lru_cache(maxsize=None)
+def get_rate_provider() -> RateProvider:
+    """
+    Get rates provider configured in settings.
+
+    Hedge provider must be live, otherwise fixed quotes of the winning hedged request would be
+    cached and shared by all workers as the live snapshot.
+    """
+    provider = create_rate_provider(settings.RATE_PROVIDER)
+    if not settings.HEDGE_PROVIDER:
+        return provider
+
+    hedge = create_rate_provider(settings.HEDGE_PROVIDER, hedge=True)
+    if not hedge.live:
+        raise ValueError(f'Rate provider {settings.HEDGE_PROVIDER} is not live and can not hedge.')
+
+    return HedgedRateProvider(
+        provider,
+        hedge,
+        percentile=settings.HEDGE_PERCENTILE,
+        initial_delay=settings.HEDGE_INITIAL_DELAY,
+        window=settings.HEDGE_WINDOW,
+    )
@@ -0,0 +1,199 @@
+import asyncio
+import time
+
+from app.config import settings
+
+from .cache import RedisCache
+from .cache import rates_local_cache
+from .clients import ExchangerateClient
+from .providers import RateProvider
+from .providers import get_rate_provider
+
+
+class QuoteSnapshot:
+    """Quotes of all currencies against a single source currency at one moment."""
+
+    def __init__(
+        self,
+        *,
+        source: str,
+        timestamp: int,
+        quotes: dict[str, float],
+        version: int = 0,
+        fetched_at: float = 0.0,
+    ) -> None:
+        self.source = source
+        self.timestamp = timestamp
+        self.quotes = quotes
+        self.version = version
+        self.fetched_at = fetched_at
+
+    def __contains__(self, code: str) -> bool:
+        """Check whether snapshot has quote of the currency."""
+        return code == self.source or code in self.quotes
+
+    def _quote(self, code: str) -> float:
+        """Get amount of currency for one unit of the source currency."""
+        if code == self.source:
+            return 1.0
+
+        return self.quotes[code]
+
+    def cross_rate(self, *, base: str, target: str) -> float:
+        """Derive rate of base currency in target currency."""
+        if base == target:
+            return 1.0
+
+        return self._quote(target) / self._quote(base)
+
+    def to_dict(self) -> dict[str, str | int | float | dict[str, float]]:
+        """Convert snapshot to JSON serializable dict."""
+        return {
+            'source': self.source,
+            'timestamp': self.timestamp,
+            'quotes': self.quotes,
+            'version': self.version,
+            'fetched_at': self.fetched_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'QuoteSnapshot':  # type: ignore[type-arg]
+        """Create snapshot from dict."""
+        return cls(
+            source=data['source'],
+            timestamp=data['timestamp'],
+            quotes=data['quotes'],
+            version=data.get('version', 0),
+            fetched_at=data.get('fetched_at', 0.0),
+        )
+
+
+class RateEngine:
+    """Resolve currency rates from a snapshot of source currency quotes."""
+
+    def __init__(
+        self,
+        *,
+        source: str | None = None,
+        direct_currencies: list[str] | None = None,
+        cache: RedisCache | None = None,
+        provider: RateProvider | None = None,
+    ) -> None:
+        self.provider = provider or get_rate_provider()
+        self.source = source or settings.RATE_SOURCE_CURRENCY
+        self.direct_currencies = frozenset(
+            settings.DIRECT_QUOTE_CURRENCIES if direct_currencies is None else direct_currencies,
+        )
+        self._cache = cache or RedisCache(
+            prefix='quotes',
+            ttl=settings.RATE_CACHE_TTL,
+            grace=settings.RATE_CACHE_GRACE,
+            local=rates_local_cache,
+            version_of=lambda data: data['version'],
+            tags=('quotes',),
+        )
+
+    async def _fetch_snapshot(self) -> dict[str, str | int | float | dict[str, float]]:
+        """Request snapshot of quotes from the provider and assign next version to it."""
+        data: dict[str, str | int | float | dict[str, float]] = {
+            **await self.provider.get_quotes(source=self.source),
+        }
+
+        data['version'] = await self._cache.next_version(self.source)
+        data['fetched_at'] = time.time()
+
+        return data
+
+    async def get_snapshot(self) -> QuoteSnapshot:
+        """
+        Get cached snapshot of all quotes against the source currency.
+
+        When the background refresher is enabled the snapshot is requested from Exchangerate
+        API only if there is no snapshot at all. If Exchangerate API is unavailable the last
+        saved snapshot is used.
+        """
+        fallback_on: tuple[type[Exception], ...] = ()
+        if settings.EXCHANGERATE_FALLBACK_TO_LAST_SNAPSHOT:
+            fallback_on = (ExchangerateClient.UnknownClientError,)
+
+        data = await self._cache.get_or_load(
+            self.source,
+            self._fetch_snapshot,
+            revalidate=not settings.QUOTES_REFRESHER_ENABLED,
+            fallback_on=fallback_on,
+        )
+
+        return QuoteSnapshot.from_dict(data)
+
+    async def refresh_snapshot(self) -> QuoteSnapshot:
+        """Request new snapshot and save it into cache."""
+        data = await self._fetch_snapshot()
+        await self._cache.set(self.source, data)
+
+        return QuoteSnapshot.from_dict(data)
+
+    def get_max_age(self, snapshot: QuoteSnapshot) -> int:
+        """
+        Get the number of seconds the snapshot stays the latest one.
+
+        A newer snapshot is expected after the refresh interval when the background refresher is
+        enabled, otherwise after TTL of the cached one.
+        """
+        if settings.QUOTES_REFRESHER_ENABLED:
+            lifetime = settings.QUOTES_REFRESH_INTERVAL
+        else:
+            lifetime = settings.RATE_CACHE_TTL
+
+        return max(0, int(snapshot.fetched_at + lifetime - time.time()))
+
+    def requires_direct_quote(self, *, base: str, target: str) -> bool:
+        """Check whether rate of the pair must be requested directly instead of derived."""
+        return base in self.direct_currencies or target in self.direct_currencies
+
+    async def get_rates(
+        self,
+        pairs: list[tuple[str, str]],
+        *,
+        snapshot: QuoteSnapshot | None = None,
+    ) -> dict[str, float]:
+        """Get rates of currency pairs keyed by pair code, derived from the snapshot if given."""
+        derived_pairs = []
+        direct_pairs = []
+        for base, target in pairs:
+            if self.requires_direct_quote(base=base, target=target):
+                direct_pairs.append((base, target))
+            else:
+                derived_pairs.append((base, target))
+
+        rates = {}
+        if derived_pairs:
+            snapshot = snapshot or await self.get_snapshot()
+            for base, target in derived_pairs:
+                if base in snapshot and target in snapshot:
+                    rates[base + target] = snapshot.cross_rate(base=base, target=target)
+                else:
+                    direct_pairs.append((base, target))
+
+        if direct_pairs:
+            rates.update(await self._get_direct_rates(direct_pairs))
+
+        return rates
+
+    async def _get_direct_rates(self, pairs: list[tuple[str, str]]) -> dict[str, float]:
+        """Request rates of the pairs from the provider with one call per base currency."""
+        targets_by_base: dict[str, list[str]] = {}
+        for base, target in pairs:
+            targets = targets_by_base.setdefault(base, [])
+            if target not in targets:
+                targets.append(target)
+
+        result_rates = await asyncio.gather(*[
+            self.provider.get_rates(base=base, targets=targets)
+            for base, targets in targets_by_base.items()
+        ])
+
+        return {
+            item['pair']: item['rate']  # type: ignore[misc]
+            for items in result_rates
+            for item in items
+        }
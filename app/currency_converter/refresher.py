@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+
+from redis.asyncio import Redis
+from redis.exceptions import LockError
+
+from app.config import settings
+from app.database import async_session
+from app.redis import redis_client
+
+from .history import HistoricalRateStore
+from .rates import RateEngine
+from .registry import currency_registry
+
+logger = logging.getLogger(__name__)
+
+
+class QuoteRefresher:
+    """Background task refreshing quotes snapshot and available currencies on fixed cadence."""
+
+    leader_key = 'quotes:refresher:leader'
+
+    def __init__(
+        self,
+        *,
+        interval: float | None = None,
+        currencies_interval: float | None = None,
+        redis: Redis = redis_client,
+    ) -> None:
+        self.interval = interval or settings.QUOTES_REFRESH_INTERVAL
+        self.currencies_interval = currencies_interval or settings.CURRENCIES_REFRESH_INTERVAL
+        self._lock = redis.lock(self.leader_key, timeout=self.interval * 3, blocking=False)
+        self._currencies_refreshed_at: float | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    async def is_leader(self) -> bool:
+        """Acquire or prolong the leader lock, only one worker of the cluster refreshes."""
+        try:
+            if await self._lock.owned():
+                return await self._lock.reacquire()
+
+            return await self._lock.acquire()
+        except LockError:
+            return False
+
+    async def refresh(self) -> None:
+        """
+        Refresh quotes snapshot and, when it is time, available currencies.
+
+        Snapshots are also recorded into the historical store when it is enabled.
+        """
+        snapshot = await RateEngine().refresh_snapshot()
+
+        now = time.monotonic()
+        if (self._currencies_refreshed_at is None
+                or now - self._currencies_refreshed_at >= self.currencies_interval):
+            await currency_registry.refresh()
+            self._currencies_refreshed_at = now
+
+        if settings.HISTORY_RECORD_SNAPSHOTS:
+            async with async_session() as db_session:
+                await HistoricalRateStore(db_session).save_snapshot(snapshot)
+
+    async def run(self) -> None:
+        """Refresh snapshots until cancelled."""
+        while True:
+            try:
+                if await self.is_leader():
+                    await self.refresh()
+            except Exception:
+                logger.exception('Failed to refresh quotes snapshot')
+
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start refreshing in background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop refreshing and give up leadership."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        try:
+            await self._lock.release()
+        except LockError:
+            pass
+
+
+quote_refresher = QuoteRefresher()
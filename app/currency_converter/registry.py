@@ -0,0 +1,213 @@
+import asyncio
+from typing import Iterable
+
+from redis.asyncio import Redis
+
+from app.core import fastjson
+from app.core.invalidation import invalidation_bus
+from app.core.response_cache import response_cache
+from app.core.singleflight import cache_fills
+from app.redis import redis_client
+
+from .cache import LocalCache
+from .cache import currencies_local_cache
+from .providers import RateProvider
+from .providers import get_rate_provider
+
+SWAP_SCRIPT = """
+local version = tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[5]) or '0')
+if version <= current then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 0
+end
+
+redis.call('RENAME', KEYS[1], KEYS[3])
+redis.call('RENAME', KEYS[2], KEYS[4])
+redis.call('SET', KEYS[5], version)
+
+return 1
+"""
+
+
+class CurrencyList:
+    """Immutable version of the available currencies list."""
+
+    def __init__(self, *, version: int, names: dict[str, str]) -> None:
+        self.version = version
+        self.names = names
+        self.codes = frozenset(names)
+        self._body: bytes | None = None
+
+    def __len__(self) -> int:
+        """Get the number of currencies."""
+        return len(self.codes)
+
+    def to_json(self) -> bytes:
+        """Encode the list once per version."""
+        if self._body is None:
+            self._body = fastjson.dumps({'version': self.version, 'currencies': self.names})
+
+        return self._body
+
+
+class CurrencyRegistry:
+    """
+    Registry of available currencies shared by all workers of the cluster.
+
+    The list is kept in Redis as a hash of names and a set of codes. A new version is written
+    into staging keys and renamed into the live ones atomically, older versions never replace
+    newer ones. Workers keep the current version in memory and are notified about new ones
+    by the invalidation bus.
+    """
+
+    names_key = 'currencies:names'
+    codes_key = 'currencies:codes'
+    version_key = 'currencies:version'
+    local_key = 'currencies'
+
+    def __init__(
+        self,
+        *,
+        redis: Redis = redis_client,
+        local: LocalCache = currencies_local_cache,
+        provider: RateProvider | None = None,
+    ) -> None:
+        self._redis = redis
+        self._local = local
+        self._provider = provider
+        self._swap = redis.register_script(SWAP_SCRIPT)
+        self._load_task: asyncio.Task[CurrencyList | None] | None = None
+
+    @property
+    def provider(self) -> RateProvider:
+        """Get rates provider, configured one by default."""
+        return self._provider or get_rate_provider()
+
+    async def refresh(self) -> CurrencyList:
+        """Request currencies from the provider and publish them as a new version."""
+        names = await self.provider.get_available_currencies()
+        if not names:
+            raise RateProvider.ProviderError(message='Provider returned no currencies.')
+
+        version = await self._redis.incr(f'{self.version_key}:next')
+        staging_names_key = f'{self.names_key}:staging:{version}'
+        staging_codes_key = f'{self.codes_key}:staging:{version}'
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.hset(staging_names_key, mapping=names)
+            pipe.sadd(staging_codes_key, *names)
+            await pipe.execute()
+
+        swapped = await self._swap(
+            keys=[
+                staging_names_key,
+                staging_codes_key,
+                self.names_key,
+                self.codes_key,
+                self.version_key,
+            ],
+            args=[version],
+        )
+        if not swapped:
+            current = await self._load()
+            if current is not None:
+                return current
+
+        currencies = CurrencyList(version=version, names=names)
+        self._local.set(self.local_key, currencies, version=version)
+        await invalidation_bus.publish(self.local_key, version)
+        await response_cache.invalidate('currencies')
+
+        return currencies
+
+    async def _load(self) -> CurrencyList | None:
+        """Get the current version from Redis and keep it in memory."""
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.get(self.version_key)
+            pipe.hgetall(self.names_key)
+            version, names = await pipe.execute()
+
+        if version is None or not names:
+            return None
+
+        currencies = CurrencyList(version=int(version), names=names)
+        self._local.set(self.local_key, currencies, version=currencies.version)
+
+        return currencies
+
+    def _schedule_load(self) -> None:
+        """Load the current version into memory in background, once at a time."""
+        if self._load_task is None or self._load_task.done():
+            self._load_task = asyncio.create_task(self._load())
+
+    async def get(self) -> CurrencyList:
+        """
+        Get the current version of available currencies.
+
+        When there is no version at all it is requested from the provider by the only worker of
+        the cluster, the others wait for it.
+        """
+        currencies = self._local.get(self.local_key)
+        if currencies is None:
+            currencies = await self._load()
+        if currencies is None:
+            currencies = await cache_fills.do(self.local_key, self.refresh, check=self._load)
+
+        return currencies
+
+    async def get_unavailable(self, codes: Iterable[str]) -> set[str]:
+        """
+        Get codes missing in available currencies.
+
+        Codes are checked in memory, or by a single SMISMEMBER when the current version is not
+        loaded yet. In the latter case the version is loaded in background for next checks.
+        """
+        codes = list(dict.fromkeys(codes))
+        if not codes:
+            return set()
+
+        currencies = self._local.get(self.local_key)
+        if currencies is not None:
+            return set(codes) - currencies.codes
+
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.exists(self.version_key)
+            pipe.smismember(self.codes_key, codes)
+            exists, flags = await pipe.execute()
+
+        if not exists:
+            return set(codes) - (await self.get()).codes
+
+        self._schedule_load()
+
+        return {code for code, flag in zip(codes, flags) if not flag}
+
+    async def get_names(self, codes: Iterable[str]) -> tuple[int, dict[str, str]]:
+        """Get version and names of the available currencies among the codes by single HMGET."""
+        codes = list(dict.fromkeys(codes))
+        currencies = self._local.get(self.local_key)
+        if currencies is None and codes:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.get(self.version_key)
+                pipe.hmget(self.names_key, codes)
+                version, names = await pipe.execute()
+
+            if version is not None:
+                self._schedule_load()
+                return int(version), {
+                    code: name
+                    for code, name in zip(codes, names)
+                    if name is not None
+                }
+
+        if currencies is None:
+            currencies = await self.get()
+
+        return currencies.version, {
+            code: currencies.names[code]
+            for code in codes
+            if code in currencies.codes
+        }
+
+
+currency_registry = CurrencyRegistry()
@@ -1,51 +1,264 @@
+import asyncio
+import datetime as dt
+from typing import Literal
+
 from fastapi import APIRouter
 from fastapi import Depends
+from fastapi import Header
+from fastapi import Query
+from fastapi import Request
+from fastapi import Response
+from fastapi import WebSocket
+from fastapi import WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette import status
 
+from app.config import settings
+from app.core import fastjson
+from app.core.compression import available_encodings
+from app.core.compression import negotiate_encoding
+from app.core.fastjson import FastJSONResponse
+from app.core.utils import cache_headers
+from app.core.utils import etag_matches
+from app.core.utils import negotiate_media_type
 from app.core.utils import parse_query_parameters_as_list_int
 from app.database import DataBaseSession
 from app.users.responses import Unauthorized
 from app.users.services import AuthenticateUser
+from app.users.services import AuthenticateWebSocketUser
 
-from app.core.utils import parse_query_parameters_as_list_int
 from . import exceptions
+from . import matrix
 from .responses import BadRequest
 from .responses import CurrencyNotAvailable
 from .responses import FavoritePairsCreated
 from .responses import FavoritePairsDeleted
+from .schemas import CacheStatsOutput
+from .schemas import ConversionBatch
+from .schemas import ConversionBatchOutput
+from .schemas import CurrencyListOutput
 from .schemas import CurrencyPair
 from .schemas import FavoritePairListCreate
 from .schemas import FavoritePairOutput
+from .schemas import FavoriteRatesPage
 from .schemas import RateOutput
+from .schemas import RateSeriesOutput
+from .schemas import RateSeriesQuery
+from .schemas import UpstreamBudgetOutput
 from .services import CurrencyService
+from .stream import encode_sse_stream
 
 converter_router = APIRouter(prefix='/currencies', tags=['Currencies'])
 
 
+@converter_router.get(
+    '',
+    response_model=CurrencyListOutput,
+    responses={
+        304: {'description': 'The list is not modified'},
+        400: {'model': BadRequest},
+    },
+)
+async def get_currencies(
+    codes: str | None = Query(None, examples=['USD,EUR']),
+    if_none_match: str | None = Header(None),
+    service: CurrencyService = Depends(),
+):
+    """Get available currencies, optionally only the provided comma-separated codes."""
+    try:
+        if codes:
+            version, names = await service.get_currency_names(
+                [code.strip().upper() for code in codes.split(',')],
+            )
+            body = None
+        else:
+            currencies = await service.get_currencies()
+            version, body = currencies.version, currencies.to_json()
+    except CurrencyService.ExchangerateClientError as exc:
+        raise exceptions.ExchangerateApiError(detail=exc.message) from exc
+
+    etag = f'"{version}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    if body is None:
+        return FastJSONResponse({'version': version, 'currencies': names}, headers={'ETag': etag})
+
+    return Response(body, media_type='application/json', headers={'ETag': etag})
+
+
 @converter_router.get(
     '/rate',
     response_model=RateOutput,
     responses={
+        304: {'description': 'The rate is not modified'},
         400: {'model': BadRequest},
+        404: {'model': BadRequest},
     },
 )
 async def get_rate(
+    db_session: DataBaseSession,
+    response: Response,
     currency_pair: CurrencyPair = Depends(),
+    date: dt.date | None = Query(None, examples=['2024-01-31']),
+    if_none_match: str | None = Header(None),
     service: CurrencyService = Depends(),
 ):
-    """Get currency rate."""
+    """
+    Get currency rate, the historical one of the date when it is provided.
+
+    Live rates derived from the quotes snapshot are tagged by the snapshot version and cached
+    until a newer snapshot is expected.
+    """
+    snapshot = None
     try:
+        if date is None:
+            snapshot = await service.get_rate_snapshot(
+                base=currency_pair.base,
+                target=currency_pair.target,
+            )
+        if snapshot is not None:
+            headers = cache_headers(
+                etag=f'"{snapshot.version}"',
+                last_modified=snapshot.timestamp,
+                max_age=service.get_max_age(snapshot),
+            )
+            if etag_matches(if_none_match, headers['ETag']):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            response.headers.update(headers)
+
         rate = await service.get_rate(
             base=currency_pair.base,
             target=currency_pair.target,
+            date=date,
+            db_session=db_session,
+            snapshot=snapshot,
         )
     except CurrencyService.ExchangerateClientError as exc:
         raise exceptions.ExchangerateApiError(detail=exc.message) from exc
     except CurrencyService.CurrencyNotAvailableError as exc:
         raise exceptions.CurrencyNotAvailableError() from exc
+    except CurrencyService.HistoricalRateNotFoundError as exc:
+        raise exceptions.HistoricalRateNotFoundError() from exc
 
     return rate
 
 
+@converter_router.get(
+    '/series',
+    response_model=RateSeriesOutput,
+    responses={
+        400: {'model': BadRequest},
+    },
+)
+async def get_rate_series(
+    db_session: DataBaseSession,
+    currency_pair: CurrencyPair = Depends(),
+    query: RateSeriesQuery = Depends(),
+    service: CurrencyService = Depends(),
+):
+    """
+    Get historical rates of the pair over the dates.
+
+    Rates are downsampled into daily, weekly or monthly buckets with open, high, low, close
+    and mean rates, optionally with moving average and standard deviation of close rates over
+    the window of buckets. The series is returned by columns.
+    """
+    try:
+        series = await service.get_rate_series(
+            base=currency_pair.base,
+            target=currency_pair.target,
+            query=query,
+            db_session=db_session,
+        )
+    except CurrencyService.ExchangerateClientError as exc:
+        raise exceptions.ExchangerateApiError(detail=exc.message) from exc
+    except CurrencyService.CurrencyNotAvailableError as exc:
+        raise exceptions.CurrencyNotAvailableError() from exc
+
+    return FastJSONResponse(series)
+
+
+@converter_router.get(
+    '/matrix',
+    responses={
+        200: {
+            'description': (
+                'Cross rates of all currencies, rate of codes[i] in codes[j] is in row i and '
+                'column j. Raw buffer is a row-major little-endian array of the dtype, its code '
+                'index is in X-Currency-Codes header.'
+            ),
+            'content': {
+                matrix.JSON: {},
+                matrix.MSGPACK: {},
+                matrix.BUFFER: {},
+            },
+        },
+        400: {'model': BadRequest},
+        406: {'model': BadRequest},
+    },
+)
+async def get_rate_matrix(
+    dtype: Literal['float64', 'float32'] = 'float64',
+    accept: str | None = Header(None),
+    accept_encoding: str | None = Header(None),
+    service: CurrencyService = Depends(),
+):
+    """
+    Get matrix of cross rates of all currencies as JSON, msgpack or raw buffer.
+
+    Payloads are compressed once per snapshot, so compression middleware passes them as is.
+    """
+    media_type = negotiate_media_type(accept, matrix.media_types())
+    if media_type is None:
+        raise exceptions.NotAcceptableError()
+
+    try:
+        rate_matrix = await service.get_rate_matrix()
+    except CurrencyService.ExchangerateClientError as exc:
+        raise exceptions.ExchangerateApiError(detail=exc.message) from exc
+
+    headers = {'X-Snapshot-Version': str(rate_matrix.version)}
+    if media_type == matrix.BUFFER:
+        headers.update({
+            'X-Currency-Codes': ','.join(rate_matrix.codes),
+            'X-Matrix-Dtype': dtype,
+        })
+
+    body = rate_matrix.encode(media_type, dtype)
+    encoding = negotiate_encoding(accept_encoding, available_encodings())
+    if encoding is not None and len(body) >= settings.COMPRESSION_MIN_SIZE:
+        body = rate_matrix.encode(media_type, dtype, encoding)
+        headers.update({'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'})
+
+    return Response(body, media_type=media_type, headers=headers)
+
+
+@converter_router.post(
+    '/convert',
+    response_model=ConversionBatchOutput,
+    responses={
+        400: {'model': BadRequest},
+    },
+)
+async def convert(
+    batch: ConversionBatch,
+    service: CurrencyService = Depends(),
+):
+    """
+    Convert amounts of many currency pairs by one request.
+
+    Results keep the order of items, items with unavailable currencies get an error. In exact
+    mode results are decimal strings rounded to minor units of target currencies.
+    """
+    try:
+        results = await service.convert(batch.items, exact=batch.exact)
+    except CurrencyService.ExchangerateClientError as exc:
+        raise exceptions.ExchangerateApiError(detail=exc.message) from exc
+
+    return FastJSONResponse({'results': results})
+
+
 @converter_router.post(
     '/favorite_rates/create',
     responses={
@@ -77,6 +290,13 @@ async def add_favorite_pairs(
     '/favorite_rates',
     response_model=list[FavoritePairOutput],
     responses={
+        200: {
+            'description': (
+                'A page of rates ordered by id. When there are more pairs, X-Next-Cursor header '
+                'and Link header with rel next hold the cursor of the next page.'
+            ),
+        },
+        304: {'description': 'The rates are not modified'},
         400: {'model': BadRequest},
         401: {'model': Unauthorized, 'description': 'Authentication failed'},
     },
@@ -84,15 +304,116 @@ async def add_favorite_pairs(
 async def get_favorite_pairs(
     user: AuthenticateUser,
     db_session: DataBaseSession,
+    request: Request,
+    page: FavoriteRatesPage = Depends(),
+    if_none_match: str | None = Header(None),
     service: CurrencyService = Depends(),
 ):
-    """Get currency rates from favorite list."""
+    """
+    Get a page of currency rates from favorite list.
+
+    Pairs are paginated by id: the page has up to limit pairs with id greater than the after
+    cursor. The list is built by the service in the shape of the response model and is encoded
+    directly, without validation against the model. Unless some rates are requested directly,
+    the list is tagged by the snapshot version and the favorite list version.
+    """
+    snapshot = None
+    headers = {}
     try:
-        result = await service.get_favorite_rates(user=user, db_session=db_session)
+        if not settings.DIRECT_QUOTE_CURRENCIES:
+            favorites_version = await service.get_favorites_version(
+                user=user,
+                db_session=db_session,
+            )
+            snapshot = await service.get_snapshot()
+            headers = cache_headers(
+                etag=f'"{snapshot.version}-{favorites_version}"',
+                last_modified=snapshot.timestamp,
+                max_age=service.get_max_age(snapshot),
+                private=True,
+            )
+            if etag_matches(if_none_match, headers['ETag']):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        result, next_cursor = await service.get_favorite_rates_page(
+            user=user,
+            db_session=db_session,
+            after=page.after,
+            limit=page.limit,
+            snapshot=snapshot,
+        )
     except CurrencyService.ExchangerateClientError as exc:
         raise exceptions.ExchangerateApiError(detail=exc.message) from exc
 
-    return result
+    if next_cursor is not None:
+        headers['X-Next-Cursor'] = str(next_cursor)
+        headers['Link'] = f'<{request.url.include_query_params(after=next_cursor)}>; rel="next"'
+
+    return FastJSONResponse(result, headers=headers)
+
+
+@converter_router.get(
+    '/favorite_rates/stream',
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            'description': (
+                'Server-sent events named rates, the first one has rates of all favorite pairs, '
+                'next ones only changed rates. Event data is the snapshot version and the list '
+                'of rates in the shape of /favorite_rates items.'
+            ),
+            'content': {'text/event-stream': {}},
+        },
+        401: {'model': Unauthorized, 'description': 'Authentication failed'},
+    },
+)
+async def stream_favorite_rates(
+    user: AuthenticateUser,
+    db_session: DataBaseSession,
+    service: CurrencyService = Depends(),
+):
+    """Stream changes of currency rates from favorite list as server-sent events."""
+    pairs = await service.get_favorite_pairs(user=user, db_session=db_session)
+    await db_session.close()
+
+    return StreamingResponse(
+        encode_sse_stream(service.stream_favorite_rates(pairs)),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@converter_router.websocket('/favorite_rates/ws')
+async def stream_favorite_rates_websocket(
+    websocket: WebSocket,
+    user: AuthenticateWebSocketUser,
+    db_session: DataBaseSession,
+    service: CurrencyService = Depends(),
+):
+    """
+    Stream changes of currency rates from favorite list by WebSocket.
+
+    Messages are the same as data of server-sent events, heartbeat is an empty JSON object.
+    A consumer not reading messages within the send timeout is disconnected.
+    """
+    pairs = await service.get_favorite_pairs(user=user, db_session=db_session)
+    await db_session.close()
+    await websocket.accept()
+
+    events = service.stream_favorite_rates(pairs)
+    try:
+        async for event in events:
+            message = fastjson.dumps({} if event is None else event).decode()
+            await asyncio.wait_for(
+                websocket.send_text(message),
+                settings.STREAM_SEND_TIMEOUT,
+            )
+    except asyncio.TimeoutError:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await events.aclose()
 
 
 @converter_router.delete(
@@ -116,3 +437,21 @@ async def delete_favorite_pairs(
     )
 
     return {'detail': result}
+
+
+@converter_router.get(
+    '/upstream_budget',
+    response_model=UpstreamBudgetOutput,
+)
+async def get_upstream_budget(service: CurrencyService = Depends()):
+    """Get remaining request budget of Exchangerate API."""
+    return await service.get_upstream_budget()
+
+
+@converter_router.get(
+    '/cache_stats',
+    response_model=CacheStatsOutput,
+)
+async def get_cache_stats(service: CurrencyService = Depends()):
+    """Get hit and miss counters of worker-level caches of the worker serving the request."""
+    return service.get_cache_stats()
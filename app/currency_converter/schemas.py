@@ -1,6 +1,11 @@
+import datetime as dt
+from typing import Literal
+
+from pydantic import Field
 from pydantic import field_validator
 from pydantic import model_validator
 
+from app.config import settings
 from app.core.schemas import BaseSchema
 
 from .exceptions import CustomValidationError
@@ -23,6 +28,71 @@ class FavoritePairOutput(BaseSchema):
     description: str
 
 
+class ConversionOutput(BaseSchema):
+    """Response model for a single conversion of batch."""
+
+    base: str
+    target: str
+    amount: float
+    rate: float | None
+    result: float | str | None
+    error: str | None
+
+
+class ConversionBatchOutput(BaseSchema):
+    """Response model for batch conversion."""
+
+    results: list[ConversionOutput]
+
+
+class CurrencyListOutput(BaseSchema):
+    """Response model for the list of available currencies."""
+
+    version: int
+    currencies: dict[str, str]
+
+
+class RateSeriesOutput(BaseSchema):
+    """Response model for series of a pair rates, columns of buckets."""
+
+    pair: str
+    resolution: str
+    window: int | None
+    time: list[str]
+    open: list[float]
+    high: list[float]
+    low: list[float]
+    close: list[float]
+    mean: list[float]
+    sma: list[float | None] | None = None
+    std: list[float | None] | None = None
+
+
+class UpstreamBudgetOutput(BaseSchema):
+    """Response model for the request budget of Exchangerate API."""
+
+    monthly_quota: int | None
+    used_this_month: int | None
+    remaining_this_month: int | None
+    bucket_tokens: float | None
+
+
+class LocalCacheStatsOutput(BaseSchema):
+    """Response model for counters of a worker-level cache."""
+
+    hits: int
+    misses: int
+    size: int
+
+
+class CacheStatsOutput(BaseSchema):
+    """Response model for counters of worker-level caches of the worker."""
+
+    currencies: LocalCacheStatsOutput
+    rates: LocalCacheStatsOutput
+    series: LocalCacheStatsOutput
+
+
 class CurrencyPair(BaseSchema):
     """Schema for a pair of currencies."""
 
@@ -75,3 +145,72 @@ class FavoritePairListCreate(BaseSchema):
             duplicates.append(pair)
 
         return self
+
+
+class Conversion(BaseSchema):
+    """Schema for conversion of amount from base to target currency."""
+
+    base: str = Field(min_length=3, max_length=3)
+    target: str = Field(min_length=3, max_length=3)
+    amount: float = Field(allow_inf_nan=False)
+
+    @field_validator('base', 'target')
+    @classmethod
+    def code_upper(cls, value):
+        """Return a copy of the string converted to uppercase."""
+        return value.upper()
+
+
+class ConversionBatch(BaseSchema):
+    """Schema for batch conversion."""
+
+    items: list[Conversion] = Field(min_length=1, max_length=settings.CONVERT_BATCH_MAX_ITEMS)
+    exact: bool = False
+
+
+class FavoriteRatesPage(BaseSchema):
+    """Schema for query of a page of favorite rates."""
+
+    after: int | None = None
+    limit: int | None = None
+
+    @model_validator(mode='after')
+    def limit_validator(self):
+        """
+        Check the page size.
+
+        HTTPException is raised instead of Pydantic ValidationError because this schema is used
+        for Query parameters as Depends.
+        """
+        if self.limit is not None and not 1 <= self.limit <= settings.FAVORITE_RATES_MAX_PAGE_SIZE:
+            raise CustomValidationError(
+                detail=f'Limit must be from 1 to {settings.FAVORITE_RATES_MAX_PAGE_SIZE} pairs.',
+            )
+
+        return self
+
+
+class RateSeriesQuery(BaseSchema):
+    """Schema for query of a pair rates series."""
+
+    start: dt.date
+    end: dt.date
+    resolution: Literal['daily', 'weekly', 'monthly'] = 'daily'
+    window: int | None = None
+
+    @model_validator(mode='after')
+    def range_validator(self):
+        """
+        Check the range and the window of rolling statistics.
+
+        HTTPException is raised instead of Pydantic ValidationError because this schema is used
+        for Query parameters as Depends.
+        """
+        if self.start > self.end:
+            raise CustomValidationError(detail='Start date must not be after end date.')
+        if self.window is not None and not 2 <= self.window <= settings.SERIES_MAX_WINDOW:
+            raise CustomValidationError(
+                detail=f'Window must be from 2 to {settings.SERIES_MAX_WINDOW} buckets.',
+            )
+
+        return self
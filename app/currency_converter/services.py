@@ -1,24 +1,57 @@
 import asyncio
+import datetime as dt
+import logging
+import math
+from typing import Any
+from typing import AsyncGenerator
+from typing import Iterable
+from typing import cast
 
 from sqlalchemy import delete
+from sqlalchemy import func
 from sqlalchemy import select
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.core.exceptions import BaseServiceError
-from app.redis import redis_client
+from app.core.response_cache import response_cache
 from app.users.models import FavoritePair
 from app.users.models import User
 
-from .clients import ExchangerateClient
+from .analytics import pair_series
+from .analytics import rate_series
+from .cache import RedisCache
+from .cache import currencies_local_cache
+from .cache import rates_local_cache
+from .cache import series_local_cache
+from .clients import exchangerate_quota
+from .conversion import AmountConverter
+from .conversion import multiply
+from .conversion import multiply_exact
+from .conversion import to_decimal
+from .history import HistoricalRateStore
+from .matrix import RateMatrix
+from .matrix import get_rate_matrix
+from .providers import PROVIDER_ERRORS
+from .rates import QuoteSnapshot
+from .rates import RateEngine
+from .registry import CurrencyList
+from .registry import currency_registry
+from .schemas import Conversion
 from .schemas import CurrencyPair
+from .schemas import RateSeriesQuery
+from .stream import RateBroker
+from .stream import rate_broker
+
+logger = logging.getLogger(__name__)
 
 
 class CurrencyService:
     """Service for working with currencies and converter."""
 
     class ExchangerateClientError(BaseServiceError):
-        """Exception class for errors from ExchangerateClient."""
+        """Exception class for errors from rates provider."""
 
         def __init__(self, message) -> None:
             self.message = message
@@ -26,57 +59,286 @@ class CurrencyService:
     class CurrencyNotAvailableError(BaseServiceError):
         """Provided currency is not available on external API."""
 
-    def __init__(self) -> None:
-        self._available_currencies: dict[str, str] | None = None
-        self._redis_client = redis_client
+        message = 'Provided currency is not available.'
 
-    async def _get_available_currencies_from_external_api(self) -> dict[str, str]:
-        """Get available currencies from Exchangerate API and save into cache."""
-        async with ExchangerateClient() as client:
-            try:
-                currencies = await client.get_available_currencies()
-            except (ExchangerateClient.ClientError, ExchangerateClient.UnknownClientError) as exc:
-                raise self.ExchangerateClientError(message=exc.message) from exc
+    class AmountTooLargeError(BaseServiceError):
+        """Conversion result overflows float or does not fit Decimal precision."""
 
-        await self._redis_client.hset(
-            'available_currencies',
-            mapping=currencies,
-        )
+        message = 'Amount is too large for conversion.'
 
-        self._available_currencies = currencies
+    class HistoricalRateNotFoundError(BaseServiceError):
+        """No historical quotes of the pair for the date."""
 
-        return currencies
+        message = 'No historical rate for the date.'
 
-    async def is_currency_available(self, *, code: str) -> None:
-        """Check whether currency is available."""
-        currencies = self._available_currencies
-        if not currencies:
-            currencies = await self._redis_client.hgetall('available_currencies')  # type: ignore
-            if not currencies:
-                currencies = await self._get_available_currencies_from_external_api()
+    def __init__(self) -> None:
+        self._registry = currency_registry
+        self._series_cache = RedisCache(
+            prefix='series',
+            ttl=settings.SERIES_CACHE_TTL,
+            grace=0,
+            local=series_local_cache,
+            ephemeral=True,
+        )
 
-        if code not in currencies:
+    async def get_currencies(self) -> CurrencyList:
+        """Get the current version of available currencies."""
+        try:
+            return await self._registry.get()
+        except PROVIDER_ERRORS as exc:
+            raise self.ExchangerateClientError(message=exc.message) from exc
+
+    async def get_currency_names(self, codes: list[str]) -> tuple[int, dict[str, str]]:
+        """Get version and names of available currencies among the codes."""
+        try:
+            return await self._registry.get_names(codes)
+        except PROVIDER_ERRORS as exc:
+            raise self.ExchangerateClientError(message=exc.message) from exc
+
+    async def _get_unavailable_currencies(self, codes: Iterable[str]) -> set[str]:
+        """Get codes missing in available currencies by a single batch lookup."""
+        try:
+            return await self._registry.get_unavailable(codes)
+        except PROVIDER_ERRORS as exc:
+            raise self.ExchangerateClientError(message=exc.message) from exc
+
+    async def check_currencies_available(self, *, codes: Iterable[str]) -> None:
+        """Check whether all currencies are available by a single batch lookup."""
+        unavailable = await self._get_unavailable_currencies(codes)
+        if unavailable:
             raise self.CurrencyNotAvailableError()
 
-    async def get_rate(self, *, base: str, target: str):
-        """Get currency rate."""
-        for code in [base, target]:
-            await self.is_currency_available(code=code)
+    async def get_snapshot(self) -> QuoteSnapshot:
+        """Get the current quotes snapshot."""
+        try:
+            return await RateEngine().get_snapshot()
+        except PROVIDER_ERRORS as exc:
+            raise self.ExchangerateClientError(message=exc.message) from exc
 
-        async with ExchangerateClient() as client:
-            try:
-                result = await client.get_rate(base=base, target=target)
-            except (ExchangerateClient.ClientError, ExchangerateClient.UnknownClientError) as exc:
-                raise self.ExchangerateClientError(message=exc.message) from exc
+    @staticmethod
+    def get_max_age(snapshot: QuoteSnapshot) -> int:
+        """Get the number of seconds rates of the snapshot may be cached for."""
+        return RateEngine().get_max_age(snapshot)
+
+    async def get_rate_snapshot(self, *, base: str, target: str) -> QuoteSnapshot | None:
+        """Get the quotes snapshot rate of the pair is derived from, None if it is requested."""
+        engine = RateEngine()
+        if engine.requires_direct_quote(base=base, target=target):
+            return None
+
+        try:
+            snapshot = await engine.get_snapshot()
+        except PROVIDER_ERRORS as exc:
+            raise self.ExchangerateClientError(message=exc.message) from exc
+
+        return snapshot if base in snapshot and target in snapshot else None
 
-        rate = result['rate']
+    async def _get_rates(
+        self,
+        pairs: list[tuple[str, str]],
+        *,
+        snapshot: QuoteSnapshot | None = None,
+    ) -> dict[str, float]:
+        """Get rates of currency pairs from the rate engine."""
+        if not pairs:
+            return {}
+
+        try:
+            return await RateEngine().get_rates(pairs, snapshot=snapshot)
+        except PROVIDER_ERRORS as exc:
+            raise self.ExchangerateClientError(message=exc.message) from exc
+
+    async def get_rate(
+        self,
+        *,
+        base: str,
+        target: str,
+        date: dt.date | None = None,
+        db_session: AsyncSession | None = None,
+        snapshot: QuoteSnapshot | None = None,
+    ):
+        """
+        Get currency rate, the historical one from the store when the date is provided.
+
+        The live rate is derived from the snapshot when it is provided. The historical one
+        requires the database session.
+        """
+        if date is not None and db_session is None:
+            raise ValueError('Database session is required for historical rate.')
+
+        await self.check_currencies_available(codes=[base, target])
+
+        if date is None or db_session is None:
+            rates = await self._get_rates([(base, target)], snapshot=snapshot)
+            rate = rates[base + target]
+        else:
+            rate = await self._get_historical_rate(
+                base=base,
+                target=target,
+                date=date,
+                db_session=db_session,
+            )
 
         return {
-            'pair': result['pair'],
+            'pair': base + target,
             'rate': rate,
             'description': f'1 {base} = {rate} {target}',
         }
 
+    async def _get_historical_rate(
+        self,
+        *,
+        base: str,
+        target: str,
+        date: dt.date,
+        db_session: AsyncSession,
+    ) -> float:
+        """Derive rate of the pair from historical quotes of the date."""
+        snapshot = await HistoricalRateStore(db_session).get_snapshot(date, [base, target])
+        if base not in snapshot or target not in snapshot:
+            raise self.HistoricalRateNotFoundError()
+
+        return snapshot.cross_rate(base=base, target=target)
+
+    async def get_rate_series(
+        self,
+        *,
+        base: str,
+        target: str,
+        query: RateSeriesQuery,
+        db_session: AsyncSession,
+    ) -> dict[str, Any]:
+        """
+        Get series of the pair rates over the dates downsampled into OHLC buckets.
+
+        Quotes of both currencies are pulled by one range query and aggregated by NumPy.
+        Results are cached by pair, range, resolution and window.
+        """
+        await self.check_currencies_available(codes=[base, target])
+
+        async def load() -> dict[str, Any]:
+            quotes = await HistoricalRateStore(db_session).get_series(
+                [base, target],
+                start=query.start,
+                end=query.end,
+            )
+            times, rates = pair_series(quotes.get(base), quotes.get(target))
+
+            return {
+                'pair': base + target,
+                'resolution': query.resolution,
+                'window': query.window,
+                **rate_series(times, rates, resolution=query.resolution, window=query.window),
+            }
+
+        key = f'{base}{target}:{query.start}:{query.end}:{query.resolution}:{query.window}'
+
+        return await self._series_cache.get_or_load(key, load)
+
+    async def get_rate_matrix(self) -> RateMatrix:
+        """Get matrix of cross rates of the current quotes snapshot."""
+        engine = RateEngine()
+        try:
+            snapshot = await engine.get_snapshot()
+        except PROVIDER_ERRORS as exc:
+            raise self.ExchangerateClientError(message=exc.message) from exc
+
+        return get_rate_matrix(snapshot, exclude=engine.direct_currencies)
+
+    async def convert(
+        self,
+        items: list[Conversion],
+        *,
+        exact: bool = False,
+    ) -> list[dict[str, str | float | None]]:
+        """
+        Convert amounts of many currency pairs at once.
+
+        All codes are checked by a single lookup and rates of distinct pairs are resolved
+        together, so the whole batch costs as much as a single rate. Results keep the input
+        order, an item with unavailable currency or too large result gets error instead of
+        result. In exact mode rates are derived from snapshot quotes in Decimal and results are
+        Decimal strings rounded to minor units of target currencies.
+        """
+        unavailable = await self._get_unavailable_currencies(
+            code for item in items for code in (item.base, item.target)
+        )
+        pairs = list(dict.fromkeys(
+            (item.base, item.target)
+            for item in items
+            if item.base not in unavailable and item.target not in unavailable
+        ))
+        snapshot = await self.get_snapshot() if exact and pairs else None
+        rates = await self._get_rates(pairs, snapshot=snapshot)
+
+        item_rates = [rates.get(item.base + item.target) for item in items]
+        results: list[str | float | None]
+        if snapshot is not None:
+            results = self._convert_exact(items, rates, snapshot)
+        else:
+            products = multiply(
+                [item.amount for item in items],
+                [math.nan if rate is None else rate for rate in item_rates],
+            ).tolist()
+            results = [
+                None if rate is None or math.isnan(product) else product
+                for rate, product in zip(item_rates, products)
+            ]
+
+        return [
+            {
+                'base': item.base,
+                'target': item.target,
+                'amount': item.amount,
+                'rate': rate,
+                'result': result,
+                'error': self._conversion_error(rate, result),
+            }
+            for item, rate, result in zip(items, item_rates, results)
+        ]
+
+    @staticmethod
+    def _convert_exact(
+        items: list[Conversion],
+        rates: dict[str, float],
+        snapshot: QuoteSnapshot,
+    ) -> list[str | float | None]:
+        """Convert amounts of items by rates in Decimal, derived from the snapshot if possible."""
+        engine = RateEngine()
+        converter = AmountConverter(snapshot)
+        exact_rates = {}
+        for item in items:
+            pair = item.base + item.target
+            if pair not in rates or pair in exact_rates:
+                continue
+            if (engine.requires_direct_quote(base=item.base, target=item.target)
+                    or item.base not in snapshot or item.target not in snapshot):
+                exact_rates[pair] = to_decimal(rates[pair])
+            else:
+                exact_rates[pair] = converter.exact_rate(base=item.base, target=item.target)
+
+        convertible = [item for item in items if item.base + item.target in exact_rates]
+        converted = iter(multiply_exact(
+            [item.amount for item in convertible],
+            [exact_rates[item.base + item.target] for item in convertible],
+            [item.target for item in convertible],
+        ))
+        results = [
+            next(converted) if item.base + item.target in exact_rates else None
+            for item in items
+        ]
+
+        return [None if result is None else str(result) for result in results]
+
+    def _conversion_error(self, rate: float | None, result: str | float | None) -> str | None:
+        """Get error of conversion item without result."""
+        if rate is None:
+            return self.CurrencyNotAvailableError.message
+        if result is None:
+            return self.AmountTooLargeError.message
+
+        return None
+
     async def add_favorite_list(
         self,
         *,
@@ -85,52 +347,178 @@ class CurrencyService:
         pairs: list[CurrencyPair],
     ):
         """Add favorite currency pairs."""
-        pairs_dicts = []
-        currencies_set = set()
-
-        for pair in pairs:
-            for currency_code in (pair.base, pair.target):
-
-                if currency_code not in currencies_set:
-                    await self.is_currency_available(code=currency_code)
-                    currencies_set.add(currency_code)
+        await self.check_currencies_available(
+            codes=[code for pair in pairs for code in (pair.base, pair.target)],
+        )
 
-            pairs_dicts.append({'user_id': user.id, 'base': pair.base, 'target': pair.target})
+        pairs_dicts = [
+            {'user_id': user.id, 'base': pair.base, 'target': pair.target}
+            for pair in pairs
+        ]
 
         await db_session.execute(insert(FavoritePair).on_conflict_do_nothing(), pairs_dicts)
         await db_session.commit()
+        await response_cache.invalidate(f'favorites:{user.username}')
 
-    async def get_favorite_rates(self, *, user: User, db_session: AsyncSession):
-        """Get currency rates from favorite list."""
-        favorite_pairs = await db_session.scalars(
-            select(FavoritePair).where(FavoritePair.user_id == user.id),
+    async def get_favorite_pairs(
+        self,
+        *,
+        user: User,
+        db_session: AsyncSession,
+        after: int | None = None,
+        limit: int | None = None,
+    ) -> list[FavoritePair]:
+        """Get favorite currency pairs of the user ordered by id, optionally a page of them."""
+        query = (
+            select(FavoritePair)
+            .where(FavoritePair.user_id == user.id)
+            .order_by(FavoritePair.id)
         )
-        instances = favorite_pairs.all()
+        if after is not None:
+            query = query.where(FavoritePair.id > after)
+        if limit is not None:
+            query = query.limit(limit)
 
-        tasks = []
-        async with ExchangerateClient() as client:
-            for pair in instances:
-                tasks.append(client.get_rate(base=pair.base, target=pair.target))
+        favorite_pairs = await db_session.scalars(query)
 
-            try:
-                result_rates = await asyncio.gather(*tasks)
-            except (ExchangerateClient.ClientError, ExchangerateClient.UnknownClientError) as exc:
-                raise self.ExchangerateClientError(message=exc.message) from exc
-
-        result = []
-        for item, pair in zip(result_rates, instances):
-            rate = item['rate']
-            base = item['base']
-            target = item['target']
-
-            result.append({
-                'id': pair.id,
-                'pair': item['pair'],
-                'rate': rate,
-                'description': f'1 {base} = {rate} {target}',
-            })
+        return list(favorite_pairs.all())
 
-        return result
+    async def get_favorites_version(self, *, user: User, db_session: AsyncSession) -> str:
+        """
+        Get version of favorite list of the user.
+
+        Identifiers of favorite pairs only grow, so adding pairs changes the greatest one and
+        removing pairs changes their number.
+        """
+        result = await db_session.execute(
+            select(func.count(FavoritePair.id), func.max(FavoritePair.id))
+            .where(FavoritePair.user_id == user.id),
+        )
+        count, last_id = result.one()
+
+        return f'{count}.{last_id or 0}'
+
+    @staticmethod
+    def _pair_codes(pair: FavoritePair) -> tuple[str, str]:
+        """Get base and target currencies of the loaded favorite pair."""
+        return cast(str, pair.base), cast(str, pair.target)
+
+    def _favorite_rate(self, pair: FavoritePair, rate: float) -> dict[str, int | str | float]:
+        """Build rate item of the favorite pair."""
+        base, target = self._pair_codes(pair)
+
+        return {
+            'id': cast(int, pair.id),
+            'pair': base + target,
+            'rate': rate,
+            'description': f'1 {base} = {rate} {target}',
+        }
+
+    async def get_favorite_rates_page(
+        self,
+        *,
+        user: User,
+        db_session: AsyncSession,
+        after: int | None = None,
+        limit: int | None = None,
+        snapshot: QuoteSnapshot | None = None,
+    ) -> tuple[list[dict[str, int | str | float]], int | None]:
+        """
+        Get a page of currency rates from favorite list and the cursor of the next page.
+
+        Pairs are paginated by id, the page is the pairs after the cursor id. Only rates of the
+        page are resolved, so the page costs the same regardless of the length of the list. One
+        pair more than the limit is read to know whether the next page exists.
+        """
+        limit = limit or settings.FAVORITE_RATES_PAGE_SIZE
+        instances = await self.get_favorite_pairs(
+            user=user,
+            db_session=db_session,
+            after=after,
+            limit=limit + 1,
+        )
+        page = instances[:limit]
+        next_cursor = cast(int, page[-1].id) if len(instances) > limit else None
+
+        return await self._get_favorite_rates(page, snapshot=snapshot), next_cursor
+
+    async def _get_favorite_rates(
+        self,
+        instances: list[FavoritePair],
+        *,
+        snapshot: QuoteSnapshot | None = None,
+    ) -> list[dict[str, int | str | float]]:
+        """Get rate items of the favorite pairs."""
+        rates = await self._get_rates(
+            [self._pair_codes(pair) for pair in instances],
+            snapshot=snapshot,
+        )
+
+        return [
+            self._favorite_rate(pair, rates[''.join(self._pair_codes(pair))])
+            for pair in instances
+        ]
+
+    def _changed_favorite_rates(
+        self,
+        pairs: list[FavoritePair],
+        rates: dict[str, float],
+        sent: dict[int, float],
+    ) -> list[dict[str, int | str | float]]:
+        """Get rate items of the pairs differing from the sent ones and remember them as sent."""
+        changed = []
+        for pair in pairs:
+            pair_id = cast(int, pair.id)
+            rate = rates.get(''.join(self._pair_codes(pair)))
+            if rate is not None and sent.get(pair_id) != rate:
+                sent[pair_id] = rate
+                changed.append(self._favorite_rate(pair, rate))
+
+        return changed
+
+    async def stream_favorite_rates(
+        self,
+        pairs: list[FavoritePair],
+        *,
+        broker: RateBroker = rate_broker,
+        heartbeat_interval: float | None = None,
+    ) -> AsyncGenerator[dict[str, Any] | None, None]:
+        """
+        Stream rates of favorite pairs changed by new quote snapshots.
+
+        The first event has rates of all pairs, next ones only changed rates, each of them with
+        the version of the snapshot. Snapshots are loaded once for all subscribers of the worker
+        by the broker, a slow consumer skips intermediate ones. None is yielded when nothing
+        changed for the heartbeat interval. Failed updates are logged and skipped.
+        """
+        heartbeat_interval = heartbeat_interval or settings.STREAM_HEARTBEAT_INTERVAL
+        engine = RateEngine()
+        currency_pairs = list(dict.fromkeys(self._pair_codes(pair) for pair in pairs))
+        sent: dict[int, float] = {}
+        version: int | None = None
+        with broker.subscribe() as subscription:
+            snapshot = broker.snapshot
+            try:
+                snapshot = await engine.get_snapshot()
+            except PROVIDER_ERRORS:
+                logger.exception('Failed to load quotes snapshot for the stream')
+
+            while True:
+                if snapshot is not None and (version is None or snapshot.version > version):
+                    try:
+                        rates = await engine.get_rates(currency_pairs, snapshot=snapshot)
+                    except PROVIDER_ERRORS:
+                        logger.exception('Failed to get rates for the stream')
+                    else:
+                        changed = self._changed_favorite_rates(pairs, rates, sent)
+                        if version is None or changed:
+                            yield {'version': snapshot.version, 'rates': changed}
+                        version = snapshot.version
+
+                try:
+                    snapshot = await asyncio.wait_for(subscription.get(), heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield None
 
     async def delete_favorite_pairs(
         self,
@@ -145,8 +533,38 @@ class CurrencyService:
             .where(FavoritePair.id.in_(pairs), FavoritePair.user_id == user.id),
         )
         await db_session.commit()
+        await response_cache.invalidate(f'favorites:{user.username}')
         message = ('Provided pairs were not found.'
                    if result.rowcount == 0
                    else 'Pairs were deleted.')
 
         return message
+
+    async def get_upstream_budget(self) -> dict[str, int | float | None]:
+        """Get the number of requests to Exchangerate API left within the quota."""
+        if exchangerate_quota is None:
+            return {
+                'monthly_quota': None,
+                'used_this_month': None,
+                'remaining_this_month': None,
+                'bucket_tokens': None,
+            }
+
+        budget = await exchangerate_quota.get_budget()
+        quota = settings.EXCHANGERATE_MONTHLY_QUOTA
+        used = int(budget['used_this_month'])
+
+        return {
+            'monthly_quota': quota,
+            'used_this_month': used,
+            'remaining_this_month': max(quota - used, 0),
+            'bucket_tokens': budget['tokens'],
+        }
+
+    def get_cache_stats(self) -> dict[str, dict[str, int]]:
+        """Get hit and miss counters of worker-level caches of this worker."""
+        return {
+            'currencies': currencies_local_cache.stats(),
+            'rates': rates_local_cache.stats(),
+            'series': series_local_cache.stats(),
+        }
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Any
+from typing import AsyncIterator
+from typing import Iterator
+
+from app.config import settings
+from app.core import fastjson
+from app.core.invalidation import invalidation_bus
+
+from .rates import QuoteSnapshot
+from .rates import RateEngine
+
+logger = logging.getLogger(__name__)
+
+SSE_HEARTBEAT = b': heartbeat\n\n'
+
+
+def encode_sse_event(data: Any, *, event: str, event_id: int | None = None) -> bytes:
+    """Encode data into a server-sent event with JSON payload."""
+    lines = [f'event: {event}'.encode()]
+    if event_id is not None:
+        lines.append(f'id: {event_id}'.encode())
+    lines.append(b'data: ' + fastjson.dumps(data))
+
+    return b'\n'.join(lines) + b'\n\n'
+
+
+async def encode_sse_stream(
+    events: AsyncIterator[dict[str, Any] | None],
+) -> AsyncIterator[bytes]:
+    """Encode stream of rate changes into server-sent events, None into heartbeat comment."""
+    async for event in events:
+        if event is None:
+            yield SSE_HEARTBEAT
+        else:
+            yield encode_sse_event(event, event='rates', event_id=event['version'])
+
+
+class Subscription:
+    """
+    Mailbox of a single subscriber keeping only the latest snapshot.
+
+    A slow consumer skips intermediate snapshots instead of queueing them, so memory of a
+    subscriber is bounded and it always catches up with the latest quotes.
+    """
+
+    def __init__(self) -> None:
+        self.skipped = 0
+        self._snapshot: QuoteSnapshot | None = None
+        self._ready = asyncio.Event()
+
+    def put(self, snapshot: QuoteSnapshot) -> None:
+        """Replace the pending snapshot by the newer one."""
+        if self._snapshot is not None:
+            self.skipped += 1
+        self._snapshot = snapshot
+        self._ready.set()
+
+    async def get(self) -> QuoteSnapshot:
+        """Wait for the next snapshot."""
+        await self._ready.wait()
+        self._ready.clear()
+        snapshot, self._snapshot = self._snapshot, None
+
+        return snapshot  # type: ignore[return-value]
+
+
+class RateBroker:
+    """
+    Fan-out of new quote snapshots to all stream subscribers of the worker.
+
+    The broker is woken up by the invalidation bus when a new snapshot lands and loads it once
+    for all subscribers. Snapshots are also polled on a fixed interval in case a message was
+    lost or the bus is disabled. Nothing is loaded while there are no subscribers.
+    """
+
+    def __init__(
+        self,
+        *,
+        source: str | None = None,
+        poll_interval: float | None = None,
+    ) -> None:
+        self.source = source or settings.RATE_SOURCE_CURRENCY
+        self.key = f'quotes:{self.source}'
+        self.poll_interval = poll_interval or settings.STREAM_POLL_INTERVAL
+        self.snapshot: QuoteSnapshot | None = None
+        self._subscriptions: set[Subscription] = set()
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def subscribers(self) -> int:
+        """Get the number of subscribers."""
+        return len(self._subscriptions)
+
+    def invalidate(self, key: str, version: int) -> None:
+        """Wake up the broker when a newer snapshot is published."""
+        if key == self.key and (self.snapshot is None or version > self.snapshot.version):
+            self._changed.set()
+
+    def invalidate_all(self) -> None:
+        """Wake up the broker after the bus was disconnected and messages may be lost."""
+        self._changed.set()
+
+    @contextmanager
+    def subscribe(self) -> Iterator[Subscription]:
+        """Receive new snapshots until exit."""
+        subscription = Subscription()
+        self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, snapshot: QuoteSnapshot) -> None:
+        """Pass the snapshot to all subscribers unless it is not newer than the last one."""
+        if self.snapshot is not None and snapshot.version <= self.snapshot.version:
+            return
+
+        self.snapshot = snapshot
+        for subscription in self._subscriptions:
+            subscription.put(snapshot)
+
+    async def run(self) -> None:
+        """Load and publish new snapshots until cancelled."""
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            if not self._subscriptions:
+                continue
+
+            try:
+                self.publish(await RateEngine(source=self.source).get_snapshot())
+            except Exception:
+                logger.exception('Failed to load quotes snapshot for stream subscribers')
+
+    def start(self) -> None:
+        """Start publishing in background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop publishing."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+rate_broker = RateBroker()
+invalidation_bus.register(rate_broker)
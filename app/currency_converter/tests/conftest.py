@@ -1,4 +1,5 @@
 import asyncio
+import time
 from unittest import mock
 
 import httpx
@@ -8,6 +9,11 @@ from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from app.config import settings
+from app.currency_converter.cache import currencies_local_cache
+from app.currency_converter.cache import rates_local_cache
+from app.currency_converter.cache import series_local_cache
+from app.currency_converter.clients import exchangerate_breaker
+from app.currency_converter.rates import QuoteSnapshot
 from app.currency_converter.schemas import RateOutput
 from app.database import Base
 from app.redis import redis_client
@@ -74,6 +80,29 @@ async def flush_redis():
     await redis_client.flushdb()
 
 
+@pytest.fixture(autouse=True)
+def clear_local_caches():
+    """Clear worker-level caches after each test."""
+    yield None
+    currencies_local_cache.clear()
+    rates_local_cache.clear()
+    series_local_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def disable_response_cache():
+    """Disable response cache, tests of the cache enable it back."""
+    with mock.patch.object(settings, 'RESPONSE_CACHE_ENABLED', False):
+        yield None
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breaker():
+    """Close circuit breaker of Exchangerate API after each test."""
+    yield None
+    exchangerate_breaker.reset()
+
+
 @pytest_asyncio.fixture
 async def mock_httpx_client():
     """Mock fixture of httpx.AsyncClient."""
@@ -108,7 +137,7 @@ async def mock_client_get():
 async def mock_client_get_rate():
     """Mock fixture of method ExchangerateClient.get_rate()."""
     with mock.patch(
-        'app.currency_converter.services.ExchangerateClient.get_rate',
+        'app.currency_converter.providers.ExchangerateClient.get_rate',
         return_value={
             'base': 'EUR',
             'target': 'USD',
@@ -119,11 +148,40 @@ async def mock_client_get_rate():
         yield method
 
 
+@pytest_asyncio.fixture
+async def mock_client_get_quotes():
+    """Mock fixture of method ExchangerateClient.get_quotes()."""
+    with mock.patch(
+        'app.currency_converter.providers.ExchangerateClient.get_quotes',
+        return_value={
+            'source': 'USD',
+            'timestamp': 1704067200,
+            'quotes': {'EUR': 2.0, 'AMD': 400.0, 'GEL': 2.5, 'BTC': 0.000025},
+        },
+    ) as method:
+        yield method
+
+
+@pytest_asyncio.fixture
+async def mock_client_get_rates():
+    """Mock fixture of method ExchangerateClient.get_rates()."""
+    with mock.patch(
+        'app.currency_converter.providers.ExchangerateClient.get_rates',
+        return_value=[{
+            'base': 'BTC',
+            'target': 'USD',
+            'pair': 'BTCUSD',
+            'rate': 40000,
+        }],
+    ) as method:
+        yield method
+
+
 @pytest_asyncio.fixture
 async def mock_client_get_available_currencies():
     """Mock fixture of method ExchangerateClient.get_available_currencies()."""
     with mock.patch(
-        'app.currency_converter.services.ExchangerateClient.get_available_currencies',
+        'app.currency_converter.providers.ExchangerateClient.get_available_currencies',
         return_value={
             'USD': 'United States Dollar',
             'AMD': 'Armenian Dram',
@@ -133,11 +191,11 @@ async def mock_client_get_available_currencies():
 
 
 @pytest_asyncio.fixture
-async def mock_is_currency_available():
-    """Mock fixture of method CurrencyService.is_currency_available()."""
+async def mock_check_currencies_available():
+    """Mock fixture of method CurrencyService.check_currencies_available()."""
     with mock.patch(
-        'app.currency_converter.services.CurrencyService.is_currency_available',
-        return_value=True,
+        'app.currency_converter.services.CurrencyService.check_currencies_available',
+        return_value=None,
     ) as method:
         yield method
 
@@ -154,3 +212,31 @@ async def mock_currency_service_get_rate():
         ),
     ) as mock_service:
         yield mock_service
+
+
+@pytest.fixture
+def quote_snapshot():
+    """Quotes snapshot fetched just now fixture."""
+    return QuoteSnapshot(
+        source='USD',
+        timestamp=1700000000,
+        quotes={'BTC': 0.000025},
+        version=3,
+        fetched_at=time.time(),
+    )
+
+
+@pytest_asyncio.fixture
+async def mock_currency_service_get_snapshot(quote_snapshot):
+    """Mock fixture of methods getting the quotes snapshot of CurrencyService."""
+    with (
+        mock.patch(
+            'app.currency_converter.routes.CurrencyService.get_snapshot',
+            return_value=quote_snapshot,
+        ) as mock_service,
+        mock.patch(
+            'app.currency_converter.routes.CurrencyService.get_rate_snapshot',
+            return_value=quote_snapshot,
+        ),
+    ):
+        yield mock_service
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from app.currency_converter.analytics import bucket_starts
+from app.currency_converter.analytics import ohlc
+from app.currency_converter.analytics import pair_series
+from app.currency_converter.analytics import rate_series
+from app.currency_converter.analytics import rolling
+
+times = np.array([
+    '2024-01-28T12:00', '2024-01-29', '2024-01-29T18:00', '2024-01-31', '2024-02-01',
+], dtype='datetime64[s]')
+rates = np.array([1.0, 2.0, 4.0, 3.0, 5.0])
+
+
+@pytest.mark.parametrize(('resolution', 'expected'), [
+    ('daily', ['2024-01-28', '2024-01-29', '2024-01-29', '2024-01-31', '2024-02-01']),
+    ('weekly', ['2024-01-22', '2024-01-29', '2024-01-29', '2024-01-29', '2024-01-29']),
+    ('monthly', ['2024-01-01', '2024-01-01', '2024-01-01', '2024-01-01', '2024-02-01']),
+])
+def test_bucket_starts(resolution, expected):
+    """Buckets start on the day, Monday of the week or the first day of the month."""
+    assert bucket_starts(times, resolution).astype(str).tolist() == expected
+
+
+def test_ohlc():
+    """Every bucket gets open, high, low, close and mean rates."""
+    columns = ohlc(times, rates, 'weekly')
+
+    assert columns['time'].astype(str).tolist() == ['2024-01-22', '2024-01-29']
+    assert columns['open'].tolist() == [1.0, 2.0]
+    assert columns['high'].tolist() == [1.0, 5.0]
+    assert columns['low'].tolist() == [1.0, 2.0]
+    assert columns['close'].tolist() == [1.0, 5.0]
+    assert columns['mean'].tolist() == [1.0, 3.5]
+
+
+def test_rolling():
+    """Statistics are missing until the window is full."""
+    columns = rolling(rates, 3)
+
+    np.testing.assert_allclose(columns['sma'], [np.nan, np.nan, 7 / 3, 3.0, 4.0])
+    np.testing.assert_allclose(
+        columns['std'][2:],
+        [np.std([1, 2, 4]), np.std([2, 4, 3]), np.std([4, 3, 5])],
+    )
+
+
+def test_pair_series():
+    """Rates are derived at times quoted for both currencies, the source one is quoted by 1."""
+    base = (times[:3], np.array([2.0, 2.0, 4.0]))
+    target = (times[1:], np.array([8.0, 8.0, 8.0, 8.0]))
+
+    cross_times, cross_rates = pair_series(base, target)
+    inverse_times, inverse_rates = pair_series(base, None)
+
+    assert cross_times.tolist() == times[1:3].tolist()
+    assert cross_rates.tolist() == [4.0, 2.0]
+    assert inverse_rates.tolist() == [0.5, 0.5, 0.25]
+
+
+def test_rate_series():
+    """Series is encoded into JSON columns with missing statistics as None."""
+    series = rate_series(times, rates, resolution='monthly', window=2)
+
+    assert series['time'] == ['2024-01-01', '2024-02-01']
+    assert series['close'] == [3.0, 5.0]
+    assert series['sma'] == [None, 4.0]
+
+
+def test_empty_series():
+    """Empty series gives empty columns."""
+    series = rate_series(times[:0], rates[:0], resolution='daily', window=2)
+
+    assert series == dict.fromkeys(
+        ['time', 'open', 'high', 'low', 'close', 'mean', 'sma', 'std'],
+        [],
+    )
@@ -0,0 +1,185 @@
+import datetime as dt
+import itertools
+import json
+from unittest import mock
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy import select
+
+from app.currency_converter.backfill import Checkpoint
+from app.currency_converter.backfill import QuoteCopyLoader
+from app.currency_converter.backfill import backfill
+from app.currency_converter.backfill import fetch_timeframe
+from app.currency_converter.backfill import read_csv
+from app.currency_converter.backfill import read_json
+from app.currency_converter.clients import ExchangerateClient
+from app.currency_converter.history import HistoricalRateStore
+from app.currency_converter.models import HistoricalQuote
+from app.currency_converter.providers import ExchangerateProvider
+
+CSV_DUMP = """date,currency,quote
+2024-01-31,EUR,0.5
+2024-01-31,AMD,400
+2024-02-01T12:00:00,EUR,0.6
+"""
+
+
+async def daily_quotes(client, *, source, start_date, end_date):
+    """Get the same quotes for every date of the range."""
+    days = (end_date - start_date).days + 1
+    return {
+        start_date + dt.timedelta(days=offset): {'EUR': 0.5}
+        for offset in range(days)
+    }
+
+
+async def count_quotes(db_session) -> int:
+    """Get the number of stored quotes."""
+    return await db_session.scalar(select(func.count()).select_from(HistoricalQuote))
+
+
+def test_read_csv(tmp_path):
+    """CSV dump is parsed into rows with dates at midnight UTC."""
+    path = tmp_path / 'quotes.csv'
+    path.write_text(CSV_DUMP)
+
+    assert list(read_csv(path, source='USD')) == [
+        (dt.datetime(2024, 1, 31, tzinfo=dt.timezone.utc), 'EUR', 0.5),
+        (dt.datetime(2024, 1, 31, tzinfo=dt.timezone.utc), 'AMD', 400.0),
+        (dt.datetime(2024, 2, 1, 12, tzinfo=dt.timezone.utc), 'EUR', 0.6),
+    ]
+
+
+@pytest.mark.parametrize(('name', 'content'), [
+    (
+        'quotes.jsonl',
+        '{"date": "2024-01-31", "quotes": {"USDUSD": 1, "USDEUR": 0.5}}\n'
+        '\n'
+        '{"date": "2024-02-01", "quotes": {"EUR": 0.6}}\n',
+    ),
+    (
+        'quotes.json',
+        json.dumps({'quotes': {'2024-01-31': {'USDEUR': 0.5}, '2024-02-01': {'USDEUR': 0.6}}}),
+    ),
+])
+def test_read_json(tmp_path, name, content):
+    """JSON dumps are parsed into rows without quote of the source currency."""
+    path = tmp_path / name
+    path.write_text(content)
+
+    assert [(quoted_at.date(), target, rate) for quoted_at, target, rate in read_json(
+        path,
+        source='USD',
+    )] == [
+        (dt.date(2024, 1, 31), 'EUR', 0.5),
+        (dt.date(2024, 2, 1), 'EUR', 0.6),
+    ]
+
+
+def test_read_json_foreign_pair(tmp_path):
+    """Pair not against the source currency is rejected instead of loaded as a currency."""
+    path = tmp_path / 'quotes.jsonl'
+    path.write_text('{"date": "2024-01-31", "quotes": {"USDEUR": 0.5, "EURGBP": 0.8}}\n')
+
+    with pytest.raises(ValueError, match='EURGBP'):
+        list(read_json(path, source='USD'))
+
+
+@pytest.mark.asyncio
+class TestBackfill:
+    """Testing backfill of historical quotes."""
+
+    async def test_csv_dump(self, tmp_path, db_session):
+        """Rows are loaded by chunks and the checkpoint is advanced."""
+        path = tmp_path / 'quotes.csv'
+        path.write_text(CSV_DUMP)
+        checkpoint = Checkpoint(tmp_path / 'checkpoint.json', key='test')
+
+        loaded, throughput = await backfill(
+            read_csv(path, source='USD'),
+            QuoteCopyLoader(db_session, source='USD'),
+            checkpoint,
+            chunk_size=2,
+        )
+        snapshot = await HistoricalRateStore(db_session).get_snapshot(
+            dt.date(2024, 2, 1),
+            ['EUR'],
+        )
+
+        assert loaded == 3
+        assert throughput > 0
+        assert snapshot.quotes == {'EUR': 0.6}
+        assert Checkpoint(tmp_path / 'checkpoint.json', key='test').rows == 3
+        assert checkpoint.last_date == dt.date(2024, 2, 1)
+
+    async def test_idempotent(self, tmp_path, db_session):
+        """Loading the same rows again replaces them."""
+        path = tmp_path / 'quotes.csv'
+        path.write_text(CSV_DUMP)
+        loader = QuoteCopyLoader(db_session, source='USD')
+
+        for _ in range(2):
+            await backfill(read_csv(path, source='USD'), loader, Checkpoint(None, key='test'))
+
+        assert await count_quotes(db_session) == 3
+
+    async def test_resume(self, tmp_path, db_session):
+        """Import is resumed from the saved position."""
+        path = tmp_path / 'quotes.csv'
+        path.write_text(CSV_DUMP)
+        checkpoint_path = tmp_path / 'checkpoint.json'
+        loader = QuoteCopyLoader(db_session, source='USD')
+        await backfill(
+            itertools.islice(read_csv(path, source='USD'), 2),
+            loader,
+            Checkpoint(checkpoint_path, key='test'),
+        )
+
+        checkpoint = Checkpoint(checkpoint_path, key='test')
+        loaded, _ = await backfill(
+            itertools.islice(read_csv(path, source='USD'), checkpoint.rows, None),
+            loader,
+            checkpoint,
+        )
+
+        assert loaded == 1
+        assert checkpoint.rows == 3
+        assert await count_quotes(db_session) == 3
+
+    async def test_checkpoint_of_another_import(self, tmp_path):
+        """Checkpoint of another import is not used."""
+        Checkpoint(tmp_path / 'checkpoint.json', key='first').advance([
+            (dt.datetime(2024, 1, 31, tzinfo=dt.timezone.utc), 'EUR', 0.5),
+        ])
+
+        with pytest.raises(ValueError):
+            Checkpoint(tmp_path / 'checkpoint.json', key='second')
+
+    async def test_upstream(self, db_session):
+        """Quotes are streamed by one request per year."""
+        with mock.patch.object(
+            ExchangerateClient,
+            'get_historical_quotes',
+            autospec=True,
+            side_effect=daily_quotes,
+        ) as get_historical_quotes:
+            loaded, _ = await backfill(
+                fetch_timeframe(
+                    ExchangerateProvider(),
+                    source='USD',
+                    start=dt.date(2023, 1, 1),
+                    end=dt.date(2024, 1, 31),
+                ),
+                QuoteCopyLoader(db_session, source='USD'),
+                Checkpoint(None, key='test'),
+            )
+
+        assert loaded == 396
+        assert [
+            (call.kwargs['start_date'], call.kwargs['end_date'])
+            for call in get_historical_quotes.call_args_list
+        ] == [
+            (dt.date(2023, 1, 1), dt.date(2023, 12, 31)),
+            (dt.date(2024, 1, 1), dt.date(2024, 1, 31)),
+        ]
@@ -0,0 +1,271 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app.core.singleflight import RedisSingleFlight
+from app.currency_converter.cache import LocalCache
+from app.currency_converter.cache import RedisCache
+from app.redis import redis_client
+
+
+class TestLocalCache:
+    """Testing LocalCache."""
+
+    def test_hit_and_miss_counters(self):
+        """Counters reflect cache lookups."""
+        cache = LocalCache(maxsize=10, ttl=60)
+        cache.set('key', 'value')
+
+        assert cache.get('key') == 'value'
+        assert cache.get('missing') is None
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+    def test_expired_value(self):
+        """Expired value is removed on lookup."""
+        cache = LocalCache(maxsize=10, ttl=60)
+        with mock.patch('app.currency_converter.cache.time.monotonic', return_value=100):
+            cache.set('key', 'value')
+
+        with mock.patch('app.currency_converter.cache.time.monotonic', return_value=160):
+            assert cache.get('key') is None
+
+        assert cache.stats() == {'hits': 0, 'misses': 1, 'size': 0}
+
+    def test_least_recently_used_evicted(self):
+        """Least recently used value is evicted above the size limit."""
+        cache = LocalCache(maxsize=2, ttl=60)
+        cache.set('first', 1)
+        cache.set('second', 2)
+        cache.get('first')
+        cache.set('third', 3)
+
+        assert cache.get('second') is None
+        assert cache.get('first') == 1
+        assert cache.get('third') == 3
+
+    def test_older_version_not_saved(self):
+        """Value older than the known version is not saved."""
+        cache = LocalCache(maxsize=10, ttl=60)
+        cache.invalidate('key', 2)
+        cache.set('key', 'old', version=1)
+
+        assert cache.get('key') is None
+
+        cache.set('key', 'new', version=2)
+
+        assert cache.get('key') == 'new'
+
+    def test_invalidate(self):
+        """Value is removed only by a newer version."""
+        cache = LocalCache(maxsize=10, ttl=60)
+        cache.set('key', 'value', version=2)
+        cache.invalidate('key', 2)
+
+        assert cache.get('key') == 'value'
+
+        cache.invalidate('key', 3)
+
+        assert cache.get('key') is None
+
+    def test_versions_of_evicted_values_forgotten(self):
+        """Versions of evicted values are not kept, so they are bounded by the size limit."""
+        cache = LocalCache(maxsize=2, ttl=60)
+        for version in range(1, 6):
+            cache.set(f'key{version}', version, version=version)
+
+        assert set(cache._versions) == {'key4', 'key5'}
+
+
+@pytest.mark.asyncio
+class TestRedisCacheGetOrLoad:
+    """Testing method get_or_load of RedisCache."""
+
+    @pytest.fixture
+    def cache(self):
+        """Cache instance with short TTL and grace period."""
+        return RedisCache(prefix='test', ttl=10, grace=20)
+
+    async def test_value_loaded_and_saved(self, cache):
+        """Missing value is loaded and saved with TTL plus grace period expiry."""
+        loader = mock.AsyncMock(return_value={'rate': 1.5})
+
+        assert await cache.get_or_load('key', loader) == {'rate': 1.5}
+        assert await cache.get_or_load('key', loader) == {'rate': 1.5}
+
+        loader.assert_awaited_once()
+        assert 20 < await cache._redis.ttl('test:key') <= 30
+
+    async def test_stale_value_refreshed_in_background(self, cache):
+        """Stale value is served while single background task refreshes it."""
+        with mock.patch('app.currency_converter.cache.time.time', return_value=1000):
+            await cache.set('key', 'stale')
+
+        loaded = asyncio.Event()
+
+        async def load_fresh_value():
+            await loaded.wait()
+            return 'fresh'
+
+        loader = mock.AsyncMock(side_effect=load_fresh_value)
+        with mock.patch('app.currency_converter.cache.time.time', return_value=1015):
+            results = await asyncio.gather(*[cache.get_or_load('key', loader) for _ in range(5)])
+            loaded.set()
+            await asyncio.gather(*RedisCache._refresh_tasks.values())
+
+            assert await cache.get('key') == ('fresh', True)
+
+        assert results == ['stale'] * 5
+        loader.assert_awaited_once()
+
+    async def test_refresh_error_keeps_stale_value(self, cache):
+        """Failed background refresh does not remove stale value."""
+        with mock.patch('app.currency_converter.cache.time.time', return_value=1000):
+            await cache.set('key', 'stale')
+
+        loader = mock.AsyncMock(side_effect=RuntimeError)
+        with mock.patch('app.currency_converter.cache.time.time', return_value=1015):
+            assert await cache.get_or_load('key', loader) == 'stale'
+            await asyncio.gather(*RedisCache._refresh_tasks.values())
+
+            assert await cache.get('key') == ('stale', False)
+
+    async def test_local_cache_in_front_of_redis(self):
+        """Fresh value is served from the local cache without Redis lookup."""
+        local = LocalCache(maxsize=10, ttl=60)
+        cache = RedisCache(prefix='test', ttl=10, grace=20, local=local)
+        loader = mock.AsyncMock(return_value='value')
+        await cache.get_or_load('key', loader)
+
+        with mock.patch.object(cache, '_get_entry') as redis_get:
+            assert await cache.get_or_load('key', loader) == 'value'
+
+        redis_get.assert_not_called()
+        assert local.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+    async def test_ephemeral_value_leaves_nothing_behind(self):
+        """Ephemeral value is saved only with expiry, without last copy, version or broadcast."""
+        cache = RedisCache(prefix='test', ttl=10, grace=20, ephemeral=True)
+        loader = mock.AsyncMock(return_value='value')
+
+        with mock.patch('app.currency_converter.cache.invalidation_bus.publish') as publish:
+            assert await cache.get_or_load('key', loader) == 'value'
+
+        assert await redis_client.keys('test:*') == ['test:key']
+        assert 20 < await redis_client.ttl('test:key') <= 30
+        publish.assert_not_called()
+
+
+@pytest.mark.asyncio
+class TestRedisCacheFallback:
+    """Testing fallback of RedisCache to the last saved value."""
+
+    async def test_last_value_used_on_error(self):
+        """The last value is returned when loading of expired value fails."""
+        cache = RedisCache(prefix='test', ttl=10, grace=20)
+        await cache.set('key', 'last')
+        await redis_client.delete('test:key')
+        loader = mock.AsyncMock(side_effect=ValueError)
+
+        assert await cache.get_or_load('key', loader, fallback_on=(ValueError,)) == 'last'
+
+    async def test_no_last_value(self):
+        """Error is raised when there is no value to fall back to."""
+        cache = RedisCache(prefix='test', ttl=10, grace=20)
+        loader = mock.AsyncMock(side_effect=ValueError)
+
+        with pytest.raises(ValueError):
+            await cache.get_or_load('key', loader, fallback_on=(ValueError,))
+
+
+@pytest.mark.asyncio
+class TestRedisSingleFlightDo:
+    """Testing method do of RedisSingleFlight."""
+
+    key = 'test:singleflight'
+
+    async def test_only_one_worker_fills_key(self):
+        """Waiting worker gets the value filled by another worker."""
+        workers = [RedisSingleFlight(wait_timeout=1, poll_interval=0.01) for _ in range(3)]
+        release = asyncio.Event()
+
+        async def fill():
+            await release.wait()
+            await redis_client.set(self.key, 'value')
+            return 'value'
+
+        async def check():
+            return await redis_client.get(self.key)
+
+        func = mock.AsyncMock(side_effect=fill)
+        tasks = [
+            asyncio.create_task(worker.do(self.key, func, check=check)) for worker in workers
+        ]
+        await asyncio.sleep(0.05)
+        release.set()
+
+        assert await asyncio.gather(*tasks) == ['value'] * 3
+        func.assert_awaited_once()
+        assert await redis_client.exists(f'{self.key}:lock') == 0
+
+    async def test_waits_while_lock_held(self):
+        """Waiting worker fills the key only after the lock holder releases it without result."""
+        await redis_client.set(f'{self.key}:lock', 'another-worker')
+        func = mock.AsyncMock(return_value='value')
+        check = mock.AsyncMock(return_value=None)
+
+        worker = RedisSingleFlight(wait_timeout=0.01, poll_interval=0.01)
+        task = asyncio.create_task(worker.do(self.key, func, check=check))
+        await asyncio.sleep(0.1)
+
+        func.assert_not_awaited()
+
+        await redis_client.delete(f'{self.key}:lock')
+
+        assert await task == 'value'
+        func.assert_awaited_once()
+
+    async def test_wait_timeout_fallback(self):
+        """Worker waiting longer than the wait timeout gets the fallback value."""
+        await redis_client.set(f'{self.key}:lock', 'another-worker')
+        func = mock.AsyncMock(return_value='value')
+        check = mock.AsyncMock(return_value=None)
+        fallback = mock.AsyncMock(return_value='last')
+
+        result = await RedisSingleFlight(wait_timeout=0.05, poll_interval=0.01).do(
+            self.key,
+            func,
+            check=check,
+            fallback=fallback,
+        )
+
+        assert result == 'last'
+        func.assert_not_awaited()
+        fallback.assert_awaited_once()
+
+    async def test_lock_extended_during_slow_fill(self):
+        """Lock does not expire while its holder is still filling the key."""
+        release = asyncio.Event()
+        worker = RedisSingleFlight(lock_timeout=0.1, poll_interval=0.01)
+
+        async def fill():
+            await release.wait()
+            return 'value'
+
+        task = asyncio.create_task(worker.do(self.key, fill, check=mock.AsyncMock()))
+        await asyncio.sleep(0.3)
+
+        assert await RedisSingleFlight().do_if_free(self.key, mock.AsyncMock()) is False
+
+        release.set()
+
+        assert await task == 'value'
+        assert await redis_client.exists(f'{self.key}:lock') == 0
+
+    async def test_do_if_free_skipped(self):
+        """Function is not called while another worker holds the lock."""
+        await redis_client.set(f'{self.key}:lock', 'another-worker')
+        func = mock.AsyncMock()
+
+        assert await RedisSingleFlight().do_if_free(self.key, func) is False
+        func.assert_not_awaited()
@@ -1,14 +1,50 @@
+import asyncio
+import datetime as dt
+from unittest import mock
 from urllib.parse import urljoin
 
 import httpx
 import pytest
 
 from app.config import settings
+from app.core.ratelimit import RedisTokenBucket
 from app.currency_converter.clients import ExchangerateClient
+from app.currency_converter.clients import exchangerate_breaker
+from app.http_client import http_pool
 
 test_url = 'http://test-url'
 
 
+@pytest.mark.asyncio
+class TestExchangerateClientHttpPool:
+    """Testing reuse of the shared httpx client by ExchangerateClient."""
+
+    async def test_shared_client_is_used(self):
+        """Client uses the pooled httpx client and does not close it."""
+        shared_client = mock.AsyncMock()
+        with mock.patch.object(http_pool, '_client', shared_client):
+            async with ExchangerateClient() as client:
+                assert client._httpx_client is shared_client
+
+        shared_client.aclose.assert_not_awaited()
+
+    async def test_provided_client_is_used(self):
+        """Explicitly provided httpx client is not closed by ExchangerateClient."""
+        provided_client = mock.AsyncMock()
+        async with ExchangerateClient(httpx_client=provided_client) as client:
+            assert client._httpx_client is provided_client
+
+        provided_client.aclose.assert_not_awaited()
+
+    async def test_own_client_without_pool(self, mock_httpx_client):
+        """Client creates and closes its own httpx client when the pool is not opened."""
+        assert http_pool.client is None
+        async with ExchangerateClient() as client:
+            own_client = client._httpx_client
+
+        own_client.aclose.assert_awaited_once()
+
+
 @pytest.mark.asyncio
 class TestExchangerateClientGet:
     """Testing method _get of ExchangerateClient."""
@@ -31,6 +67,15 @@ class TestExchangerateClientGet:
             params={'access_key': settings.EXCHANGERATE_ACCESS_KEY, 'test_param': 'test_value'},
         )
 
+    async def test_concurrent_identical_requests(self, mock_httpx_client):
+        """Concurrent identical requests are sent to Exchangerate API once."""
+        responses = await asyncio.gather(*[
+            ExchangerateClient()._get(test_url, params={'source': 'USD'}) for _ in range(5)
+        ])
+
+        mock_httpx_client.get.assert_awaited_once()
+        assert all(response == responses[0] for response in responses)
+
     async def test_successful_response(self, mock_httpx_client):
         """Successful response."""
         response = await ExchangerateClient()._get(test_url)
@@ -75,6 +120,120 @@ class TestExchangerateClientGet:
         assert exc.value.message == 'Unknown error from third party service.'
 
 
+@pytest.mark.asyncio
+class TestExchangerateClientResilience:
+    """Testing retries and circuit breaker of ExchangerateClient requests."""
+
+    @pytest.fixture(autouse=True)
+    def no_retry_delay(self):
+        """Skip delays between retries."""
+        with mock.patch('app.core.resilience.asyncio.sleep'):
+            yield None
+
+    async def test_server_error_retried(self, mock_httpx_client):
+        """Server error is retried and successful response is returned."""
+        mock_httpx_client.get.side_effect = [
+            httpx.Response(status_code=503),
+            httpx.ConnectError('connection failed'),
+            httpx.Response(status_code=200, json={'success': True, 'quotes': {}}),
+        ]
+
+        response = await ExchangerateClient()._get(test_url)
+
+        assert response == {'success': True, 'quotes': {}}
+        assert mock_httpx_client.get.await_count == 3
+        assert exchangerate_breaker.failures == 0
+
+    @pytest.mark.parametrize('response', [
+        httpx.Response(status_code=500),
+        httpx.Response(status_code=200, content=b'not json'),
+    ])
+    async def test_attempts_exhausted(self, mock_httpx_client, response):
+        """Unknown error is raised and counted by circuit breaker when attempts are exhausted."""
+        mock_httpx_client.get.side_effect = None
+        mock_httpx_client.get.return_value = response
+
+        with pytest.raises(ExchangerateClient.UnknownClientError):
+            await ExchangerateClient()._get(test_url)
+
+        assert mock_httpx_client.get.await_count == settings.EXCHANGERATE_RETRY_ATTEMPTS
+        assert exchangerate_breaker.failures == 1
+
+    async def test_deadline_exceeded(self, mock_httpx_client):
+        """Unknown error is raised when the request does not finish before the deadline."""
+        async def slow_response(*args, **kwargs):
+            await asyncio.Event().wait()
+
+        mock_httpx_client.get.side_effect = slow_response
+        with (
+            mock.patch.object(settings, 'EXCHANGERATE_DEADLINE', 0.01),
+            pytest.raises(ExchangerateClient.UnknownClientError),
+        ):
+            await ExchangerateClient()._get(test_url)
+
+    async def test_circuit_open(self, mock_httpx_client):
+        """Requests fail fast while circuit is open."""
+        for _ in range(settings.EXCHANGERATE_BREAKER_FAILURE_THRESHOLD):
+            exchangerate_breaker.record_failure()
+
+        with pytest.raises(ExchangerateClient.UnavailableError) as exc:
+            await ExchangerateClient()._get(test_url)
+
+        assert exc.value.message == 'Third party service is temporarily unavailable.'
+        mock_httpx_client.get.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+class TestRedisTokenBucket:
+    """Testing RedisTokenBucket."""
+
+    async def test_tokens_taken_until_empty(self):
+        """Tokens are taken until the bucket is empty and usage is counted."""
+        bucket = RedisTokenBucket(key='test:bucket', capacity=2, refill_rate=0.001)
+
+        assert [await bucket.acquire() for _ in range(3)] == [True, True, False]
+
+        budget = await bucket.get_budget()
+        assert budget['tokens'] < 1
+        assert budget['used_this_month'] == 2
+
+    async def test_waits_for_refill(self):
+        """Token refilled before the timeout is waited for."""
+        bucket = RedisTokenBucket(key='test:bucket', capacity=1, refill_rate=50)
+        await bucket.acquire()
+
+        assert await bucket.acquire(timeout=0.5) is True
+
+    async def test_refill_after_timeout(self):
+        """Waiting is skipped when the token is not refilled before the timeout."""
+        bucket = RedisTokenBucket(key='test:bucket', capacity=1, refill_rate=0.001)
+        await bucket.acquire()
+
+        with mock.patch('app.core.ratelimit.asyncio.sleep') as sleep:
+            assert await bucket.acquire(timeout=5) is False
+
+        sleep.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+class TestExchangerateClientQuota:
+    """Testing request quota of ExchangerateClient."""
+
+    async def test_quota_exceeded(self, mock_httpx_client):
+        """Request is not sent when the quota is exhausted."""
+        bucket = RedisTokenBucket(key='test:bucket', capacity=1, refill_rate=0.001)
+        await bucket.acquire()
+
+        with (
+            mock.patch('app.currency_converter.clients.exchangerate_quota', bucket),
+            pytest.raises(ExchangerateClient.QuotaExceededError),
+        ):
+            await ExchangerateClient()._get(test_url)
+
+        mock_httpx_client.get.assert_not_awaited()
+        assert exchangerate_breaker.failures == 0
+
+
 @pytest.mark.asyncio
 class TestExchangerateClientGetRate:
     """Testing method get_rate of ExchangerateClient."""
@@ -118,6 +277,128 @@ class TestExchangerateClientGetRate:
             await ExchangerateClient().get_rate(base=self.base, target=self.target)
 
 
+@pytest.mark.asyncio
+class TestExchangerateClientGetRates:
+    """Testing method get_rates of ExchangerateClient."""
+
+    base = 'USD'
+    targets = ['EUR', 'AMD']
+
+    async def test_successful_response(self, mock_client_get):
+        """Successful response."""
+        mock_client_get.return_value = {
+            'success': True,
+            'quotes': {'USDEUR': 1.278342, 'USDAMD': 400.5},
+        }
+        result = await ExchangerateClient().get_rates(base=self.base, targets=self.targets)
+
+        assert result == [
+            {'base': 'USD', 'target': 'EUR', 'pair': 'USDEUR', 'rate': 1.278342},
+            {'base': 'USD', 'target': 'AMD', 'pair': 'USDAMD', 'rate': 400.5},
+        ]
+        mock_client_get.assert_awaited_once_with(
+            urljoin(settings.EXCHANGERATE_URL.unicode_string(), 'live'),
+            params={'source': self.base, 'currencies': 'EUR,AMD'},
+        )
+
+    async def test_missing_quote(self, mock_client_get):
+        """Response has no quote for one of requested targets."""
+        with pytest.raises(ExchangerateClient.UnknownClientError):
+            await ExchangerateClient().get_rates(base=self.base, targets=self.targets)
+
+
+@pytest.mark.asyncio
+class TestExchangerateClientGetQuotes:
+    """Testing method get_quotes of ExchangerateClient."""
+
+    async def test_successful_response(self, mock_client_get):
+        """Successful response."""
+        mock_client_get.return_value = {
+            'success': True,
+            'timestamp': 1704067200,
+            'source': 'USD',
+            'quotes': {'USDUSD': 1, 'USDEUR': 0.9, 'USDAMD': 400.5},
+        }
+        result = await ExchangerateClient().get_quotes(source='USD')
+
+        assert result == {
+            'source': 'USD',
+            'timestamp': 1704067200,
+            'quotes': {'EUR': 0.9, 'AMD': 400.5},
+        }
+        mock_client_get.assert_awaited_once_with(
+            urljoin(settings.EXCHANGERATE_URL.unicode_string(), 'live'),
+            params={'source': 'USD'},
+        )
+
+    @pytest.mark.parametrize('json', [
+        {'success': True, 'wrong_key': 'wrong_value'},
+        {'success': True, 'quotes': 'wrong_value_structure'},
+    ])
+    async def test_wrong_json_response(self, mock_client_get, json):
+        """Unsuccessful response with unexpected json."""
+        mock_client_get.return_value = json
+        with pytest.raises(ExchangerateClient.UnknownClientError):
+            await ExchangerateClient().get_quotes(source='USD')
+
+
+@pytest.mark.asyncio
+class TestExchangerateClientGetHistoricalQuotes:
+    """Testing method get_historical_quotes of ExchangerateClient."""
+
+    async def test_single_day(self, mock_client_get):
+        """Single day is requested from historical endpoint."""
+        mock_client_get.return_value = {
+            'success': True,
+            'quotes': {'USDEUR': 0.9, 'USDAMD': 400.5},
+        }
+        result = await ExchangerateClient().get_historical_quotes(
+            source='USD',
+            start_date=dt.date(2024, 1, 31),
+            end_date=dt.date(2024, 1, 31),
+        )
+
+        assert result == {dt.date(2024, 1, 31): {'EUR': 0.9, 'AMD': 400.5}}
+        mock_client_get.assert_awaited_once_with(
+            urljoin(settings.EXCHANGERATE_URL.unicode_string(), 'historical'),
+            params={'source': 'USD', 'date': '2024-01-31'},
+        )
+
+    async def test_timeframe(self, mock_client_get):
+        """Range is requested from timeframe endpoint."""
+        mock_client_get.return_value = {
+            'success': True,
+            'quotes': {
+                '2024-01-30': {'USDUSD': 1, 'USDEUR': 0.8},
+                '2024-01-31': {'USDUSD': 1, 'USDEUR': 0.9},
+            },
+        }
+        result = await ExchangerateClient().get_historical_quotes(
+            source='USD',
+            start_date=dt.date(2024, 1, 30),
+            end_date=dt.date(2024, 1, 31),
+        )
+
+        assert result == {
+            dt.date(2024, 1, 30): {'EUR': 0.8},
+            dt.date(2024, 1, 31): {'EUR': 0.9},
+        }
+        mock_client_get.assert_awaited_once_with(
+            urljoin(settings.EXCHANGERATE_URL.unicode_string(), 'timeframe'),
+            params={'source': 'USD', 'start_date': '2024-01-30', 'end_date': '2024-01-31'},
+        )
+
+    async def test_wrong_json_response(self, mock_client_get):
+        """Unsuccessful response with unexpected json."""
+        mock_client_get.return_value = {'success': True, 'quotes': {'wrong_date': {}}}
+        with pytest.raises(ExchangerateClient.UnknownClientError):
+            await ExchangerateClient().get_historical_quotes(
+                source='USD',
+                start_date=dt.date(2024, 1, 30),
+                end_date=dt.date(2024, 1, 31),
+            )
+
+
 @pytest.mark.asyncio
 class TestExchangerateClientGetAvailable:
     """Testing method get_available_currencies of ExchangerateClient."""
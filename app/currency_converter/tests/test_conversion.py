@@ -0,0 +1,112 @@
+import warnings
+from decimal import Decimal
+from unittest import mock
+
+import numpy as np
+import pytest
+
+from app.config import settings
+from app.currency_converter.conversion import AmountConverter
+from app.currency_converter.conversion import minor_unit
+from app.currency_converter.conversion import multiply
+from app.currency_converter.conversion import multiply_exact
+from app.currency_converter.rates import QuoteSnapshot
+
+snapshot = QuoteSnapshot(
+    source='USD',
+    timestamp=1704067200,
+    quotes={'EUR': 0.8, 'AMD': 400.0, 'JPY': 150.0, 'BHD': 0.377},
+)
+
+
+class TestAmountConverter:
+    """Testing AmountConverter."""
+
+    converter = AmountConverter(snapshot)
+
+    def test_convert_single_pair(self):
+        """Array of amounts is converted by a single pair."""
+        result = self.converter.convert([1, 2.5, 0], base='EUR', target='AMD')
+
+        np.testing.assert_allclose(result, [500.0, 1250.0, 0.0])
+
+    def test_convert_many_pairs(self):
+        """Every amount is converted by its own pair."""
+        result = self.converter.convert(
+            np.array([1, 1, 400]),
+            base=['USD', 'EUR', 'AMD'],
+            target=['EUR', 'USD', 'AMD'],
+        )
+
+        np.testing.assert_allclose(result, [0.8, 1.25, 400.0])
+
+    @pytest.mark.parametrize(('base', 'target'), [
+        ('LOL', 'USD'),
+        (['USD', 'ZZZ'], 'USD'),
+        ('USD', ['AAA', 'USD']),
+    ])
+    def test_unknown_currency(self, base, target):
+        """Currency missing in the snapshot is reported."""
+        with pytest.raises(ValueError, match='No quote for currency'):
+            self.converter.convert([1, 2], base=base, target=target)
+
+    def test_different_lengths(self):
+        """Codes and amounts must have the same length."""
+        with pytest.raises(ValueError, match='different lengths'):
+            self.converter.convert([1, 2], base=['USD'] * 3, target='EUR')
+
+    def test_convert_exact(self):
+        """Exact conversion is rounded to minor units of target currencies."""
+        result = self.converter.convert_exact(
+            ['10', 1.005, '100'],
+            base=['EUR', 'USD', 'USD'],
+            target=['JPY', 'EUR', 'BHD'],
+        )
+
+        assert result == [Decimal('1875'), Decimal('0.80'), Decimal('37.700')]
+
+    def test_exact_rate(self):
+        """Cross rate is derived in Decimal."""
+        assert self.converter.exact_rate(base='EUR', target='AMD') == Decimal(500)
+        assert self.converter.exact_rate(base='AMD', target='AMD') == Decimal(1)
+
+
+class TestMultiply:
+    """Testing multiplication of amounts by rates."""
+
+    def test_missing_rate(self):
+        """Missing rate gives NaN."""
+        result = multiply([1, 2], [3.0, np.nan])
+
+        assert result[0] == 3.0
+        assert np.isnan(result[1])
+
+    def test_overflow(self):
+        """Overflowing product gives NaN without warning."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            result = multiply([1e307, 1], [400.0, 2.0])
+
+        assert np.isnan(result[0])
+        assert result[1] == 2.0
+
+    @pytest.mark.parametrize(('rounding', 'expected'), [
+        ('ROUND_HALF_EVEN', Decimal('0.12')),
+        ('ROUND_HALF_UP', Decimal('0.13')),
+    ])
+    def test_exact_rounding(self, rounding, expected):
+        """Rounding mode is configurable."""
+        with mock.patch.object(settings, 'CONVERSION_ROUNDING', rounding):
+            assert multiply_exact(['0.25'], ['0.5'], ['EUR']) == [expected]
+
+    def test_exact_too_large(self):
+        """Result which does not fit Decimal precision is None."""
+        assert multiply_exact([1e40, 1], [1.1, 1.1], ['EUR', 'EUR']) == [None, Decimal('1.10')]
+
+    def test_minor_unit_override(self):
+        """Minor units are configurable per currency."""
+        assert minor_unit('JPY') == 0
+        assert minor_unit('EUR') == 2
+
+        with mock.patch.object(settings, 'CURRENCY_MINOR_UNITS', {'EUR': 4}):
+            assert minor_unit('EUR') == 4
@@ -0,0 +1,60 @@
+import datetime as dt
+
+import pytest
+
+from app.currency_converter.history import HistoricalRateStore
+from app.currency_converter.history import month_ranges
+from app.currency_converter.rates import QuoteSnapshot
+
+
+def test_month_ranges():
+    """Months covering the dates are listed with exclusive upper bounds."""
+    assert list(month_ranges(dt.date(2023, 12, 31), dt.date(2024, 2, 1))) == [
+        (dt.date(2023, 12, 1), dt.date(2024, 1, 1)),
+        (dt.date(2024, 1, 1), dt.date(2024, 2, 1)),
+        (dt.date(2024, 2, 1), dt.date(2024, 3, 1)),
+    ]
+
+
+@pytest.mark.asyncio
+class TestHistoricalRateStore:
+    """Testing HistoricalRateStore."""
+
+    async def test_daily_quotes(self, db_session):
+        """Daily quotes spanning several partitions are saved and read by date."""
+        store = HistoricalRateStore(db_session)
+
+        saved = await store.save_daily({
+            dt.date(2024, 1, 30) + dt.timedelta(days=offset): {'EUR': 0.5 + offset / 100}
+            for offset in range(4)
+        })
+        snapshot = await store.get_snapshot(dt.date(2024, 2, 1), ['USD', 'EUR', 'AMD'])
+
+        assert saved == 4
+        assert snapshot.quotes == {'EUR': 0.52}
+        assert 'USD' in snapshot
+        assert 'AMD' not in snapshot
+
+    async def test_intraday_quotes_win(self, db_session):
+        """The last quote within the day is used."""
+        store = HistoricalRateStore(db_session)
+        await store.save_daily({dt.date(2024, 1, 31): {'EUR': 0.5}})
+        await store.save_snapshot(QuoteSnapshot(
+            source='USD',
+            timestamp=int(dt.datetime(2024, 1, 31, 12, tzinfo=dt.timezone.utc).timestamp()),
+            quotes={'EUR': 0.6},
+        ))
+
+        snapshot = await store.get_snapshot(dt.date(2024, 1, 31), ['EUR'])
+
+        assert snapshot.quotes == {'EUR': 0.6}
+
+    async def test_quotes_replaced(self, db_session):
+        """Saving quotes of the same time again replaces them."""
+        store = HistoricalRateStore(db_session)
+        await store.save_daily({dt.date(2024, 1, 31): {'EUR': 0.5}})
+        await store.save_daily({dt.date(2024, 1, 31): {'EUR': 0.7}})
+
+        snapshot = await store.get_snapshot(dt.date(2024, 1, 31), ['EUR'])
+
+        assert snapshot.quotes == {'EUR': 0.7}
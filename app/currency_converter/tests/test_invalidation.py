@@ -0,0 +1,97 @@
+import asyncio
+from unittest import mock
+
+import pytest
+import pytest_asyncio
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.invalidation import InvalidationBus
+from app.currency_converter.cache import LocalCache
+from app.currency_converter.cache import RedisCache
+
+
+async def wait_for(condition, timeout: float = 1) -> None:
+    """Wait until the condition is true."""
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def local():
+    """Local cache invalidated by the bus."""
+    return LocalCache(maxsize=10, ttl=60)
+
+
+@pytest_asyncio.fixture
+async def bus(local):
+    """Started invalidation bus of another worker."""
+    bus = InvalidationBus(reconnect_min_delay=0.01, reconnect_max_delay=0.05)
+    bus.register(local)
+    bus.start()
+    await asyncio.wait_for(bus.subscribed.wait(), timeout=1)
+
+    yield bus
+
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+class TestInvalidationBus:
+    """Testing InvalidationBus."""
+
+    async def test_newer_version_invalidated(self, bus, local):
+        """Local copy is dropped when a newer version is published."""
+        local.set('key', 'old', version=1)
+
+        await bus.publish('key', 2)
+        await wait_for(lambda: local.get('key') is None)
+
+    async def test_same_version_kept(self, bus, local):
+        """Local copy of the published version is kept."""
+        local.set('key', 'value', version=2)
+
+        await bus.publish('key', 2)
+        await bus.publish('other', 1)
+        await wait_for(lambda: local._versions.get('other') == 1)
+
+        assert local.get('key') == 'value'
+
+    async def test_invalid_message_ignored(self, bus, local):
+        """Invalid message does not stop the subscriber."""
+        local.set('key', 'old', version=1)
+
+        await bus._redis.publish(bus.channel, 'not json')
+        await bus.publish('key', 2)
+        await wait_for(lambda: local.get('key') is None)
+
+    async def test_cache_set_published(self, bus, local):
+        """Value saved by another worker invalidates the local copy."""
+        cache = RedisCache(prefix='test', ttl=10, grace=20)
+        local.set('test:key', 'old', version=0)
+
+        await cache.set('key', 'new')
+        await wait_for(lambda: local.get('test:key') is None)
+
+    async def test_reconnect(self, local):
+        """Subscriber reconnects after disconnection and drops all local copies."""
+        bus = InvalidationBus(reconnect_min_delay=0.01, reconnect_max_delay=0.05)
+        bus.register(local)
+        local.set('key', 'value', version=1)
+        listen = bus._listen
+        disconnected = mock.AsyncMock(side_effect=RedisConnectionError())
+
+        async def reconnecting_listen():
+            if not disconnected.await_count:
+                await disconnected()
+            await listen()
+
+        with mock.patch.object(bus, '_listen', reconnecting_listen):
+            bus.start()
+            await asyncio.wait_for(bus.subscribed.wait(), timeout=1)
+
+        assert local.get('key') is None
+
+        await bus.publish('key', 2)
+        await wait_for(lambda: local._versions['key'] == 2)
+        await bus.stop()
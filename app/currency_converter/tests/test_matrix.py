@@ -0,0 +1,83 @@
+import gzip
+
+import msgpack
+import numpy as np
+import pytest
+
+from app.core import fastjson
+from app.currency_converter import matrix
+from app.currency_converter.matrix import RateMatrix
+from app.currency_converter.matrix import get_rate_matrix
+from app.currency_converter.rates import QuoteSnapshot
+
+snapshot = QuoteSnapshot(
+    source='USD',
+    timestamp=1704067200,
+    quotes={'EUR': 0.8, 'AMD': 400.0, 'BTC': 0.000025},
+    version=7,
+)
+
+
+class TestRateMatrix:
+    """Testing RateMatrix."""
+
+    rate_matrix = RateMatrix(snapshot, exclude=frozenset({'BTC'}))
+
+    def test_cross_rates(self):
+        """Rate of base currency in target one is in row of base and column of target."""
+        assert self.rate_matrix.codes == ['USD', 'EUR', 'AMD']
+        for i, base in enumerate(self.rate_matrix.codes):
+            for j, target in enumerate(self.rate_matrix.codes):
+                assert self.rate_matrix.rates[i, j] == pytest.approx(
+                    snapshot.cross_rate(base=base, target=target),
+                )
+
+    def test_json(self):
+        """JSON payload carries code index and rates."""
+        data = fastjson.loads(self.rate_matrix.encode(matrix.JSON))
+
+        assert data['version'] == 7
+        assert data['codes'] == ['USD', 'EUR', 'AMD']
+        assert data['rates'][1] == pytest.approx([1.25, 1.0, 500.0])
+
+    @pytest.mark.parametrize('dtype', ['float64', 'float32'])
+    def test_msgpack(self, dtype):
+        """Msgpack payload carries code index and rates."""
+        data = msgpack.unpackb(self.rate_matrix.encode(matrix.MSGPACK, dtype))
+
+        assert data['codes'] == ['USD', 'EUR', 'AMD']
+        assert data['rates'][2] == pytest.approx([0.0025, 0.002, 1.0])
+
+    @pytest.mark.parametrize(('dtype', 'size'), [('float64', 8), ('float32', 4)])
+    def test_buffer(self, dtype, size):
+        """Raw buffer is row-major little-endian array of the dtype."""
+        payload = self.rate_matrix.encode(matrix.BUFFER, dtype)
+        rates = np.frombuffer(payload, dtype=matrix.DTYPES[dtype]).reshape(3, 3)
+
+        assert len(payload) == 9 * size
+        np.testing.assert_allclose(rates, self.rate_matrix.rates, rtol=1e-6)
+
+    def test_payload_encoded_once(self):
+        """Payload is encoded once per media type and dtype."""
+        assert self.rate_matrix.encode(matrix.JSON) is self.rate_matrix.encode(matrix.JSON)
+
+    def test_compressed_payload_encoded_once(self):
+        """Compressed payload is built once per media type, dtype and content coding."""
+        payload = self.rate_matrix.encode(matrix.JSON, 'float64', 'gzip')
+
+        assert gzip.decompress(payload) == self.rate_matrix.encode(matrix.JSON)
+        assert self.rate_matrix.encode(matrix.JSON, 'float64', 'gzip') is payload
+
+
+def test_matrix_built_once_per_version():
+    """Matrix is built once per snapshot version."""
+    matrix.rate_matrices.clear()
+    first = get_rate_matrix(snapshot, exclude=frozenset())
+    second = get_rate_matrix(QuoteSnapshot.from_dict(snapshot.to_dict()), exclude=frozenset())
+    newer = get_rate_matrix(
+        QuoteSnapshot(source='USD', timestamp=0, quotes={'EUR': 0.9}, version=8),
+        exclude=frozenset(),
+    )
+
+    assert first is second
+    assert newer is not first
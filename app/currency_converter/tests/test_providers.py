@@ -0,0 +1,235 @@
+import asyncio
+import datetime as dt
+from unittest import mock
+
+import pytest
+
+from app.config import settings
+from app.currency_converter.providers import ExchangerateProvider
+from app.currency_converter.providers import FileRateProvider
+from app.currency_converter.providers import HedgedRateProvider
+from app.currency_converter.providers import HistoricalQuotesDict
+from app.currency_converter.providers import QuotesDict
+from app.currency_converter.providers import RateProvider
+from app.currency_converter.providers import RatesList
+from app.currency_converter.providers import get_rate_provider
+
+
+class StubProvider(RateProvider):
+    """Provider answering with fixed quotes after a delay."""
+
+    def __init__(self, name: str, *, delay: float = 0, error: Exception | None = None) -> None:
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def get_available_currencies(self) -> dict[str, str]:
+        """Currencies are not used by tests."""
+        raise NotImplementedError
+
+    async def get_quotes(self, *, source: str) -> QuotesDict:
+        """Get fixed quotes after the delay."""
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+
+        return {'source': source, 'timestamp': 0, 'quotes': {'EUR': 0.5}, 'provider': self.name}
+
+    async def get_rates(self, *, base: str, targets: list[str]) -> RatesList:
+        """Rates are not used by tests."""
+        raise NotImplementedError
+
+    async def get_historical_quotes(
+        self,
+        *,
+        source: str,
+        start_date: dt.date,
+        end_date: dt.date,
+    ) -> HistoricalQuotesDict:
+        """Historical quotes are not used by tests."""
+        raise NotImplementedError
+
+
+def test_provider_interface_is_abstract():
+    """Provider without all methods of the interface can not be created."""
+    class PartialProvider(RateProvider):
+        async def get_quotes(self, *, source: str) -> QuotesDict:
+            return {}
+
+    with pytest.raises(TypeError):
+        PartialProvider()  # type: ignore[abstract]
+
+
+class TestGetRateProvider:
+    """Testing function get_rate_provider."""
+
+    @pytest.fixture(autouse=True)
+    def clear_provider(self):
+        """Create provider again for every test."""
+        get_rate_provider.cache_clear()
+        yield None
+        get_rate_provider.cache_clear()
+
+    def test_hedged(self):
+        """Live hedge provider hedges the configured one."""
+        with (
+            mock.patch.object(settings, 'RATE_PROVIDER', 'file'),
+            mock.patch.object(settings, 'HEDGE_PROVIDER', 'exchangerate'),
+        ):
+            provider = get_rate_provider()
+
+        assert isinstance(provider, HedgedRateProvider)
+        assert isinstance(provider.primary, FileRateProvider)
+        assert isinstance(provider.secondary, ExchangerateProvider)
+        assert provider.secondary.coalesce is False
+
+    def test_hedge_not_live(self):
+        """Provider of fixed quotes can not hedge live ones."""
+        with (
+            mock.patch.object(settings, 'RATE_PROVIDER', 'exchangerate'),
+            mock.patch.object(settings, 'HEDGE_PROVIDER', 'file'),
+            pytest.raises(ValueError),
+        ):
+            get_rate_provider()
+
+
+@pytest.mark.asyncio
+class TestFileRateProvider:
+    """Testing FileRateProvider."""
+
+    provider = FileRateProvider()
+
+    async def test_get_available_currencies(self):
+        """Currencies are read from the file."""
+        currencies = await self.provider.get_available_currencies()
+
+        assert currencies['USD'] == 'United States Dollar'
+        assert 'AMD' in currencies
+
+    async def test_get_quotes_rebased(self):
+        """Quotes are rebased to the requested source currency."""
+        data = await self.provider.get_quotes(source='EUR')
+        quotes = data['quotes']
+
+        assert data['source'] == 'EUR'
+        assert isinstance(quotes, dict)
+        assert 'EUR' not in quotes
+        assert quotes['USD'] == pytest.approx(1 / self.provider.quotes['EUR'])
+
+    async def test_get_rates(self):
+        """Cross rates are derived from quotes of both currencies."""
+        rates = await self.provider.get_rates(base='EUR', targets=['AMD'])
+
+        assert rates == [{
+            'base': 'EUR',
+            'target': 'AMD',
+            'pair': 'EURAMD',
+            'rate': pytest.approx(self.provider.quotes['AMD'] / self.provider.quotes['EUR']),
+        }]
+
+    async def test_unknown_currency(self):
+        """Provider error is raised for the currency missing in the file."""
+        with pytest.raises(RateProvider.ProviderError):
+            await self.provider.get_rates(base='EUR', targets=['XXX'])
+
+    async def test_no_historical_quotes(self):
+        """File has no historical quotes."""
+        with pytest.raises(RateProvider.ProviderError):
+            await self.provider.get_historical_quotes(
+                source='USD',
+                start_date=dt.date(2024, 1, 1),
+                end_date=dt.date(2024, 1, 1),
+            )
+
+
+@pytest.mark.asyncio
+class TestHedgedRateProvider:
+    """Testing HedgedRateProvider."""
+
+    @staticmethod
+    def create_provider(primary: RateProvider, secondary: RateProvider) -> HedgedRateProvider:
+        """Create hedged provider with short initial delay."""
+        return HedgedRateProvider(
+            primary,
+            secondary,
+            percentile=95,
+            initial_delay=0.05,
+            window=100,
+        )
+
+    async def test_fast_primary_not_hedged(self):
+        """Secondary provider is not called when the primary one is fast."""
+        secondary = StubProvider('secondary')
+        provider = self.create_provider(StubProvider('primary'), secondary)
+
+        data = await provider.get_quotes(source='USD')
+
+        assert data['provider'] == 'primary'
+        assert secondary.calls == 0
+
+    async def test_slow_primary_hedged(self):
+        """Secondary provider answers when the primary one is slow."""
+        provider = self.create_provider(
+            StubProvider('primary', delay=1),
+            StubProvider('secondary'),
+        )
+
+        data = await provider.get_quotes(source='USD')
+
+        assert data['provider'] == 'secondary'
+
+    async def test_failed_hedge_ignored(self):
+        """Primary response is used when the hedged request fails."""
+        provider = self.create_provider(
+            StubProvider('primary', delay=0.1),
+            StubProvider('secondary', error=RateProvider.ProviderError(message='error')),
+        )
+
+        data = await provider.get_quotes(source='USD')
+
+        assert data['provider'] == 'primary'
+
+    async def test_hedged_request_sent(self, mock_httpx_client):
+        """Hedged request to the same API is sent instead of joining the in-flight one."""
+        response = mock_httpx_client.get.return_value
+
+        async def get(*args, **kwargs):
+            await asyncio.sleep(0.3)
+            return response
+
+        mock_httpx_client.get.side_effect = get
+        provider = self.create_provider(
+            ExchangerateProvider(),
+            ExchangerateProvider(coalesce=False),
+        )
+
+        data = await provider.get_quotes(source='USD')
+
+        assert data['quotes'] == {'EUR': 1.278342}
+        assert mock_httpx_client.get.await_count == 2
+
+    async def test_both_failed(self):
+        """Error is raised when both providers fail."""
+        error = RateProvider.ProviderError(message='error')
+        provider = self.create_provider(
+            StubProvider('primary', delay=0.1, error=error),
+            StubProvider('secondary', error=error),
+        )
+
+        with pytest.raises(RateProvider.ProviderError):
+            await provider.get_quotes(source='USD')
+
+
+def test_hedge_delay_percentile():
+    """Hedge delay is the percentile of recent primary latencies."""
+    provider = TestHedgedRateProvider.create_provider(
+        StubProvider('primary'),
+        StubProvider('secondary'),
+    )
+    assert provider.hedge_delay() == 0.05
+
+    provider._latencies.extend(i / 100 for i in range(1, 101))
+
+    assert provider.hedge_delay() == pytest.approx(0.96)
@@ -0,0 +1,110 @@
+import time
+from unittest import mock
+
+import pytest
+
+from app.config import settings
+from app.currency_converter.rates import QuoteSnapshot
+from app.currency_converter.rates import RateEngine
+
+
+class TestQuoteSnapshot:
+    """Testing QuoteSnapshot."""
+
+    snapshot = QuoteSnapshot(
+        source='USD',
+        timestamp=1704067200,
+        quotes={'EUR': 0.8, 'AMD': 400.0},
+    )
+
+    @pytest.mark.parametrize(('base', 'target', 'rate'), [
+        ('USD', 'EUR', 0.8),
+        ('EUR', 'USD', 1.25),
+        ('EUR', 'AMD', 500.0),
+        ('AMD', 'AMD', 1.0),
+    ])
+    def test_cross_rate(self, base, target, rate):
+        """Cross rate is derived from quotes of both currencies."""
+        assert self.snapshot.cross_rate(base=base, target=target) == pytest.approx(rate)
+
+    def test_contains(self):
+        """Source currency and quoted currencies belong to snapshot."""
+        assert 'USD' in self.snapshot
+        assert 'EUR' in self.snapshot
+        assert 'GEL' not in self.snapshot
+
+
+class TestRateEngineGetMaxAge:
+    """Testing method get_max_age of RateEngine."""
+
+    def test_refresher_enabled(self):
+        """Snapshot is fresh until the next refresh."""
+        snapshot = QuoteSnapshot(source='USD', timestamp=0, quotes={}, fetched_at=time.time() - 10)
+
+        with (
+            mock.patch.object(settings, 'QUOTES_REFRESHER_ENABLED', True),
+            mock.patch.object(settings, 'QUOTES_REFRESH_INTERVAL', 30.0),
+        ):
+            assert RateEngine().get_max_age(snapshot) in (19, 20)
+
+    def test_refresher_disabled(self):
+        """Snapshot is fresh until it expires in the cache, never negative."""
+        snapshot = QuoteSnapshot(source='USD', timestamp=0, quotes={}, fetched_at=time.time())
+
+        with (
+            mock.patch.object(settings, 'QUOTES_REFRESHER_ENABLED', False),
+            mock.patch.object(settings, 'RATE_CACHE_TTL', 60),
+        ):
+            assert RateEngine().get_max_age(snapshot) in (59, 60)
+            snapshot.fetched_at -= 120
+            assert RateEngine().get_max_age(snapshot) == 0
+
+
+@pytest.mark.asyncio
+class TestRateEngineGetRates:
+    """Testing method get_rates of RateEngine."""
+
+    async def test_rates_derived_from_snapshot(
+        self,
+        mock_client_get_quotes,
+        mock_client_get_rates,
+    ):
+        """All rates are derived from a single snapshot."""
+        rates = await RateEngine(direct_currencies=[]).get_rates([
+            ('EUR', 'AMD'),
+            ('AMD', 'USD'),
+        ])
+
+        assert rates == {'EURAMD': pytest.approx(200.0), 'AMDUSD': pytest.approx(0.0025)}
+        mock_client_get_quotes.assert_awaited_once_with(source='USD')
+        mock_client_get_rates.assert_not_awaited()
+
+    async def test_snapshot_cached(self, mock_client_get_quotes):
+        """Snapshot is requested once while it is cached."""
+        engine = RateEngine(direct_currencies=[])
+        await engine.get_rates([('EUR', 'AMD')])
+        rates = await engine.get_rates([('AMD', 'EUR')])
+
+        assert rates == {'AMDEUR': pytest.approx(0.005)}
+        mock_client_get_quotes.assert_awaited_once()
+
+    async def test_currency_missing_in_snapshot(
+        self,
+        mock_client_get_quotes,
+        mock_client_get_rates,
+    ):
+        """Rate is requested directly when snapshot has no quote of the currency."""
+        mock_client_get_rates.return_value = [
+            {'base': 'XAU', 'target': 'EUR', 'pair': 'XAUEUR', 'rate': 1900.0},
+        ]
+        rates = await RateEngine(direct_currencies=[]).get_rates([('XAU', 'EUR')])
+
+        assert rates == {'XAUEUR': 1900.0}
+        mock_client_get_rates.assert_awaited_once_with(base='XAU', targets=['EUR'])
+
+    async def test_direct_quote_policy(self, mock_client_get_quotes, mock_client_get_rates):
+        """Snapshot is not requested when all pairs require direct quotes."""
+        rates = await RateEngine(direct_currencies=['BTC']).get_rates([('BTC', 'USD')])
+
+        assert rates == {'BTCUSD': 40000}
+        mock_client_get_quotes.assert_not_awaited()
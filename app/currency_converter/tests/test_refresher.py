@@ -0,0 +1,113 @@
+import asyncio
+import datetime as dt
+from unittest import mock
+
+import pytest
+
+from app.config import settings
+from app.currency_converter.cache import rates_local_cache
+from app.currency_converter.history import HistoricalRateStore
+from app.currency_converter.refresher import QuoteRefresher
+from app.currency_converter.services import CurrencyService
+from app.redis import redis_client
+
+
+@pytest.mark.asyncio
+class TestQuoteRefresherIsLeader:
+    """Testing method is_leader of QuoteRefresher."""
+
+    async def test_single_leader(self):
+        """Only one refresher acquires the leader lock."""
+        first = QuoteRefresher(interval=10)
+        second = QuoteRefresher(interval=10)
+
+        assert await first.is_leader() is True
+        assert await second.is_leader() is False
+        assert await first.is_leader() is True
+
+    async def test_leadership_taken_over(self):
+        """Another refresher becomes leader after the lock is released."""
+        first = QuoteRefresher(interval=10)
+        second = QuoteRefresher(interval=10)
+        await first.is_leader()
+        await first._lock.release()
+
+        assert await second.is_leader() is True
+
+
+@pytest.mark.asyncio
+class TestQuoteRefresherRefresh:
+    """Testing method refresh of QuoteRefresher."""
+
+    async def test_snapshot_and_currencies_saved(
+        self,
+        mock_client_get_quotes,
+        mock_client_get_available_currencies,
+    ):
+        """Snapshot is saved with new version and currencies are replaced."""
+        await redis_client.hset('currencies:names', mapping={'OLD': 'Old currency'})
+        refresher = QuoteRefresher(interval=10, currencies_interval=3600)
+
+        await refresher.refresh()
+        await refresher.refresh()
+
+        assert mock_client_get_quotes.await_count == 2
+        mock_client_get_available_currencies.assert_awaited_once()
+        assert await redis_client.hgetall('currencies:names') == {
+            'USD': 'United States Dollar',
+            'AMD': 'Armenian Dram',
+        }
+        assert rates_local_cache.get('quotes:USD')['version'] == 2
+
+    async def test_snapshot_read_without_upstream_request(
+        self,
+        mock_check_currencies_available,
+        mock_client_get_quotes,
+        mock_client_get_available_currencies,
+    ):
+        """Rates are served from refreshed snapshot without requests to Exchangerate API."""
+        await QuoteRefresher(interval=10).refresh()
+        rates_local_cache.clear()
+        mock_client_get_quotes.reset_mock()
+
+        with mock.patch('app.currency_converter.cache.time.time', return_value=0):
+            result = await CurrencyService().get_rate(base='EUR', target='AMD')
+
+        assert result['rate'] == 200.0
+        mock_client_get_quotes.assert_not_awaited()
+
+    async def test_snapshot_recorded_into_history(
+        self,
+        mock_client_get_quotes,
+        mock_client_get_available_currencies,
+        db_session,
+    ):
+        """Snapshot is saved into the historical store when it is enabled."""
+        with (
+            mock.patch.object(settings, 'HISTORY_RECORD_SNAPSHOTS', True),
+            mock.patch('app.currency_converter.refresher.async_session', return_value=db_session),
+        ):
+            await QuoteRefresher(interval=10).refresh()
+
+        snapshot = await HistoricalRateStore(db_session).get_snapshot(
+            dt.date(2024, 1, 1),
+            ['EUR', 'AMD'],
+        )
+
+        assert snapshot.quotes == {'EUR': 2.0, 'AMD': 400.0}
+
+
+@pytest.mark.asyncio
+class TestQuoteRefresherRun:
+    """Testing background task of QuoteRefresher."""
+
+    async def test_errors_do_not_stop_refreshing(self):
+        """Refresher keeps running after failed refresh and releases lock on stop."""
+        refresher = QuoteRefresher(interval=0.01)
+        with mock.patch.object(refresher, 'refresh', side_effect=RuntimeError) as refresh:
+            refresher.start()
+            await asyncio.sleep(0.05)
+            await refresher.stop()
+
+        assert refresh.await_count > 1
+        assert await redis_client.exists(QuoteRefresher.leader_key) == 0
@@ -0,0 +1,114 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app.currency_converter.cache import currencies_local_cache
+from app.currency_converter.providers import RateProvider
+from app.currency_converter.registry import CurrencyRegistry
+from app.redis import redis_client
+
+CURRENCIES = {'USD': 'United States Dollar', 'AMD': 'Armenian Dram'}
+
+
+@pytest.fixture
+def provider():
+    """Provider of the available currencies."""
+    provider = mock.Mock(spec=RateProvider)
+    provider.get_available_currencies = mock.AsyncMock(return_value=dict(CURRENCIES))
+
+    return provider
+
+
+@pytest.fixture
+def registry(provider):
+    """Registry using the mocked provider."""
+    return CurrencyRegistry(provider=provider)
+
+
+@pytest.mark.asyncio
+class TestCurrencyRegistryRefresh:
+    """Testing method refresh of CurrencyRegistry."""
+
+    async def test_new_version_swapped(self, registry, provider):
+        """New version replaces the live keys and leaves no staging keys."""
+        await redis_client.hset(registry.names_key, mapping={'OLD': 'Old currency'})
+        await redis_client.sadd(registry.codes_key, 'OLD')
+
+        currencies = await registry.refresh()
+
+        assert currencies.version == 1
+        assert currencies.codes == frozenset(CURRENCIES)
+        assert await redis_client.hgetall(registry.names_key) == CURRENCIES
+        assert await redis_client.smembers(registry.codes_key) == set(CURRENCIES)
+        assert await redis_client.get(registry.version_key) == '1'
+        assert await redis_client.keys('*:staging:*') == []
+        assert currencies_local_cache.get(registry.local_key) is currencies
+
+    async def test_older_version_not_swapped(self, registry, provider):
+        """Refresh finished after a newer one does not replace it."""
+        await redis_client.set(f'{registry.version_key}:next', 4)
+        await redis_client.set(registry.version_key, 10)
+        await redis_client.hset(registry.names_key, mapping={'EUR': 'Euro'})
+
+        currencies = await registry.refresh()
+
+        assert currencies.version == 10
+        assert currencies.names == {'EUR': 'Euro'}
+        assert await redis_client.keys('*:staging:*') == []
+
+    async def test_empty_list(self, registry, provider):
+        """Empty list from the provider is not saved."""
+        provider.get_available_currencies.return_value = {}
+
+        with pytest.raises(RateProvider.ProviderError):
+            await registry.refresh()
+
+        assert await redis_client.exists(registry.version_key) == 0
+
+
+@pytest.mark.asyncio
+class TestCurrencyRegistryGet:
+    """Testing methods reading CurrencyRegistry."""
+
+    async def test_loaded_once(self, registry, provider):
+        """Missing list is requested from the provider once and kept in memory."""
+        first, second = await asyncio.gather(registry.get(), registry.get())
+
+        assert first.names == second.names == CURRENCIES
+        provider.get_available_currencies.assert_awaited_once()
+
+        with mock.patch.object(registry, '_load') as load:
+            assert await registry.get() is currencies_local_cache.get(registry.local_key)
+
+        load.assert_not_called()
+
+    async def test_unavailable_in_memory(self, registry):
+        """Codes are checked against the list in memory without Redis lookup."""
+        await registry.refresh()
+
+        with mock.patch.object(redis_client, 'pipeline') as pipeline:
+            assert await registry.get_unavailable(['USD', 'LOL', 'USD']) == {'LOL'}
+
+        pipeline.assert_not_called()
+
+    async def test_unavailable_in_redis(self, registry, provider):
+        """Codes are checked by SMISMEMBER and the list is loaded into memory in background."""
+        await registry.refresh()
+        currencies_local_cache.clear()
+
+        assert await registry.get_unavailable(['AMD', 'LOL']) == {'LOL'}
+
+        await registry._load_task
+        assert currencies_local_cache.get(registry.local_key).codes == frozenset(CURRENCIES)
+        provider.get_available_currencies.assert_awaited_once()
+
+    async def test_names(self, registry):
+        """Names of available currencies are taken by HMGET."""
+        await registry.refresh()
+        currencies_local_cache.clear()
+
+        assert await registry.get_names(['AMD', 'LOL']) == (1, {'AMD': 'Armenian Dram'})
+
+        await registry._load_task
+        assert await registry.get_names(['USD']) == (1, {'USD': 'United States Dollar'})
@@ -0,0 +1,230 @@
+from unittest import mock
+
+import httpx
+import jwt
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from fastapi import Request
+from fastapi import Response
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.config import settings
+from app.core.compression import compress_variants
+from app.core.response_cache import CachedRoute
+from app.core.response_cache import ResponseCacheMiddleware
+from app.core.response_cache import normalize_query
+from app.core.response_cache import response_cache
+from app.currency_converter.cache import RedisCache
+
+
+def access_token(username: str, token_type: str = 'access') -> str:
+    """Get token of the user signed like the real ones."""
+    return jwt.encode(
+        {'username': username, 'type': token_type},
+        settings.JWT_TOKEN_SECRET,
+        algorithm='HS256',
+    )
+
+
+@pytest.fixture(autouse=True)
+def enable_response_cache():
+    """Enable response cache disabled for other tests."""
+    with mock.patch.object(settings, 'RESPONSE_CACHE_ENABLED', True):
+        yield None
+
+
+@pytest.fixture
+def handler():
+    """Handler of the cached routes counting its calls, padding makes body compressible."""
+    def respond(request):
+        padding = '0' * int(request.query_params.get('padding', 0))
+        return Response(
+            f'{{"query": "{request.url.query}", "padding": "{padding}"}}',
+            media_type='application/json',
+            headers={'ETag': '"1"', 'Cache-Control': 'public, max-age=30'},
+        )
+
+    return mock.Mock(side_effect=respond)
+
+
+@pytest_asyncio.fixture
+async def client(handler):
+    """Client of the application with cached public and private routes."""
+    app = FastAPI()
+
+    @app.get('/rate')
+    async def get_rate(request: Request):
+        return handler(request)
+
+    @app.get('/favorites')
+    async def get_favorites(request: Request):
+        return handler(request)
+
+    @app.get('/error')
+    async def get_error(request: Request):
+        handler(request)
+        return Response('{}', status_code=400)
+
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        routes=[
+            CachedRoute('/rate', ttl=60, tags=['quotes']),
+            CachedRoute('/favorites', ttl=60, tags=['favorites:{user}'], private=True),
+            CachedRoute('/error', ttl=60),
+        ],
+    )
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url='http://test',
+    ) as client:
+        yield client
+
+
+def test_normalize_query():
+    """Order of query parameters does not matter."""
+    assert normalize_query(b'target=EUR&base=USD&date=') == 'base=USD&date=&target=EUR'
+
+
+@pytest.mark.asyncio
+class TestResponseCacheMiddleware:
+    """Testing ResponseCacheMiddleware."""
+
+    async def test_response_cached(self, client, handler):
+        """The same response is sent without calling the application again."""
+        first = await client.get('/rate?base=USD&target=EUR')
+        second = await client.get('/rate?target=EUR&base=USD')
+
+        assert handler.call_count == 1
+        assert second.status_code == 200
+        assert second.content == first.content
+        assert second.headers['etag'] == '"1"'
+        assert second.headers['age'] == '0'
+
+    async def test_query_is_key(self, client, handler):
+        """Responses of different queries are cached separately."""
+        await client.get('/rate?base=USD&target=EUR')
+        response = await client.get('/rate?base=USD&target=AMD')
+
+        assert handler.call_count == 2
+        assert response.json()['query'] == 'base=USD&target=AMD'
+
+    async def test_not_modified(self, client, handler):
+        """Cached response matching If-None-Match is sent as 304."""
+        await client.get('/rate')
+        response = await client.get('/rate', headers={'If-None-Match': '"1"'})
+
+        assert handler.call_count == 1
+        assert response.status_code == 304
+        assert response.content == b''
+        assert response.headers['etag'] == '"1"'
+        assert 'content-type' not in response.headers
+
+    async def test_compressed_variants_cached(self, client, handler):
+        """Large response is compressed once and sent compressed to clients accepting it."""
+        with mock.patch(
+            'app.core.response_cache.compress_variants',
+            side_effect=compress_variants,
+        ) as compress:
+            first = await client.get('/rate?padding=5000', headers={'Accept-Encoding': 'gzip'})
+            second = await client.get('/rate?padding=5000', headers={'Accept-Encoding': 'gzip'})
+            identity = await client.get('/rate?padding=5000', headers={'Accept-Encoding': ''})
+
+        assert handler.call_count == 1
+        compress.assert_called_once()
+        for response in (first, second):
+            assert response.headers['content-encoding'] == 'gzip'
+            assert response.headers['etag'] == 'W/"1"'
+            assert response.headers['vary'] == 'Accept-Encoding'
+            assert int(response.headers['content-length']) < 5000
+        assert second.json() == identity.json()
+        assert 'content-encoding' not in identity.headers
+        assert identity.headers['etag'] == '"1"'
+
+    @pytest.mark.parametrize('if_none_match', ['W/"1"', '"1"'])
+    async def test_compressed_not_modified(self, client, handler, if_none_match):
+        """Compressed response with weak entity tag is sent as 304 when it is not modified."""
+        headers = {'Accept-Encoding': 'gzip'}
+        await client.get('/rate?padding=5000', headers=headers)
+        response = await client.get(
+            '/rate?padding=5000',
+            headers={**headers, 'If-None-Match': if_none_match},
+        )
+
+        assert handler.call_count == 1
+        assert response.status_code == 304
+        assert response.content == b''
+        assert response.headers['etag'] == 'W/"1"'
+
+    async def test_invalidated_by_tag(self, client, handler):
+        """Response is built again after its tag is invalidated."""
+        await client.get('/rate')
+        await response_cache.invalidate('quotes')
+        await client.get('/rate')
+        await client.get('/rate')
+
+        assert handler.call_count == 2
+
+    async def test_invalidated_by_cache_of_values(self, client, handler):
+        """Saving a value with tags invalidates cached responses."""
+        await client.get('/rate')
+        await RedisCache(prefix='test', ttl=60, grace=0, tags=('quotes',)).set('key', 1)
+        await client.get('/rate')
+
+        assert handler.call_count == 2
+
+    async def test_error_not_cached(self, client, handler):
+        """Only successful responses are cached."""
+        await client.get('/error')
+        response = await client.get('/error')
+
+        assert handler.call_count == 2
+        assert response.status_code == 400
+
+    async def test_private_cached_per_user(self, client, handler):
+        """Private responses are cached per user and invalidated by user tags."""
+        first = {'Authorization': f'Bearer {access_token("first")}'}
+        second = {'Authorization': f'Bearer {access_token("second")}'}
+
+        await client.get('/favorites', headers=first)
+        await client.get('/favorites', headers=first)
+        await client.get('/favorites', headers=second)
+        assert handler.call_count == 2
+
+        await response_cache.invalidate('favorites:first')
+        await client.get('/favorites', headers=first)
+        await client.get('/favorites', headers=second)
+        assert handler.call_count == 3
+
+    @pytest.mark.parametrize('headers', [
+        {},
+        {'Authorization': 'Bearer invalid'},
+        {'Authorization': f'Bearer {access_token("first", token_type="refresh")}'},
+    ])
+    async def test_private_not_cached_without_access_token(self, client, handler, headers):
+        """Requests without valid access token are passed to the application."""
+        await client.get('/favorites', headers=headers)
+        await client.get('/favorites', headers=headers)
+
+        assert handler.call_count == 2
+
+    async def test_disabled(self, client, handler):
+        """Nothing is cached when the cache is disabled."""
+        with mock.patch.object(settings, 'RESPONSE_CACHE_ENABLED', False):
+            await client.get('/rate')
+            await client.get('/rate')
+
+        assert handler.call_count == 2
+
+    async def test_redis_error(self, client, handler):
+        """Requests are passed to the application when Redis is unavailable."""
+        with mock.patch.object(
+            response_cache,
+            'get',
+            side_effect=RedisConnectionError('unavailable'),
+        ):
+            response = await client.get('/rate')
+
+        assert response.status_code == 200
+        assert handler.call_count == 1
@@ -1,30 +1,136 @@
+import datetime as dt
+from typing import Any
+from unittest import mock
+
+import httpx
+import numpy as np
+import pytest
 from fastapi.testclient import TestClient
+from starlette import status
+from starlette.websockets import WebSocketDisconnect
 
+from app.config import settings
+from app.core.compression import compress
+from app.currency_converter.cache import rates_local_cache
+from app.currency_converter.matrix import RateMatrix
+from app.currency_converter.rates import QuoteSnapshot
+from app.currency_converter.registry import CurrencyList
 from app.currency_converter.services import CurrencyService
+from app.currency_converter.stream import SSE_HEARTBEAT
+from app.currency_converter.stream import encode_sse_event
 from app.main import app
+from app.users.models import User
+from app.users.services import AuthenticateUser
+from app.users.services import AuthenticateWebSocketUser
 
 client = TestClient(app)
 
 
+class TestGetCurrencies:
+    """Test route /currencies."""
+
+    url = 'api/currencies'
+    currencies = CurrencyList(
+        version=3,
+        names={'USD': 'United States Dollar', 'AMD': 'Armenian Dram'},
+    )
+
+    def test_success(self):
+        """The list is returned with its version as ETag."""
+        with mock.patch.object(CurrencyService, 'get_currencies', return_value=self.currencies):
+            response = client.get(self.url)
+
+        assert response.status_code == 200
+        assert response.headers['etag'] == '"3"'
+        assert response.json() == {'version': 3, 'currencies': self.currencies.names}
+
+    def test_not_modified(self):
+        """Not modified list is not sent again."""
+        with mock.patch.object(CurrencyService, 'get_currencies', return_value=self.currencies):
+            response = client.get(self.url, headers={'If-None-Match': '"2", "3"'})
+
+        assert response.status_code == 304
+        assert response.content == b''
+
+    def test_codes(self):
+        """Only provided codes are returned."""
+        with mock.patch.object(
+            CurrencyService,
+            'get_currency_names',
+            return_value=(3, {'AMD': 'Armenian Dram'}),
+        ) as get_names:
+            response = client.get(self.url, params={'codes': 'amd,LOL'})
+
+        get_names.assert_awaited_once_with(['AMD', 'LOL'])
+        assert response.status_code == 200
+        assert response.json() == {'version': 3, 'currencies': {'AMD': 'Armenian Dram'}}
+
+    def test_exchangerate_client_error(self):
+        """Currency Service raises ExchangerateClientError."""
+        with mock.patch.object(
+            CurrencyService,
+            'get_currencies',
+            side_effect=CurrencyService.ExchangerateClientError(message='message'),
+        ):
+            response = client.get(self.url)
+
+        assert response.status_code == 400
+        assert response.json() == {'detail': 'message'}
+
+
 class TestGetRate:
     """Test route /currencies/rate."""
 
     url = 'api/currencies/rate'
     params = {'base': 'BTC', 'target': 'USD'}
 
-    def test_success(self, mock_currency_service_get_rate):
-        """Successful response."""
+    def test_success(self, mock_currency_service_get_rate, mock_currency_service_get_snapshot):
+        """Live rate is derived from the snapshot and tagged by its version."""
         response = client.get(self.url, params=self.params)
 
-        mock_currency_service_get_rate.assert_awaited_with(base='BTC', target='USD')
+        mock_currency_service_get_rate.assert_awaited_with(
+            base='BTC',
+            target='USD',
+            date=None,
+            db_session=mock.ANY,
+            snapshot=mock_currency_service_get_snapshot.return_value,
+        )
         assert response.status_code == 200
         assert response.json() == {
             'pair': 'BTCUSD',
             'rate': 40000,
             'description': '1 BTC = 40000 USD',
         }
+        assert response.headers['etag'] == '"3"'
+        assert response.headers['last-modified'] == 'Tue, 14 Nov 2023 22:13:20 GMT'
+        assert response.headers['cache-control'] in ('public, max-age=30', 'public, max-age=29')
+
+    def test_not_modified(
+        self,
+        mock_currency_service_get_rate,
+        mock_currency_service_get_snapshot,
+    ):
+        """Matching ETag is answered before the rate is requested."""
+        response = client.get(self.url, params=self.params, headers={'If-None-Match': '"3"'})
+
+        assert response.status_code == 304
+        assert response.headers['etag'] == '"3"'
+        mock_currency_service_get_rate.assert_not_awaited()
+
+    def test_direct_quote(self, mock_currency_service_get_rate):
+        """Rates requested directly are not tagged."""
+        with mock.patch.object(CurrencyService, 'get_rate_snapshot', return_value=None):
+            response = client.get(self.url, params=self.params, headers={'If-None-Match': '"3"'})
+
+        assert response.status_code == 200
+        assert 'etag' not in response.headers
+        assert mock_currency_service_get_rate.await_args.kwargs['snapshot'] is None
 
-    def test_exchangerate_client_error(self, mock_currency_service_get_rate):
+    def test_exchangerate_client_error(
+        self,
+        mock_currency_service_get_rate,
+        mock_currency_service_get_snapshot,
+    ):
         """Currency Service raises ExchangerateClientError."""
         mock_currency_service_get_rate.side_effect = CurrencyService.ExchangerateClientError(
             message='message',
@@ -35,7 +141,11 @@ class TestGetRate:
             'detail': 'message',
         }
 
-    def test_currency_not_available(self, mock_currency_service_get_rate):
+    def test_currency_not_available(
+        self,
+        mock_currency_service_get_rate,
+        mock_currency_service_get_snapshot,
+    ):
         """Currency Service raises CurrencyNotAvailableError."""
         mock_currency_service_get_rate.side_effect = CurrencyService.CurrencyNotAvailableError()
         response = client.get(self.url, params=self.params)
@@ -43,3 +153,366 @@ class TestGetRate:
         assert response.json() == {
             'detail': 'Provided currency is not available.',
         }
+
+    def test_historical(self, mock_currency_service_get_rate):
+        """Date is passed to the service."""
+        response = client.get(self.url, params={**self.params, 'date': '2024-01-31'})
+
+        assert response.status_code == 200
+        assert mock_currency_service_get_rate.await_args.kwargs['date'] == dt.date(2024, 1, 31)
+        assert 'etag' not in response.headers
+
+    def test_historical_not_found(self, mock_currency_service_get_rate):
+        """Currency Service raises HistoricalRateNotFoundError."""
+        mock_currency_service_get_rate.side_effect = CurrencyService.HistoricalRateNotFoundError()
+        response = client.get(self.url, params={**self.params, 'date': '2024-01-31'})
+
+        assert response.status_code == 404
+        assert response.json() == {'detail': 'No historical rate for the date.'}
+
+
+class TestGetRateSeries:
+    """Test route /currencies/series."""
+
+    url = 'api/currencies/series'
+    params = {'base': 'eur', 'target': 'AMD', 'start': '2024-01-01', 'end': '2024-12-31'}
+
+    def test_success(self):
+        """Query is passed to the service."""
+        series: dict[str, Any] = {
+            'pair': 'EURAMD',
+            'resolution': 'monthly',
+            'window': None,
+            'time': [],
+        }
+        with mock.patch.object(
+            CurrencyService,
+            'get_rate_series',
+            return_value=series,
+        ) as get_rate_series:
+            response = client.get(self.url, params={**self.params, 'resolution': 'monthly'})
+
+        assert response.status_code == 200
+        assert response.json() == series
+        assert get_rate_series.await_args is not None
+        kwargs = get_rate_series.await_args.kwargs
+        assert (kwargs['base'], kwargs['target']) == ('EUR', 'AMD')
+        assert kwargs['query'].resolution == 'monthly'
+
+    def test_invalid_range(self):
+        """Start date after end date is rejected."""
+        response = client.get(self.url, params={**self.params, 'start': '2025-01-01'})
+
+        assert response.status_code == 422
+        assert response.json() == {'detail': 'Start date must not be after end date.'}
+
+    def test_invalid_window(self):
+        """Window out of bounds is rejected."""
+        response = client.get(self.url, params={**self.params, 'window': 1})
+
+        assert response.status_code == 422
+
+
+class TestGetRateMatrix:
+    """Test route /currencies/matrix."""
+
+    url = 'api/currencies/matrix'
+    rate_matrix = RateMatrix(QuoteSnapshot(
+        source='USD',
+        timestamp=0,
+        quotes={'EUR': 0.8},
+        version=5,
+    ))
+
+    def request(self, **kwargs: Any) -> httpx.Response:
+        """Request the matrix with mocked service."""
+        with mock.patch.object(
+            CurrencyService,
+            'get_rate_matrix',
+            return_value=self.rate_matrix,
+        ):
+            return client.get(self.url, **kwargs)
+
+    def test_json(self):
+        """JSON is returned by default."""
+        response = self.request()
+
+        assert response.status_code == 200
+        assert response.headers['content-type'] == 'application/json'
+        assert response.json()['rates'] == [[1.0, 0.8], [1.25, 1.0]]
+
+    def test_buffer(self):
+        """Raw buffer is returned with code index in headers."""
+        response = self.request(
+            params={'dtype': 'float32'},
+            headers={'Accept': 'application/octet-stream'},
+        )
+
+        assert response.status_code == 200
+        assert response.headers['x-currency-codes'] == 'USD,EUR'
+        assert response.headers['x-matrix-dtype'] == 'float32'
+        assert response.headers['x-snapshot-version'] == '5'
+        np.testing.assert_allclose(
+            np.frombuffer(response.content, dtype='<f4'),
+            [1.0, 0.8, 1.25, 1.0],
+            rtol=1e-6,
+        )
+
+    def test_compressed_once(self):
+        """Large matrix is compressed once and sent compressed to every client accepting it."""
+        rate_matrix = RateMatrix(QuoteSnapshot(
+            source='USD',
+            timestamp=0,
+            quotes={f'C{i:02d}': i + 1.5 for i in range(50)},
+            version=6,
+        ))
+        with (
+            mock.patch.object(CurrencyService, 'get_rate_matrix', return_value=rate_matrix),
+            mock.patch('app.currency_converter.matrix.compress', side_effect=compress) as packed,
+        ):
+            responses = [
+                client.get(self.url, headers={'Accept-Encoding': 'gzip'})
+                for _ in range(2)
+            ]
+
+        packed.assert_called_once()
+        for response in responses:
+            assert response.status_code == 200
+            assert response.headers['content-encoding'] == 'gzip'
+            assert response.headers['vary'] == 'Accept-Encoding'
+            assert response.content == rate_matrix.encode('application/json')
+
+    def test_not_acceptable(self):
+        """Unsupported media type is rejected."""
+        response = self.request(headers={'Accept': 'text/csv'})
+
+        assert response.status_code == 406
+
+
+class TestConvert:
+    """Test route /currencies/convert."""
+
+    url = 'api/currencies/convert'
+
+    def test_success(self):
+        """Results are returned by the service."""
+        results = [{
+            'base': 'USD',
+            'target': 'AMD',
+            'amount': 10.0,
+            'rate': 400.0,
+            'result': 4000.0,
+            'error': None,
+        }]
+        with mock.patch.object(CurrencyService, 'convert', return_value=results) as convert:
+            response = client.post(
+                self.url,
+                json={'items': [{'base': 'usd', 'target': 'AMD', 'amount': 10}]},
+            )
+
+        assert response.status_code == 200
+        assert response.json() == {'results': results}
+        assert convert.await_args is not None
+        assert convert.await_args.args[0][0].base == 'USD'
+
+    def test_too_many_items(self):
+        """Batch size is limited."""
+        item = {'base': 'USD', 'target': 'AMD', 'amount': 1}
+        response = client.post(
+            self.url,
+            json={'items': [item] * (settings.CONVERT_BATCH_MAX_ITEMS + 1)},
+        )
+
+        assert response.status_code == 422
+
+    def test_invalid_item(self):
+        """Invalid items are rejected."""
+        response = client.post(
+            self.url,
+            json={'items': [{'base': 'USDT', 'target': 'AMD', 'amount': 1}]},
+        )
+
+        assert response.status_code == 422
+
+    def test_empty(self):
+        """Empty batch is rejected."""
+        response = client.post(self.url, json={'items': []})
+
+        assert response.status_code == 422
+
+
+class TestGetFavoriteRates:
+    """Test route /currencies/favorite_rates."""
+
+    url = 'api/currencies/favorite_rates'
+    user = User(id=1, username='user')
+    rates = [{'id': 1, 'pair': 'USDBTC', 'rate': 0.000025, 'description': '1 USD = 2.5e-05 BTC'}]
+
+    @pytest.fixture
+    def authenticated(self, mock_currency_service_get_snapshot):
+        """Authenticate requests as the user with two favorite pairs, yield mocked rates page."""
+        app.dependency_overrides[AuthenticateUser.__metadata__[0].dependency] = lambda: self.user
+
+        with (
+            mock.patch.object(CurrencyService, 'get_favorites_version', return_value='2.5'),
+            mock.patch.object(
+                CurrencyService,
+                'get_favorite_rates_page',
+                return_value=(self.rates, None),
+            ) as get_favorite_rates_page,
+        ):
+            yield get_favorite_rates_page
+
+        app.dependency_overrides.clear()
+
+    def test_success(self, authenticated):
+        """Rates are tagged by the snapshot version and the favorite list version."""
+        response = client.get(self.url)
+
+        assert response.status_code == 200
+        assert response.json() == self.rates
+        assert 'x-next-cursor' not in response.headers
+        assert response.headers['etag'] == '"3-2.5"'
+        assert response.headers['cache-control'].startswith('private, max-age=')
+        assert response.headers['vary'] == 'Authorization'
+
+    def test_not_modified(self, authenticated):
+        """Matching ETag is answered before the rates are requested."""
+        response = client.get(self.url, headers={'If-None-Match': 'W/"3-2.5"'})
+
+        assert response.status_code == 304
+        authenticated.assert_not_awaited()
+
+    def test_favorites_changed(self, authenticated):
+        """Changed favorite list is not matched by the old ETag."""
+        response = client.get(self.url, headers={'If-None-Match': '"3-1.4"'})
+
+        assert response.status_code == 200
+        assert response.json() == self.rates
+
+    def test_next_page(self, authenticated):
+        """Cursor of the next page is returned by headers."""
+        authenticated.return_value = (self.rates, 1)
+        response = client.get(self.url, params={'limit': 1})
+
+        authenticated.assert_awaited_once_with(
+            user=self.user,
+            db_session=mock.ANY,
+            after=None,
+            limit=1,
+            snapshot=mock.ANY,
+        )
+        assert response.headers['x-next-cursor'] == '1'
+        assert response.headers['link'] == (
+            '<http://testserver/api/currencies/favorite_rates?limit=1&after=1>; rel="next"'
+        )
+
+    @pytest.mark.parametrize('limit', [0, 501])
+    def test_invalid_limit(self, authenticated, limit):
+        """Page size is limited."""
+        response = client.get(self.url, params={'limit': limit})
+
+        assert response.status_code == 422
+        assert response.json() == {'detail': 'Limit must be from 1 to 500 pairs.'}
+
+
+class TestStreamFavoriteRates:
+    """Test routes streaming favorite rates."""
+
+    url = 'api/currencies/favorite_rates/stream'
+    ws_url = 'api/currencies/favorite_rates/ws'
+    user = User(id=1, username='user')
+    event = {
+        'version': 2,
+        'rates': [{'id': 1, 'pair': 'USDEUR', 'rate': 0.5, 'description': '1 USD = 0.5 EUR'}],
+    }
+
+    async def events(self, pairs, **kwargs):
+        """Finite stream of a single event and a heartbeat."""
+        yield self.event
+        yield None
+
+    @pytest.fixture
+    def authenticated(self):
+        """Authenticate requests as the user."""
+        for dependency in (AuthenticateUser, AuthenticateWebSocketUser):
+            app.dependency_overrides[dependency.__metadata__[0].dependency] = lambda: self.user
+
+        with (
+            mock.patch.object(CurrencyService, 'get_favorite_pairs', return_value=[]),
+            mock.patch.object(CurrencyService, 'stream_favorite_rates', self.events),
+        ):
+            yield None
+
+        app.dependency_overrides.clear()
+
+    def test_sse(self, authenticated):
+        """Changes are sent as server-sent events."""
+        response = client.get(self.url)
+
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('text/event-stream')
+        assert response.content == (
+            encode_sse_event(self.event, event='rates', event_id=2) + SSE_HEARTBEAT
+        )
+
+    def test_sse_unauthorized(self):
+        """Stream is not opened without token."""
+        response = client.get(self.url)
+
+        assert response.status_code == 401
+
+    def test_websocket(self, authenticated):
+        """Changes are sent as JSON messages."""
+        with client.websocket_connect(self.ws_url) as websocket:
+            assert websocket.receive_json() == self.event
+            assert websocket.receive_json() == {}
+
+    def test_websocket_unauthorized(self):
+        """Connection is closed when the token is invalid."""
+        with pytest.raises(WebSocketDisconnect) as exc_info:
+            with client.websocket_connect(f'{self.ws_url}?token=invalid'):
+                pass
+
+        assert exc_info.value.code == status.WS_1008_POLICY_VIOLATION
+
+
+class TestGetUpstreamBudget:
+    """Test route /currencies/upstream_budget."""
+
+    url = 'api/currencies/upstream_budget'
+
+    def test_success(self):
+        """Successful response."""
+        budget = {
+            'monthly_quota': 1000,
+            'used_this_month': 10,
+            'remaining_this_month': 990,
+            'bucket_tokens': 9.5,
+        }
+        with mock.patch(
+            'app.currency_converter.routes.CurrencyService.get_upstream_budget',
+            return_value=budget,
+        ):
+            response = client.get(self.url)
+
+        assert response.status_code == 200
+        assert response.json() == budget
+
+
+class TestGetCacheStats:
+    """Test route /currencies/cache_stats."""
+
+    url = 'api/currencies/cache_stats'
+
+    def test_success(self):
+        """Counters of worker-level caches are returned."""
+        rates_local_cache.set('quotes:USD', {'version': 1})
+        rates_local_cache.get('quotes:USD')
+        rates_local_cache.get('quotes:EUR')
+
+        response = client.get(self.url)
+
+        assert response.status_code == 200
+        assert response.json()['rates'] == {'hits': 1, 'misses': 1, 'size': 1}
+        assert response.json()['currencies'] == {'hits': 0, 'misses': 0, 'size': 0}
@@ -1,36 +1,38 @@
+import datetime as dt
 from unittest import mock
 
 import pytest
 from sqlalchemy import select
 
+from app.config import settings
+from app.core.ratelimit import RedisTokenBucket
 from app.currency_converter.clients import ExchangerateClient
+from app.currency_converter.history import HistoricalRateStore
+from app.currency_converter.rates import QuoteSnapshot
+from app.currency_converter.rates import RateEngine
+from app.currency_converter.schemas import Conversion
 from app.currency_converter.schemas import CurrencyPair
+from app.currency_converter.schemas import RateSeriesQuery
 from app.currency_converter.services import CurrencyService
-from app.redis import redis_client
+from app.currency_converter.stream import RateBroker
 from app.users.models import FavoritePair
 from app.users.models import User
 
 
 @pytest.mark.asyncio
-class TestCurrencyServiceGetAvailableCurrencies:
-    """Testing method get_available_currencies_from_external_api of CurrencyService."""
+class TestCurrencyServiceCheckCurrenciesAvailable:
+    """Testing method check_currencies_available of CurrencyService."""
 
-    async def test_success(self, mock_client_get_available_currencies):
-        """Successful execution."""
-        service = CurrencyService()
-        assert service._available_currencies is None
-        assert await service._redis_client.exists('available_currencies') == 0
+    async def test_available(self, mock_client_get_available_currencies):
+        """All currencies are available."""
+        await CurrencyService().check_currencies_available(codes=['USD', 'AMD'])
 
-        result = await service._get_available_currencies_from_external_api()
-        expected_result = {
-            'USD': 'United States Dollar',
-            'AMD': 'Armenian Dram',
-        }
+        mock_client_get_available_currencies.assert_awaited_once()
 
-        assert result == expected_result
-        assert (await service._redis_client.hgetall('available_currencies')
-                == expected_result)  # type: ignore
-        assert service._available_currencies == expected_result
+    async def test_currency_not_available(self, mock_client_get_available_currencies):
+        """One of currencies is not available."""
+        with pytest.raises(CurrencyService.CurrencyNotAvailableError):
+            await CurrencyService().check_currencies_available(codes=['USD', 'LOL'])
 
     @pytest.mark.parametrize('exc_class', [
         ExchangerateClient.ClientError,
@@ -38,58 +40,10 @@ class TestCurrencyServiceGetAvailableCurrencies:
     ])
     async def test_client_error(self, mock_client_get_available_currencies, exc_class):
         """Client raises error."""
-        service = CurrencyService()
-        assert service._available_currencies is None
-        assert await service._redis_client.exists('available_currencies') == 0
-
         mock_client_get_available_currencies.side_effect = exc_class('message')
-        with pytest.raises(CurrencyService.ExchangerateClientError):
-            await service._get_available_currencies_from_external_api()
-
-        assert service._available_currencies is None
-        assert await service._redis_client.exists('available_currencies') == 0
-
-
-@pytest.mark.asyncio
-class TestCurrencyServiceIsCurrencyAvailable:
-    """Testing method is_currency_available of CurrencyService."""
-
-    currencies_list = {
-        'USD': 'United States Dollar',
-        'AMD': 'Armenian Dram',
-    }
 
-    async def test_service_instance_has_attribute(self):
-        """Instance of CurrencyService has attribute _available_currencies."""
-        service = CurrencyService()
-        service._available_currencies = self.currencies_list
-
-        await service.is_currency_available(code='USD')
-
-    async def test_currencies_in_redis(self):
-        """No instance attribute _available_currencies, but redis has necessary hash."""
-        await redis_client.hset(
-            'available_currencies',
-            mapping=self.currencies_list,  # type: ignore[arg-type]
-        )
-        service = CurrencyService()
-
-        await service.is_currency_available(code='USD')
-
-    async def test_no_saved_currencies(self, mock_client_get_available_currencies):
-        """No saved currencies at all."""
-        service = CurrencyService()
-        await service.is_currency_available(code='USD')
-        mock_client_get_available_currencies.assert_awaited_once()
-
-    async def test_currency_not_available(
-        self,
-        mock_client_get_available_currencies,
-    ):
-        """Currency is not available."""
-        service = CurrencyService()
-        with pytest.raises(CurrencyService.CurrencyNotAvailableError):
-            await service.is_currency_available(code='LOL')
+        with pytest.raises(CurrencyService.ExchangerateClientError):
+            await CurrencyService().check_currencies_available(codes=['USD'])
 
 
 @pytest.mark.asyncio
@@ -97,29 +51,45 @@ class TestCurrencyServiceGetRate:
     """Testing method get_rate of CurrencyService."""
 
     base = 'EUR'
-    target = 'USD'
+    target = 'AMD'
 
     async def test_success(
         self,
-        mock_is_currency_available,
-        mock_client_get_rate,
+        mock_check_currencies_available,
+        mock_client_get_quotes,
     ):
         """Successful execution."""
         service = CurrencyService()
         expected_result = {
             'pair': self.base + self.target,
-            'rate': 0.55,
-            'description': f'1 {self.base} = 0.55 {self.target}',
+            'rate': 200.0,
+            'description': f'1 {self.base} = 200.0 {self.target}',
         }
 
         assert await service.get_rate(base=self.base, target=self.target) == expected_result
-        mock_is_currency_available.assert_any_await(code=self.base)
-        mock_is_currency_available.assert_any_await(code=self.target)
-        mock_client_get_rate.assert_awaited_once_with(base=self.base, target=self.target)
+        mock_check_currencies_available.assert_awaited_once_with(codes=[self.base, self.target])
+        mock_client_get_quotes.assert_awaited_once_with(source='USD')
 
-    async def test_currency_not_available(self, mock_is_currency_available):
+    async def test_direct_quote_required(
+        self,
+        mock_check_currencies_available,
+        mock_client_get_quotes,
+        mock_client_get_rates,
+    ):
+        """Currency pair is requested directly according to the direct quote policy."""
+        mock_client_get_rates.return_value = [
+            {'base': 'EUR', 'target': 'USD', 'pair': 'EURUSD', 'rate': 0.55},
+        ]
+        with mock.patch.object(settings, 'DIRECT_QUOTE_CURRENCIES', ['EUR']):
+            result = await CurrencyService().get_rate(base='EUR', target='USD')
+
+        assert result['rate'] == 0.55
+        mock_client_get_rates.assert_awaited_once_with(base='EUR', targets=['USD'])
+        mock_client_get_quotes.assert_not_awaited()
+
+    async def test_currency_not_available(self, mock_check_currencies_available):
         """Provided currency is not available."""
-        mock_is_currency_available.side_effect = CurrencyService.CurrencyNotAvailableError()
+        mock_check_currencies_available.side_effect = CurrencyService.CurrencyNotAvailableError()
 
         with pytest.raises(CurrencyService.CurrencyNotAvailableError):
             await CurrencyService().get_rate(base=self.base, target=self.target)
@@ -130,17 +100,280 @@ class TestCurrencyServiceGetRate:
     ])
     async def test_client_error(
         self,
-        mock_is_currency_available,
-        mock_client_get_rate,
+        mock_check_currencies_available,
+        mock_client_get_quotes,
         exc_class,
     ):
         """ExchangerateClient raises error."""  # noqa: D403
         service = CurrencyService()
-        mock_client_get_rate.side_effect = exc_class('message')
+        mock_client_get_quotes.side_effect = exc_class('message')
 
         with pytest.raises(CurrencyService.ExchangerateClientError):
             await service.get_rate(base=self.base, target=self.target)
 
+    async def test_historical(
+        self,
+        mock_check_currencies_available,
+        mock_client_get_quotes,
+        db_session,
+    ):
+        """Historical rate is derived from stored quotes of the date."""
+        await HistoricalRateStore(db_session).save_daily({
+            dt.date(2024, 1, 30): {'EUR': 0.4, 'AMD': 400.0},
+            dt.date(2024, 1, 31): {'EUR': 0.5, 'AMD': 400.0},
+        })
+
+        result = await CurrencyService().get_rate(
+            base=self.base,
+            target=self.target,
+            date=dt.date(2024, 1, 31),
+            db_session=db_session,
+        )
+
+        assert result['rate'] == 800.0
+        mock_client_get_quotes.assert_not_awaited()
+
+    async def test_historical_without_session(self):
+        """Historical rate can not be requested without the database session."""
+        with pytest.raises(ValueError):
+            await CurrencyService().get_rate(
+                base=self.base,
+                target=self.target,
+                date=dt.date(2024, 1, 31),
+            )
+
+    async def test_snapshot(self, mock_check_currencies_available, mock_client_get_quotes):
+        """Rate is derived from the provided snapshot."""
+        snapshot = QuoteSnapshot(source='USD', timestamp=0, quotes={'EUR': 0.5, 'AMD': 400.0})
+
+        result = await CurrencyService().get_rate(
+            base=self.base,
+            target=self.target,
+            snapshot=snapshot,
+        )
+
+        assert result['rate'] == 800.0
+        mock_client_get_quotes.assert_not_awaited()
+
+    async def test_historical_not_found(self, mock_check_currencies_available, db_session):
+        """No quotes of the date."""
+        with pytest.raises(CurrencyService.HistoricalRateNotFoundError):
+            await CurrencyService().get_rate(
+                base=self.base,
+                target=self.target,
+                date=dt.date(2024, 1, 31),
+                db_session=db_session,
+            )
+
+
+@pytest.mark.asyncio
+class TestCurrencyServiceGetRateSnapshot:
+    """Testing method get_rate_snapshot of CurrencyService."""
+
+    async def test_success(self, mock_client_get_quotes):
+        """Snapshot with quotes of both currencies is returned."""
+        snapshot = await CurrencyService().get_rate_snapshot(base='EUR', target='AMD')
+
+        assert snapshot is not None
+        assert snapshot.quotes['AMD'] == 400.0
+
+    async def test_direct_quote_required(self, mock_client_get_quotes):
+        """No snapshot for pairs requested directly."""
+        with mock.patch.object(settings, 'DIRECT_QUOTE_CURRENCIES', ['EUR']):
+            assert await CurrencyService().get_rate_snapshot(base='EUR', target='AMD') is None
+
+        mock_client_get_quotes.assert_not_awaited()
+
+    async def test_currency_missing_in_snapshot(self, mock_client_get_quotes):
+        """No snapshot for pairs with currencies it has no quotes of."""
+        assert await CurrencyService().get_rate_snapshot(base='XAU', target='AMD') is None
+
+
+@pytest.mark.asyncio
+class TestCurrencyServiceGetRateSeries:
+    """Testing method get_rate_series of CurrencyService."""
+
+    query = RateSeriesQuery(
+        start=dt.date(2024, 1, 1),
+        end=dt.date(2024, 1, 31),
+        resolution='weekly',
+        window=2,
+    )
+
+    async def test_success(self, mock_check_currencies_available, db_session):
+        """Series is aggregated from stored quotes and cached."""
+        await HistoricalRateStore(db_session).save_daily({
+            dt.date(2024, 1, 1): {'EUR': 0.5, 'AMD': 400.0},
+            dt.date(2024, 1, 2): {'EUR': 0.4, 'AMD': 400.0},
+            dt.date(2024, 1, 8): {'EUR': 0.5, 'AMD': 500.0},
+            dt.date(2024, 2, 1): {'EUR': 0.1, 'AMD': 100.0},
+        })
+        service = CurrencyService()
+
+        result = await service.get_rate_series(
+            base='EUR',
+            target='AMD',
+            query=self.query,
+            db_session=db_session,
+        )
+        with mock.patch.object(HistoricalRateStore, 'get_series') as get_series:
+            cached = await service.get_rate_series(
+                base='EUR',
+                target='AMD',
+                query=self.query,
+                db_session=db_session,
+            )
+
+        assert result == {
+            'pair': 'EURAMD',
+            'resolution': 'weekly',
+            'window': 2,
+            'time': ['2024-01-01', '2024-01-08'],
+            'open': [800.0, 1000.0],
+            'high': [1000.0, 1000.0],
+            'low': [800.0, 1000.0],
+            'close': [1000.0, 1000.0],
+            'mean': [900.0, 1000.0],
+            'sma': [None, 1000.0],
+            'std': [None, 0.0],
+        }
+        assert cached == result
+        get_series.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+class TestCurrencyServiceConvert:
+    """Testing method convert of CurrencyService."""
+
+    async def test_success(
+        self,
+        mock_client_get_available_currencies,
+        mock_client_get_quotes,
+    ):
+        """Amounts are converted in input order with errors of unavailable currencies."""
+        items = [
+            Conversion(base='USD', target='AMD', amount=10),
+            Conversion(base='EUR', target='USD', amount=1),
+            Conversion(base='AMD', target='USD', amount=800),
+            Conversion(base='USD', target='AMD', amount=0.5),
+        ]
+
+        results = await CurrencyService().convert(items)
+
+        assert results == [
+            {
+                'base': 'USD', 'target': 'AMD', 'amount': 10,
+                'rate': 400.0, 'result': 4000.0, 'error': None,
+            },
+            {
+                'base': 'EUR', 'target': 'USD', 'amount': 1,
+                'rate': None, 'result': None, 'error': 'Provided currency is not available.',
+            },
+            {
+                'base': 'AMD', 'target': 'USD', 'amount': 800,
+                'rate': 0.0025, 'result': 2.0, 'error': None,
+            },
+            {
+                'base': 'USD', 'target': 'AMD', 'amount': 0.5,
+                'rate': 400.0, 'result': 200.0, 'error': None,
+            },
+        ]
+        mock_client_get_available_currencies.assert_awaited_once()
+        mock_client_get_quotes.assert_awaited_once_with(source='USD')
+
+    async def test_exact(
+        self,
+        mock_client_get_available_currencies,
+        mock_client_get_quotes,
+    ):
+        """Exact results are rounded to minor units of target currencies."""
+        results = await CurrencyService().convert(
+            [
+                Conversion(base='AMD', target='USD', amount=1001),
+                Conversion(base='LOL', target='USD', amount=1),
+            ],
+            exact=True,
+        )
+
+        assert [item['result'] for item in results] == ['2.50', None]
+
+    async def test_exact_rates_derived_in_decimal(
+        self,
+        mock_client_get_available_currencies,
+        mock_client_get_quotes,
+    ):
+        """Exact rates are derived from snapshot quotes in Decimal, not from float rates."""
+        mock_client_get_quotes.return_value = {
+            'source': 'USD',
+            'timestamp': 1704067200,
+            'quotes': {'AMD': 3.0},
+        }
+
+        results = await CurrencyService().convert(
+            [Conversion(base='AMD', target='USD', amount=3e15)],
+            exact=True,
+        )
+
+        assert results[0]['result'] == '1000000000000000.00'
+
+    async def test_exact_amount_too_large(
+        self,
+        mock_client_get_available_currencies,
+        mock_client_get_quotes,
+    ):
+        """Item whose exact result does not fit Decimal precision gets error."""
+        results = await CurrencyService().convert(
+            [
+                Conversion(base='USD', target='AMD', amount=1e40),
+                Conversion(base='USD', target='AMD', amount=1),
+            ],
+            exact=True,
+        )
+
+        assert results[0]['result'] is None
+        assert results[0]['error'] == 'Amount is too large for conversion.'
+        assert results[1]['result'] == '400.00'
+
+    async def test_amount_overflow(
+        self,
+        mock_client_get_available_currencies,
+        mock_client_get_quotes,
+    ):
+        """Item whose float result overflows gets error."""
+        results = await CurrencyService().convert([
+            Conversion(base='USD', target='AMD', amount=1e307),
+            Conversion(base='USD', target='AMD', amount=1),
+        ])
+
+        assert results[0]['result'] is None
+        assert results[0]['error'] == 'Amount is too large for conversion.'
+        assert results[1]['result'] == 400.0
+
+    async def test_all_unavailable(
+        self,
+        mock_client_get_available_currencies,
+        mock_client_get_quotes,
+    ):
+        """Rates are not requested when no item can be converted."""
+        results = await CurrencyService().convert([
+            Conversion(base='LOL', target='USD', amount=1),
+        ])
+
+        assert results[0]['error'] == 'Provided currency is not available.'
+        mock_client_get_quotes.assert_not_awaited()
+
+    async def test_client_error(
+        self,
+        mock_check_currencies_available,
+        mock_client_get_available_currencies,
+        mock_client_get_quotes,
+    ):
+        """Error of rates provider fails the whole batch."""
+        mock_client_get_quotes.side_effect = ExchangerateClient.UnknownClientError()
+
+        with pytest.raises(CurrencyService.ExchangerateClientError):
+            await CurrencyService().convert([Conversion(base='USD', target='AMD', amount=1)])
+
 
 @pytest.mark.asyncio
 class TestCurrencyServiceCreateFavoriteList:
@@ -151,7 +384,7 @@ class TestCurrencyServiceCreateFavoriteList:
         CurrencyPair(base='GEL', target='USD'),
     ]
 
-    async def test_success(self, db_session, mock_is_currency_available, user_factory):
+    async def test_success(self, db_session, mock_check_currencies_available, user_factory):
         """Successful creation."""
         user = await user_factory()
 
@@ -173,16 +406,19 @@ class TestCurrencyServiceCreateFavoriteList:
         assert pair2.base == 'GEL'
         assert pair2.target == 'USD'
         assert pair2.user_id == user.id
+        mock_check_currencies_available.assert_awaited_once_with(
+            codes=['USD', 'AMD', 'GEL', 'USD'],
+        )
 
     async def test_currency_not_available(
         self,
         db_session,
-        mock_is_currency_available,
+        mock_check_currencies_available,
         user_factory,
     ):
         """Provided currency is not available."""
         user = await user_factory()
-        mock_is_currency_available.side_effect = CurrencyService.CurrencyNotAvailableError()
+        mock_check_currencies_available.side_effect = CurrencyService.CurrencyNotAvailableError()
 
         with pytest.raises(CurrencyService.CurrencyNotAvailableError):
             await CurrencyService().add_favorite_list(
@@ -194,7 +430,7 @@ class TestCurrencyServiceCreateFavoriteList:
     async def test_create_duplicate_pair(
         self,
         db_session,
-        mock_is_currency_available,
+        mock_check_currencies_available,
         user_factory,
         favorite_pair_factory,
     ):
@@ -225,77 +461,101 @@ class TestCurrencyServiceCreateFavoriteList:
 
 
 @pytest.mark.asyncio
-class TestCurrencyServiceGetFavoritePairs:
-    """Testing method get_favorite_list of CurrencyService."""
+class TestCurrencyServiceGetFavoriteRates:
+    """Testing rates of favorite pairs resolved by get_favorite_rates_page of CurrencyService."""
 
     async def test_success(
         self,
         db_session,
         favorite_pair_factory,
         user_factory,
-        mock_client_get_rate,
+        mock_client_get_quotes,
     ):
         """Succesful execution with single user."""
         user = await user_factory()
         await favorite_pair_factory(user=user)
-        mock_client_get_rate.return_value = {
-            'base': 'BTC',
-            'target': 'USD',
-            'pair': 'BTCUSD',
-            'rate': 40000,
-        }
 
-        result = await CurrencyService().get_favorite_rates(user=user, db_session=db_session)
+        result, _ = await CurrencyService().get_favorite_rates_page(
+            user=user,
+            db_session=db_session,
+        )
         pair = result[0]
 
-        assert mock_client_get_rate.call_count == 1
-        mock_client_get_rate.assert_awaited_with(base='BTC', target='USD')
+        mock_client_get_quotes.assert_awaited_once_with(source='USD')
 
         assert pair['pair'] == 'BTCUSD'
         assert pair['rate'] == 40000
-        assert pair['description'] == '1 BTC = 40000 USD'
+        assert pair['description'] == '1 BTC = 40000.0 USD'
 
     async def test_another_user_has_pairs(
         self,
         db_session,
         favorite_pair_factory,
         user_factory,
-        mock_client_get_rate,
+        mock_client_get_quotes,
     ):
         """Another user has favorite pair."""
-        mock_client_get_rate.side_effect = [
-            {'base': 'USD', 'target': 'AMD', 'pair': 'USDAMD', 'rate': 400.0},
-            {'base': 'GEL', 'target': 'USD', 'pair': 'GELUSD', 'rate': 0.38},
-        ]
         await favorite_pair_factory()
         user = await user_factory()
         await favorite_pair_factory(user=user, base='USD', target='AMD')
         await favorite_pair_factory(user=user, base='GEL', target='USD')
 
-        result = await CurrencyService().get_favorite_rates(user=user, db_session=db_session)
+        result, _ = await CurrencyService().get_favorite_rates_page(
+            user=user,
+            db_session=db_session,
+        )
         pair1 = result[0]
         pair2 = result[1]
 
-        assert mock_client_get_rate.call_count == 2
-        mock_client_get_rate.assert_has_awaits([
-            mock.call(base='USD', target='AMD'),
-            mock.call(base='GEL', target='USD'),
-        ])
+        assert len(result) == 2
+        mock_client_get_quotes.assert_awaited_once_with(source='USD')
 
         assert pair1['pair'] == 'USDAMD'
         assert pair1['rate'] == 400.0
         assert pair1['description'] == '1 USD = 400.0 AMD'
 
         assert pair2['pair'] == 'GELUSD'
-        assert pair2['rate'] == 0.38
-        assert pair2['description'] == '1 GEL = 0.38 USD'
+        assert pair2['rate'] == 0.4
+        assert pair2['description'] == '1 GEL = 0.4 USD'
 
-    async def test_no_favorite_list(self, db_session, user_factory, mock_client_get_rate):
+    async def test_direct_pairs_grouped_by_base(
+        self,
+        db_session,
+        favorite_pair_factory,
+        user_factory,
+        mock_client_get_quotes,
+        mock_client_get_rates,
+    ):
+        """Pairs requiring direct quotes are requested by single call per base currency."""
+        mock_client_get_rates.return_value = [
+            {'base': 'XAU', 'target': 'AMD', 'pair': 'XAUAMD', 'rate': 800000.0},
+            {'base': 'XAU', 'target': 'EUR', 'pair': 'XAUEUR', 'rate': 1900.0},
+        ]
+        user = await user_factory()
+        first = await favorite_pair_factory(user=user, base='XAU', target='AMD')
+        second = await favorite_pair_factory(user=user, base='XAU', target='EUR')
+        third = await favorite_pair_factory(user=user, base='USD', target='EUR')
+
+        with mock.patch.object(settings, 'DIRECT_QUOTE_CURRENCIES', ['XAU']):
+            result, _ = await CurrencyService().get_favorite_rates_page(
+                user=user,
+                db_session=db_session,
+            )
+
+        mock_client_get_rates.assert_awaited_once_with(base='XAU', targets=['AMD', 'EUR'])
+        mock_client_get_quotes.assert_awaited_once_with(source='USD')
+        assert [item['id'] for item in result] == [first.id, second.id, third.id]
+        assert [item['rate'] for item in result] == [800000.0, 1900.0, 2.0]
+
+    async def test_no_favorite_list(self, db_session, user_factory, mock_client_get_quotes):
         """User has no favorite rates list."""
         user = await user_factory()
-        result = await CurrencyService().get_favorite_rates(user=user, db_session=db_session)
+        result, _ = await CurrencyService().get_favorite_rates_page(
+            user=user,
+            db_session=db_session,
+        )
 
-        mock_client_get_rate.assert_not_awaited()
+        mock_client_get_quotes.assert_not_awaited()
         assert not result
 
     @pytest.mark.parametrize('exc_class', [
@@ -307,13 +567,190 @@ class TestCurrencyServiceGetFavoritePairs:
         db_session,
         user_factory,
         favorite_pair_factory,
-        mock_client_get_rate,
+        mock_client_get_quotes,
         exc_class,
     ):
         """Clien raises error."""
-        mock_client_get_rate.side_effect = exc_class('message')
+        mock_client_get_quotes.side_effect = exc_class('message')
         user = await user_factory()
         await favorite_pair_factory(user=user)
 
         with pytest.raises(CurrencyService.ExchangerateClientError):
-            await CurrencyService().get_favorite_rates(user=user, db_session=db_session)
+            await CurrencyService().get_favorite_rates_page(user=user, db_session=db_session)
+
+
+@pytest.mark.asyncio
+class TestCurrencyServiceGetFavoriteRatesPage:
+    """Testing method get_favorite_rates_page of CurrencyService."""
+
+    async def test_pages(
+        self,
+        db_session,
+        favorite_pair_factory,
+        user_factory,
+        mock_client_get_quotes,
+    ):
+        """Pages follow each other by the cursor and only rates of the page are resolved."""
+        service = CurrencyService()
+        user = await user_factory()
+        await favorite_pair_factory()
+        pairs = [
+            await favorite_pair_factory(user=user, base=base, target='USD')
+            for base in ('EUR', 'AMD', 'GEL')
+        ]
+
+        with mock.patch.object(service, '_get_rates', wraps=service._get_rates) as get_rates:
+            first, cursor = await service.get_favorite_rates_page(
+                user=user,
+                db_session=db_session,
+                limit=2,
+            )
+            second, last_cursor = await service.get_favorite_rates_page(
+                user=user,
+                db_session=db_session,
+                after=cursor,
+                limit=2,
+            )
+
+        assert [item['id'] for item in first] == [pairs[0].id, pairs[1].id]
+        assert cursor == pairs[1].id
+        assert [item['pair'] for item in second] == ['GELUSD']
+        assert last_cursor is None
+        assert get_rates.call_args_list[1].args[0] == [('GEL', 'USD')]
+
+    async def test_default_limit(self, db_session, favorite_pair_factory, user_factory):
+        """Page size defaults to the setting."""
+        user = await user_factory()
+        await favorite_pair_factory(user=user)
+        await favorite_pair_factory(user=user, base='USD', target='AMD')
+
+        with (
+            mock.patch.object(settings, 'FAVORITE_RATES_PAGE_SIZE', 1),
+            mock.patch.object(CurrencyService, '_get_rates', return_value={'BTCUSD': 1.0}),
+        ):
+            page, cursor = await CurrencyService().get_favorite_rates_page(
+                user=user,
+                db_session=db_session,
+            )
+
+        assert len(page) == 1
+        assert cursor == page[0]['id']
+
+
+@pytest.mark.asyncio
+class TestCurrencyServiceGetFavoritesVersion:
+    """Testing method get_favorites_version of CurrencyService."""
+
+    async def test_version_changes(self, db_session, favorite_pair_factory, user_factory):
+        """Version changes when pairs are added or removed."""
+        service = CurrencyService()
+        user = await user_factory()
+        versions = [await service.get_favorites_version(user=user, db_session=db_session)]
+
+        pair = await favorite_pair_factory(user=user)
+        await favorite_pair_factory()
+        versions.append(await service.get_favorites_version(user=user, db_session=db_session))
+
+        await favorite_pair_factory(user=user, base='USD', target='AMD')
+        versions.append(await service.get_favorites_version(user=user, db_session=db_session))
+
+        await service.delete_favorite_pairs(user=user, db_session=db_session, pairs=[pair.id])
+        versions.append(await service.get_favorites_version(user=user, db_session=db_session))
+
+        assert versions[0] == '0.0'
+        assert len(set(versions)) == 4
+        assert versions[-1] == await service.get_favorites_version(
+            user=user,
+            db_session=db_session,
+        )
+
+
+@pytest.mark.asyncio
+class TestCurrencyServiceStreamFavoriteRates:
+    """Testing method stream_favorite_rates of CurrencyService."""
+
+    pairs = [
+        FavoritePair(id=1, user_id=1, base='USD', target='EUR'),
+        FavoritePair(id=2, user_id=1, base='USD', target='AMD'),
+    ]
+
+    @staticmethod
+    def create_snapshot(version: int, eur: float) -> QuoteSnapshot:
+        """Create snapshot of the version."""
+        return QuoteSnapshot(
+            source='USD',
+            timestamp=0,
+            quotes={'EUR': eur, 'AMD': 400.0},
+            version=version,
+        )
+
+    async def test_changed_rates(self):
+        """All rates are sent first, then only changed ones and heartbeats."""
+        broker = RateBroker(poll_interval=60)
+        with mock.patch.object(
+            RateEngine,
+            'get_snapshot',
+            return_value=self.create_snapshot(1, eur=0.5),
+        ):
+            events = CurrencyService().stream_favorite_rates(
+                self.pairs,
+                broker=broker,
+                heartbeat_interval=0.05,
+            )
+
+            first = await anext(events)
+            assert first is not None
+            assert first['version'] == 1
+            assert [item['pair'] for item in first['rates']] == ['USDEUR', 'USDAMD']
+
+            broker.publish(self.create_snapshot(2, eur=0.6))
+            assert await anext(events) == {
+                'version': 2,
+                'rates': [{
+                    'id': 1,
+                    'pair': 'USDEUR',
+                    'rate': 0.6,
+                    'description': '1 USD = 0.6 EUR',
+                }],
+            }
+
+            broker.publish(self.create_snapshot(3, eur=0.6))
+            assert await anext(events) is None
+            assert broker.subscribers == 1
+
+            await events.aclose()
+
+        assert broker.subscribers == 0
+
+
+@pytest.mark.asyncio
+class TestCurrencyServiceGetUpstreamBudget:
+    """Testing method get_upstream_budget of CurrencyService."""
+
+    async def test_quota_disabled(self):
+        """No budget when the quota is not configured."""
+        with mock.patch('app.currency_converter.services.exchangerate_quota', None):
+            result = await CurrencyService().get_upstream_budget()
+
+        assert result == {
+            'monthly_quota': None,
+            'used_this_month': None,
+            'remaining_this_month': None,
+            'bucket_tokens': None,
+        }
+
+    async def test_quota_enabled(self):
+        """Remaining budget is calculated from the monthly quota."""
+        bucket = RedisTokenBucket(key='test:bucket', capacity=5, refill_rate=0.001)
+        await bucket.acquire()
+
+        with (
+            mock.patch('app.currency_converter.services.exchangerate_quota', bucket),
+            mock.patch.object(settings, 'EXCHANGERATE_MONTHLY_QUOTA', 100),
+        ):
+            result = await CurrencyService().get_upstream_budget()
+
+        assert result['monthly_quota'] == 100
+        assert result['used_this_month'] == 1
+        assert result['remaining_this_month'] == 99
+        assert result['bucket_tokens'] == pytest.approx(4, abs=0.01)
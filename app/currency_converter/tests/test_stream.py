@@ -0,0 +1,101 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from app.currency_converter.rates import QuoteSnapshot
+from app.currency_converter.rates import RateEngine
+from app.currency_converter.stream import RateBroker
+from app.currency_converter.stream import Subscription
+from app.currency_converter.stream import encode_sse_event
+
+
+def create_snapshot(version: int, eur: float = 0.5) -> QuoteSnapshot:
+    """Create snapshot of the version."""
+    return QuoteSnapshot(
+        source='USD',
+        timestamp=0,
+        quotes={'EUR': eur, 'AMD': 400.0},
+        version=version,
+    )
+
+
+def test_encode_sse_event():
+    """Event has name, id and JSON data."""
+    assert encode_sse_event({'version': 3}, event='rates', event_id=3) == (
+        b'event: rates\nid: 3\ndata: {"version":3}\n\n'
+    )
+
+
+@pytest.mark.asyncio
+class TestSubscription:
+    """Testing Subscription."""
+
+    async def test_latest_snapshot_kept(self):
+        """Slow consumer gets only the latest snapshot."""
+        subscription = Subscription()
+        subscription.put(create_snapshot(1))
+        subscription.put(create_snapshot(2))
+
+        snapshot = await subscription.get()
+
+        assert snapshot.version == 2
+        assert subscription.skipped == 1
+
+    async def test_wait(self):
+        """Consumer waits for the next snapshot."""
+        subscription = Subscription()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(subscription.get(), 0.05)
+
+
+@pytest.mark.asyncio
+class TestRateBroker:
+    """Testing RateBroker."""
+
+    async def test_publish(self):
+        """Snapshot is passed to all subscribers, older versions are ignored."""
+        broker = RateBroker(poll_interval=60)
+        with broker.subscribe() as first, broker.subscribe() as second:
+            broker.publish(create_snapshot(2))
+            broker.publish(create_snapshot(1))
+
+            assert (await first.get()).version == 2
+            assert (await second.get()).version == 2
+            assert first.skipped == 0
+
+        assert broker.subscribers == 0
+
+    async def test_snapshot_loaded_once_on_invalidation(self):
+        """New snapshot is loaded once for all subscribers when it is published by the bus."""
+        broker = RateBroker(poll_interval=60)
+        broker.publish(create_snapshot(1))
+        broker.start()
+        with (
+            mock.patch.object(RateEngine, 'get_snapshot', return_value=create_snapshot(2)) as get,
+            broker.subscribe() as first,
+            broker.subscribe() as second,
+        ):
+            broker.invalidate('quotes:EUR', 2)
+            broker.invalidate('quotes:USD', 1)
+            await asyncio.sleep(0.05)
+            get.assert_not_awaited()
+
+            broker.invalidate('quotes:USD', 2)
+
+            assert (await asyncio.wait_for(first.get(), 1)).version == 2
+            assert (await asyncio.wait_for(second.get(), 1)).version == 2
+            get.assert_awaited_once()
+
+        await broker.stop()
+
+    async def test_nothing_loaded_without_subscribers(self):
+        """Snapshots are not loaded while nobody is subscribed."""
+        broker = RateBroker(poll_interval=0.01)
+        broker.start()
+        with mock.patch.object(RateEngine, 'get_snapshot') as get:
+            await asyncio.sleep(0.05)
+
+        await broker.stop()
+        get.assert_not_awaited()
@@ -0,0 +1,47 @@
+import httpx
+
+from app.config import settings
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Create httpx client with configured connection limits and timeouts."""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            settings.HTTP_TIMEOUT,
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+        ),
+        http2=settings.HTTP2,
+    )
+
+
+class HttpClientPool:
+    """Holder of the process-wide httpx client shared by third party API clients."""
+
+    def __init__(self) -> None:
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient | None:
+        """Return shared client or None if the pool is not opened."""
+        return self._client
+
+    def open(self) -> httpx.AsyncClient:
+        """Create shared client once per worker."""
+        if self._client is None:
+            self._client = create_http_client()
+
+        return self._client
+
+    async def close(self) -> None:
+        """Close shared client and release its connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+http_pool = HttpClientPool()
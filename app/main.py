@@ -1,13 +1,73 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from app.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.fastjson import FastJSONResponse
+from app.core.invalidation import invalidation_bus
+from app.core.response_cache import CachedRoute
+from app.core.response_cache import ResponseCacheMiddleware
+from app.currency_converter.refresher import quote_refresher
 from app.currency_converter.routes import converter_router
+from app.currency_converter.stream import rate_broker
 from app.users.routes import users_router
 
 from .exception_handlers import internal_exception_handler
+from .http_client import http_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared resources on startup and release them on shutdown."""
+    http_pool.open()
+    if settings.INVALIDATION_BUS_ENABLED:
+        invalidation_bus.start()
+    if settings.QUOTES_REFRESHER_ENABLED:
+        quote_refresher.start()
+    rate_broker.start()
+
+    yield
 
-app = FastAPI()
+    await rate_broker.stop()
+    await quote_refresher.stop()
+    await invalidation_bus.stop()
+    await http_pool.close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.include_router(converter_router, prefix='/api')
 app.include_router(users_router, prefix='/api')
 
 app.add_exception_handler(500, internal_exception_handler)
+
+app.add_middleware(
+    ResponseCacheMiddleware,
+    routes=[
+        CachedRoute(
+            '/api/currencies',
+            ttl=settings.RESPONSE_CACHE_CURRENCIES_TTL,
+            tags=['currencies'],
+        ),
+        CachedRoute(
+            '/api/currencies/rate',
+            ttl=settings.RESPONSE_CACHE_RATE_TTL,
+            tags=['quotes', 'currencies', 'history'],
+        ),
+        CachedRoute(
+            '/api/currencies/series',
+            ttl=settings.SERIES_CACHE_TTL,
+            tags=['currencies', 'history'],
+        ),
+        CachedRoute(
+            '/api/currencies/favorite_rates',
+            ttl=settings.RESPONSE_CACHE_FAVORITES_TTL,
+            tags=['quotes', 'favorites:{user}'],
+            private=True,
+        ),
+    ],
+)
+
+# Responses served by the cache are compressed already and are passed by compression as is.
+app.add_middleware(CompressionMiddleware)
@@ -8,3 +8,6 @@ pool = ConnectionPool.from_url(  # type: ignore
     decode_responses=True,
 )
 redis_client = Redis(connection_pool=pool)
+
+binary_pool = ConnectionPool.from_url(settings.REDIS_DSN.unicode_string())
+binary_redis_client = Redis(connection_pool=binary_pool)
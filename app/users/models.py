@@ -1,6 +1,7 @@
 from sqlalchemy import BigInteger
 from sqlalchemy import Column
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import String
 from sqlalchemy import UniqueConstraint
 from sqlalchemy.orm import relationship
@@ -20,7 +21,12 @@ class User(BaseModel):
 
 
 class FavoritePair(BaseModel):
-    """Model class for storing users favorite pairs."""
+    """
+    Model class for storing users favorite pairs.
+
+    Pairs of a user are paginated by id, index on user and id serves both lookups of all pairs
+    and pages of them.
+    """
 
     __tablename__ = 'favorite_pair'
 
@@ -28,7 +34,6 @@ class FavoritePair(BaseModel):
         BigInteger,
         ForeignKey('user.id', ondelete='CASCADE'),
         nullable=False,
-        index=True,
     )
     base = Column(String(3), nullable=False)
     target = Column(String(3), nullable=False)
@@ -37,4 +42,5 @@ class FavoritePair(BaseModel):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'base', 'target'),
+        Index('ix_favorite_pair_user_id_id', 'user_id', 'id'),
     )
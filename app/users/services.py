@@ -4,11 +4,14 @@ from typing import Annotated
 
 import jwt
 from fastapi import Depends
+from fastapi import WebSocket
+from fastapi import WebSocketException
 from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.security import HTTPBearer
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
 
 from app.config import settings
 from app.core.exceptions import BaseServiceError
@@ -136,6 +139,17 @@ class AuthService:
 
         return await self._generate_jwt_tokens(username)
 
+    async def authenticate_token(self, access_token: str, db_session: AsyncSession) -> User:
+        """Get user by access token."""
+        try:
+            decoded = jwt.decode(access_token, settings.JWT_TOKEN_SECRET, algorithms=['HS256'])
+            username: str = decoded['username']
+            user = await self.get_user(username=username, db_session=db_session)
+        except (jwt.InvalidTokenError, KeyError, self.UserNotFoundError) as exc:
+            raise UnauthorizedError from exc
+
+        return user
+
     async def authenticate(
         self,
         authorization: Annotated[HTTPAuthorizationCredentials, Depends(oauth2_scheme)],
@@ -144,15 +158,33 @@ class AuthService:
         """Authenticate user by access token."""
         if not authorization:
             raise UnauthorizedError
-        access_token = authorization.credentials
-        try:
-            decoded = jwt.decode(access_token, settings.JWT_TOKEN_SECRET, algorithms=['HS256'])
-            username: str = decoded['username']
-            user = await self.get_user(username=username, db_session=db_session)
-        except (jwt.InvalidTokenError, KeyError, self.UserNotFoundError) as exc:
-            raise UnauthorizedError from exc
 
-        return user
+        return await self.authenticate_token(authorization.credentials, db_session)
+
+    async def authenticate_websocket(
+        self,
+        websocket: WebSocket,
+        db_session: DataBaseSession,
+        token: str | None = None,
+    ) -> User:
+        """
+        Authenticate user of WebSocket by access token.
+
+        Browsers can not set headers of WebSocket, so the token may be passed by query parameter
+        as well as by Authorization header. Connection is closed with policy violation code when
+        authentication fails.
+        """
+        scheme, _, credentials = websocket.headers.get('authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and credentials:
+            token = credentials
+        if not token:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+
+        try:
+            return await self.authenticate_token(token, db_session)
+        except UnauthorizedError as exc:
+            raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION) from exc
 
 
 AuthenticateUser = Annotated[User, Depends(AuthService().authenticate)]
+AuthenticateWebSocketUser = Annotated[User, Depends(AuthService().authenticate_websocket)]
@@ -0,0 +1,67 @@
+"""
+Compare conversion of many amounts by a Python loop, NumPy and exact Decimal mode.
+
+Run from the repository root: python -m benchmarks.conversion
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.currency_converter.conversion import AmountConverter
+from app.currency_converter.providers import DEFAULT_QUOTES_FILE
+from app.currency_converter.rates import QuoteSnapshot
+
+
+def load_snapshot() -> QuoteSnapshot:
+    """Load quotes snapshot from the bundled file."""
+    data = json.loads(DEFAULT_QUOTES_FILE.read_text())
+
+    return QuoteSnapshot(source=data['source'], timestamp=data['timestamp'], quotes=data['quotes'])
+
+
+def measure(func) -> float:
+    """Get wall time of the call in milliseconds."""
+    started_at = time.perf_counter()
+    func()
+
+    return (time.perf_counter() - started_at) * 1000
+
+
+def main(size: int, exact_size: int) -> None:
+    """Print conversion time of every mode."""
+    snapshot = load_snapshot()
+    converter = AmountConverter(snapshot)
+    rng = np.random.default_rng(0)
+    amounts = rng.uniform(0, 10000, size)
+    bases = rng.choice(converter.codes, size)
+    amounts_list, bases_list = amounts.tolist(), bases.tolist()
+
+    def python_loop():
+        return [
+            amount * snapshot.cross_rate(base=base, target='EUR')
+            for amount, base in zip(amounts_list, bases_list)
+        ]
+
+    print(f'{size} amounts')
+    print(f'{"python loop, per-item base":<34} {measure(python_loop):>10.1f} ms')
+    print(f'{"numpy, single pair":<34} '
+          f'{measure(lambda: converter.convert(amounts, base="USD", target="EUR")):>10.1f} ms')
+    print(f'{"numpy, per-item base":<34} '
+          f'{measure(lambda: converter.convert(amounts, base=bases, target="EUR")):>10.1f} ms')
+
+    exact_amounts = amounts_list[:exact_size]
+    exact_bases = bases_list[:exact_size]
+    exact = measure(lambda: converter.convert_exact(exact_amounts, base=exact_bases, target='EUR'))
+    print(f'{exact_size} amounts')
+    print(f'{"decimal exact, per-item base":<34} {exact:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--exact-size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    main(args.size, args.exact_size)
@@ -0,0 +1,92 @@
+"""
+Compare CPU time spent on encoding /favorite_rates responses.
+
+The default FastAPI path validates the list against the response model, converts it with
+jsonable_encoder and encodes it with the standard library. The fast path encodes the list
+built by the service directly with FastJSONResponse.
+
+Run from the repository root: python -m benchmarks.favorite_rates
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from starlette.responses import JSONResponse
+
+from app.core import fastjson
+from app.core.fastjson import FastJSONResponse
+from app.currency_converter.schemas import FavoritePairOutput
+
+CURRENCIES = ['USD', 'EUR', 'GBP', 'JPY', 'CHF', 'AMD', 'GEL', 'BTC', 'CNY', 'TRY']
+
+
+def build_favorite_rates(size: int) -> list[dict]:
+    """Build favorite rates list in the shape returned by CurrencyService."""
+    result = []
+    for pair_id in range(size):
+        base, target = random.sample(CURRENCIES, 2)  # noqa: S311
+        rate = random.uniform(0.0001, 10000)  # noqa: S311
+        result.append({
+            'id': pair_id,
+            'pair': base + target,
+            'rate': rate,
+            'description': f'1 {base} = {rate} {target}',
+        })
+
+    return result
+
+
+async def default_response(field, content: list[dict]) -> bytes:
+    """Encode response the way FastAPI does for routes returning plain dicts."""
+    serialized = await serialize_response(field=field, response_content=content)
+
+    return JSONResponse(serialized).body
+
+
+async def fast_response(field, content: list[dict]) -> bytes:
+    """Encode response directly with the fast encoder."""
+    return FastJSONResponse(content).body
+
+
+async def measure(encode, field, content: list[dict], repeat: int) -> float:
+    """Get average CPU time of one response in milliseconds."""
+    started_at = time.process_time()
+    for _ in range(repeat):
+        await encode(field, content)
+
+    return (time.process_time() - started_at) / repeat * 1000
+
+
+async def main(sizes: list[int], repeat: int) -> None:
+    """Print CPU time per response for every list size."""
+    field = create_model_field(
+        name='Response',
+        type_=list[FavoritePairOutput],
+        mode='serialization',
+    )
+    backend = 'orjson' if fastjson.orjson is not None else 'json'
+    print(f'fast JSON backend: {backend}')
+    print(f'{"pairs":>8} {"default, ms":>12} {"fast, ms":>10} {"saved, ms":>10} {"speedup":>8}')
+
+    for size in sizes:
+        content = build_favorite_rates(size)
+        assert fastjson.loads(await default_response(field, content)) == fastjson.loads(
+            await fast_response(field, content),
+        )
+
+        default = await measure(default_response, field, content, repeat)
+        fast = await measure(fast_response, field, content, repeat)
+        print(f'{size:>8} {default:>12.3f} {fast:>10.3f} {default - fast:>10.3f} '
+              f'{default / fast:>7.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.sizes, args.repeat))